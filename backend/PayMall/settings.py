@@ -3,6 +3,8 @@ from datetime import timedelta
 import os
 from dotenv import load_dotenv
 
+from .database import database_from_url
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -47,6 +49,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'corsheaders',
 
+    'common',
     'accounts',
     'malls',
     'products',
@@ -61,6 +64,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Brotli / gzip for JSON and text bodies (common/compression.py)
+    'common.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,17 +92,82 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'PayMall.wsgi.application'
+# Same project under an ASGI server, for the async views (backend/README.md)
+ASGI_APPLICATION = 'PayMall.asgi.application'
 
 # ===============================
 # DATABASE
 # ===============================
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# SQLite tuning profile (on by default, SQLITE_TUNING=0 to disable):
+# - WAL lets readers keep going while one connection writes
+# - BEGIN IMMEDIATE takes the write lock when a transaction starts, so two
+#   transactions never deadlock trying to upgrade a read lock
+# - timeout is how long a connection waits on that lock before
+#   "database is locked"
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") == "1"
+SQLITE_TUNING_OPTIONS = {
+    "init_command": ";".join([
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))}",
+        "PRAGMA temp_store=MEMORY",
+    ]),
+    "transaction_mode": "IMMEDIATE",
+    "timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", "20")),
 }
 
+# DATABASE_URL switches to a DSN-driven database (PostgreSQL for the larger
+# deployments, see backend/README.md). Without it the local SQLite file is used.
+# PostgreSQL connections either persist per worker (DB_CONN_MAX_AGE seconds,
+# health-checked before reuse) or, with DB_POOL=1, come from Django's
+# built-in psycopg pool
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+DATABASE_URL_OPTIONS = {
+    "base_dir": BASE_DIR,
+    "sqlite_options": SQLITE_TUNING_OPTIONS if SQLITE_TUNING else {},
+    "conn_max_age": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+    "pool": {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    } if os.getenv("DB_POOL", "0") == "1" else None,
+}
+
+if DATABASE_URL:
+    DATABASES = {
+        'default': database_from_url(DATABASE_URL, **DATABASE_URL_OPTIONS)
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': SQLITE_TUNING_OPTIONS if SQLITE_TUNING else {},
+        }
+    }
+
+# Read replicas (comma-separated DSNs). Views using
+# common.replicas.ReplicaReadMixin read from them; users are pinned to the
+# primary for REPLICA_STICKY_SECONDS after a write. Pins live in the cache,
+# so multi-process deployments need a shared CACHES backend.
+# Locally, pointing a replica at the same SQLite file exercises the routing
+DATABASE_REPLICAS = []
+for i, url in enumerate(u for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u):
+    alias = f"replica_{i + 1}"
+    DATABASES[alias] = {
+        **database_from_url(url, **DATABASE_URL_OPTIONS),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "15"))
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["common.replicas.PrimaryReplicaRouter"]
+    MIDDLEWARE.append("common.replicas.ReplicaStickinessMiddleware")
+
 # ===============================
 # AUTH / REST
 # ===============================
@@ -111,6 +181,11 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # orjson-backed, same bytes as DRF's JSONRenderer (common/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": (
+        "common.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 # ===============================
@@ -174,6 +249,85 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ===============================
+# INVOICES
+# ===============================
+# Process-pool size for the admin batch invoice export
+INVOICE_EXPORT_WORKERS = int(os.getenv("INVOICE_EXPORT_WORKERS", "2"))
+# Background threads that render a paid order's invoice after the payment
+# response; 0 leaves it to the first download
+INVOICE_PRECOMPUTE_WORKERS = int(os.getenv("INVOICE_PRECOMPUTE_WORKERS", "1"))
+# Seconds an order's invoice-data JSON stays cached. Entries are keyed on
+# the order's status and updated_at and the mall's updated_at, so an edit
+# is never served stale
+INVOICE_DATA_CACHE_TIMEOUT = int(os.getenv("INVOICE_DATA_CACHE_TIMEOUT", "3600"))
+
+# ===============================
+# IDEMPOTENCY KEYS
+# ===============================
+# How long a stored response is replayed (purge_idempotency_keys deletes older ones)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24")))
+# A claimed key with no stored response after this long is treated as abandoned
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(seconds=60)
+
+# ===============================
+# CATALOG SYNC
+# ===============================
+# Deltas re-send changes this far before the client's version, so rows saved
+# by transactions that were still open when the version was issued aren't missed
+CATALOG_SYNC_OVERLAP = timedelta(seconds=int(os.getenv("CATALOG_SYNC_OVERLAP_SECONDS", "60")))
+# Deletion tombstones are kept this long; older versions get a full snapshot
+# (purge_catalog_tombstones deletes older ones)
+CATALOG_SYNC_TOMBSTONE_TTL = timedelta(days=int(os.getenv("CATALOG_SYNC_TOMBSTONE_TTL_DAYS", "30")))
+
+# ===============================
+# PAYMENT STATUS POLLING
+# ===============================
+# GET /api/payments/status/?wait=N holds the request at most this long for the
+# attempt to leave PENDING (a coroutine under ASGI, a whole worker under WSGI)
+PAYMENT_STATUS_MAX_WAIT = float(os.getenv("PAYMENT_STATUS_MAX_WAIT", "20"))
+# How often a held request re-reads the attempt
+PAYMENT_STATUS_POLL_INTERVAL = float(os.getenv("PAYMENT_STATUS_POLL_INTERVAL", "1"))
+
+# ===============================
+# RESPONSE COMPRESSION
+# ===============================
+# Bodies smaller than this fit in a packet or two; compressing them saves nothing
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Prefix match on the media type; PDFs and images are already compressed
+COMPRESSION_CONTENT_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+# Brotli 4 / gzip 6: most of the size win for a fraction of the CPU of the top levels
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+# ===============================
+# SQL PROFILING
+# ===============================
+# Opt-in per-request query count / DB time / N+1 report (see common/profiling.py)
+SQL_PROFILING = os.getenv("SQL_PROFILING", "0") == "1"
+# Flag an N+1 when the same normalized SQL runs more than this many times
+SQL_PROFILING_NPLUSONE_THRESHOLD = int(os.getenv("SQL_PROFILING_NPLUSONE_THRESHOLD", "5"))
+
+if SQL_PROFILING:
+    MIDDLEWARE.insert(0, "common.profiling.SQLProfilingMiddleware")
+
+    LOGGING = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {
+            "console": {"class": "logging.StreamHandler"},
+        },
+        "loggers": {
+            "paymall.sql": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        },
+    }
+
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
 if IS_PRODUCTION:
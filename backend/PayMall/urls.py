@@ -18,6 +18,7 @@ urlpatterns = [
     path('api/', include(api_urlpatterns)),  # All API endpoints under /api/
     path("api/admin/", include("products.admin_urls")),
     path("api/admin/malls/", include("malls.admin_urls")),
+    path("api/admin/orders/", include("orders.admin_urls")),
 
 ]
 
@@ -116,6 +116,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 class PendingManagementUserSerializer(serializers.ModelSerializer):
+    created_at = serializers.DateTimeField(source="date_joined", read_only=True)
+
     class Meta:
         model = User
         fields = ("id", "email", "created_at")
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import Cart, CartItem, SavedCart, SavedCartItem
 from products.serializers import ProductSerializer
-from .utils import split_gst_inclusive, money
+from .utils import cart_breakup, money
 from decimal import Decimal
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -43,37 +43,20 @@ class CartSerializer(serializers.ModelSerializer):
         """
         ✅ POS: calculate GST breakup using inclusive product prices
         """
-        taxable_total = Decimal("0.00")
-        gst_total = Decimal("0.00")
-        cgst_total = Decimal("0.00")
-        sgst_total = Decimal("0.00")
-        payable_total = Decimal("0.00")
-
-        for item in cart.items.select_related("product").all():
-            p = item.product
-            qty = Decimal(item.quantity)
-
-            unit_price_inclusive = Decimal(p.price)
-            gst_rate = Decimal(getattr(p, "gst_rate", Decimal("0.00")))
-
-            unit_taxable, unit_gst, unit_cgst, unit_sgst = split_gst_inclusive(
-                inclusive_amount=unit_price_inclusive,
-                gst_rate=gst_rate,
+        # Computed once per cart and shared by the five totals fields
+        cache = self.__dict__.setdefault("_breakup_cache", {})
+
+        if cart.pk not in cache:
+            items = cart.items.all()
+            if "items" not in getattr(cart, "_prefetched_objects_cache", {}):
+                items = items.select_related("product")
+
+            cache[cart.pk] = cart_breakup(
+                (item.product.price, item.product.gst_rate, item.quantity)
+                for item in items
             )
 
-            taxable_total += unit_taxable * qty
-            gst_total += unit_gst * qty
-            cgst_total += unit_cgst * qty
-            sgst_total += unit_sgst * qty
-            payable_total += unit_price_inclusive * qty
-
-        return {
-            "taxable_total": money(taxable_total),
-            "gst_total": money(gst_total),
-            "cgst_total": money(cgst_total),
-            "sgst_total": money(sgst_total),
-            "payable_total": money(payable_total),
-        }
+        return cache[cart.pk]
 
     def get_total_amount(self, obj):
         return self._calculate_breakup(obj)["payable_total"]
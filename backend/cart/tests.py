@@ -1,3 +1,151 @@
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from common.testing import ShopFixture
+from malls.models import Mall
+from products.models import Product
+from .models import Cart, CartItem
+from .views import CartBatchView
+
+
+class AddToCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+        cls.cart = cls.fixture.cart_item.cart
+        # products[0] (5 in stock) is already in the cart once
+        cls.limited, cls.product = cls.fixture.products[0], cls.fixture.products[1]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.customer)
+
+    def add(self, product, quantity=1, **extra):
+        return self.client.post(
+            "/api/cart/add/",
+            {"product_id": str(product.id), "quantity": quantity, **extra},
+            format="json",
+        )
+
+    def quantity(self, product):
+        return CartItem.objects.get(cart=self.cart, product=product).quantity
+
+    def test_add_inserts_then_bumps_one_line(self):
+        self.assertEqual(self.add(self.product, 2).status_code, 200)
+        self.assertEqual(self.add(self.product, 3).status_code, 200)
+
+        self.assertEqual(CartItem.objects.filter(cart=self.cart, product=self.product).count(), 1)
+        self.assertEqual(self.quantity(self.product), 5)
+
+    def test_add_is_capped_at_available_stock(self):
+        response = self.add(self.limited, 5)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["message"], "Stock limit exceeded")
+        self.assertEqual(self.quantity(self.limited), 1)
+
+        self.assertEqual(self.add(self.limited, 4).status_code, 200)
+        self.assertEqual(self.quantity(self.limited), 5)
+
+    def test_lean_response_matches_full_cart(self):
+        lean = self.add(self.product, 2, response="line").data["data"]
+        full = self.client.get("/api/cart/").data["data"]
+
+        self.assertEqual(lean["cart_id"], self.cart.id)
+        self.assertEqual(lean["item"]["quantity"], 2)
+        self.assertEqual(lean["item"]["total_price"], Decimal("236.00"))
+        self.assertEqual(lean["item_count"], len(full["items"]))
+        for key in ("total_amount", "taxable_subtotal", "gst_total", "cgst", "sgst"):
+            self.assertEqual(lean[key], full[key], key)
+
+    def test_product_from_another_mall_is_a_conflict(self):
+        mall = Mall.objects.create(name="Other mall", address="2 Other Road", latitude=0, longitude=0)
+        product = Product.objects.create(
+            name="Elsewhere",
+            barcode="ELSEWHERE-1",
+            price=Decimal("10.00"),
+            marked_price=Decimal("10.00"),
+            mall=mall,
+            stock_quantity=10,
+            status="ACTIVE",
+        )
+
+        response = self.add(product)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["data"]["conflict"])
+        self.assertFalse(CartItem.objects.filter(product=product).exists())
+
+
+class CartBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture(products=4)
+        cls.cart = cls.fixture.cart_item.cart
+        cls.limited = cls.fixture.products[0]
+        cls.products = cls.fixture.products[1:]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.customer)
+
+    def batch(self, operations):
+        return self.client.post("/api/cart/batch/", {"operations": operations}, format="json")
+
+    def lines(self):
+        return dict(CartItem.objects.filter(cart=self.cart).values_list("product_id", "quantity"))
+
+    def test_operations_apply_in_order(self):
+        a, b, c = self.products
+        response = self.batch([
+            {"op": "add", "product_id": str(a.id), "quantity": 2},
+            {"op": "add", "product_id": str(a.id)},
+            {"op": "set", "product_id": str(b.id), "quantity": 4},
+            {"op": "add", "product_id": str(c.id)},
+            {"op": "remove", "product_id": str(c.id)},
+            {"op": "remove", "product_id": str(self.limited.id)},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in response.data["data"]["results"]], ["ok"] * 6)
+        self.assertEqual(self.lines(), {a.id: 3, b.id: 4})
+
+    def test_failed_operations_are_skipped(self):
+        a = self.products[0]
+        response = self.batch([
+            {"op": "add", "product_id": str(self.limited.id), "quantity": 10},
+            {"op": "explode", "product_id": str(a.id)},
+            {"op": "add", "product_id": "not-a-uuid"},
+            {"op": "add", "product_id": str(a.id)},
+        ])
+
+        results = response.data["data"]["results"]
+        self.assertEqual([r["status"] for r in results], ["error", "error", "error", "ok"])
+        self.assertEqual(results[0]["message"], "Stock limit exceeded")
+        self.assertEqual(results[0]["quantity"], 1)
+        self.assertEqual(self.lines(), {self.limited.id: 1, a.id: 1})
+
+    def test_operation_limit(self):
+        operations = [{"op": "add", "product_id": str(self.products[0].id)}] * (CartBatchView.MAX_OPERATIONS + 1)
+
+        response = self.batch(operations)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.lines(), {self.limited.id: 1})
+
+    def test_operations_must_be_a_list(self):
+        self.assertEqual(self.batch({"op": "add"}).status_code, 400)
+
+    def test_cart_created_concurrently_is_reused(self):
+        # Another request created the cart after this one found none
+        a = self.products[0]
+        with mock.patch("cart.views.get_active_cart", return_value=None):
+            response = self.batch([{"op": "add", "product_id": str(a.id)}])
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"]["cart"]["id"], self.cart.id)
+        self.assertEqual(self.lines(), {self.limited.id: 1, a.id: 1})
+        self.assertEqual(Cart.objects.filter(user=self.fixture.customer, status="ACTIVE").count(), 1)
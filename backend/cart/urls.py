@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     AddToCartView,
+    CartBatchView,
     CartView,
     CartItemUpdateView,
     RemoveCartItemView,
@@ -16,6 +17,7 @@ urlpatterns = [
     path("", CartView.as_view()),
     path("merge-guest/", MergeGuestCartView.as_view()),
     path("add/", AddToCartView.as_view()),
+    path("batch/", CartBatchView.as_view()),
     path("replace/", ReplaceCartView.as_view()),
     path("item/update/", CartItemUpdateView.as_view()),
     path("item/remove/", RemoveCartItemView.as_view()),
@@ -1,8 +1,11 @@
-from django.db import transaction
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
 from decimal import Decimal, ROUND_HALF_UP
 from django.shortcuts import get_object_or_404
 from malls.models import Mall
-from .models import Cart
+from products.models import Product
+from .models import Cart, CartItem
 
 
 @transaction.atomic
@@ -15,6 +18,21 @@ def get_active_cart(user):
     )
 
 
+def create_active_cart(user, *, mall_id):
+    """
+    Create the user's ACTIVE cart for `mall_id` and return it row-locked.
+
+    If a concurrent request created it first, the unique constraint stops
+    this insert and that cart is returned instead, locked once the other
+    transaction is done with it.
+    """
+    try:
+        with transaction.atomic():
+            return Cart.objects.create(user=user, mall_id=mall_id, status="ACTIVE")
+    except IntegrityError:
+        return get_active_cart(user)
+
+
 
 def money(x: Decimal) -> Decimal:
     return Decimal(x).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
@@ -35,3 +53,122 @@ def split_gst_inclusive(inclusive_amount: Decimal, gst_rate: Decimal):
     sgst = gst_amount / Decimal("2.00")
 
     return money(taxable_value), money(gst_amount), money(cgst), money(sgst)
+
+
+def cart_breakup(lines):
+    """
+    POS totals for (inclusive unit price, gst rate, quantity) lines.
+    """
+    taxable_total = Decimal("0.00")
+    gst_total = Decimal("0.00")
+    cgst_total = Decimal("0.00")
+    sgst_total = Decimal("0.00")
+    payable_total = Decimal("0.00")
+
+    for price, gst_rate, quantity in lines:
+        qty = Decimal(quantity)
+        unit_price_inclusive = Decimal(price)
+
+        unit_taxable, unit_gst, unit_cgst, unit_sgst = split_gst_inclusive(
+            inclusive_amount=unit_price_inclusive,
+            gst_rate=gst_rate,
+        )
+
+        taxable_total += unit_taxable * qty
+        gst_total += unit_gst * qty
+        cgst_total += unit_cgst * qty
+        sgst_total += unit_sgst * qty
+        payable_total += unit_price_inclusive * qty
+
+    return {
+        "taxable_total": money(taxable_total),
+        "gst_total": money(gst_total),
+        "cgst_total": money(cgst_total),
+        "sgst_total": money(sgst_total),
+        "payable_total": money(payable_total),
+    }
+
+
+def cart_totals(cart_id):
+    """
+    Cart totals in the same shape CartSerializer returns, from one query.
+    """
+    lines = list(
+        CartItem.objects.filter(cart_id=cart_id)
+        .values_list("product__price", "product__gst_rate", "quantity")
+    )
+    breakup = cart_breakup(lines)
+
+    return {
+        "total_amount": breakup["payable_total"],
+        "taxable_subtotal": breakup["taxable_total"],
+        "gst_total": breakup["gst_total"],
+        "cgst": breakup["cgst_total"],
+        "sgst": breakup["sgst_total"],
+        "item_count": len(lines),
+    }
+
+
+def cart_items_prefetch():
+    """
+    Cart items with everything CartItemSerializer touches.
+    """
+    return Prefetch(
+        "items",
+        queryset=CartItem.objects.select_related(
+            "product__category", "product__mall"
+        ).order_by("id"),
+    )
+
+
+def cart_with_items(cart_id):
+    """
+    Load a cart ready for CartSerializer in two queries.
+    """
+    return (
+        Cart.objects.filter(id=cart_id)
+        .prefetch_related(cart_items_prefetch())
+        .first()
+    )
+
+
+def upsert_cart_item(cart, product_id, quantity, *, max_quantity):
+    """
+    Add `quantity` to the cart line for `product_id` in one statement.
+
+    Inserts the line or bumps the existing quantity, but only while the
+    result stays within `max_quantity`. Returns (item_id, new_quantity), or
+    None when the limit would be exceeded.
+    """
+    if quantity > max_quantity:
+        return None
+
+    table = CartItem._meta.db_table
+    qn = connection.ops.quote_name
+    cart_col = qn(CartItem._meta.get_field("cart").column)
+    product_col = qn(CartItem._meta.get_field("product").column)
+    now = CartItem._meta.get_field("updated_at").get_db_prep_value(
+        timezone.now(), connection
+    )
+
+    sql = f"""
+        INSERT INTO {qn(table)} ({cart_col}, {product_col}, quantity, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT ({cart_col}, {product_col}) DO UPDATE
+            SET quantity = {qn(table)}.quantity + excluded.quantity,
+                updated_at = excluded.updated_at
+            WHERE {qn(table)}.quantity + excluded.quantity <= %s
+        RETURNING id, quantity
+    """
+    params = [
+        cart.id,
+        Product._meta.pk.get_db_prep_value(product_id, connection),
+        quantity,
+        now,
+        now,
+        max_quantity,
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()
@@ -4,10 +4,22 @@ from rest_framework import status
 from common.responses import success_response, error_response
 from .models import CartItem, Cart, SavedCart, SavedCartItem
 from .serializers import CartSerializer, SavedCartSerializer
-from .utils import get_active_cart
+from .utils import (
+    cart_items_prefetch,
+    cart_totals,
+    cart_with_items,
+    create_active_cart,
+    get_active_cart,
+    money,
+    upsert_cart_item,
+)
 from products.models import Product
+from products.services import available_stock
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+import uuid
 
 
 class CartView(APIView):
@@ -20,8 +32,7 @@ class CartView(APIView):
                 user=request.user,
                 status="ACTIVE",
             )
-            .select_related("mall")
-            .prefetch_related("items__product")
+            .prefetch_related(cart_items_prefetch())
             .first()
         )
 
@@ -112,6 +123,11 @@ class MergeGuestCartView(APIView):
             cart.mall = guest_mall
             cart.save()
 
+        available = available_stock(
+            [i.get("product_id") for i in items if i.get("product_id")],
+            exclude_user=request.user,
+        )
+
         # 🔹 Merge items
         for i in items:
             product_id = i.get("product_id")
@@ -135,13 +151,13 @@ class MergeGuestCartView(APIView):
 
             new_qty = quantity if created else cart_item.quantity + quantity
 
-            if new_qty > product.stock_quantity:
-                new_qty = product.stock_quantity
+            if new_qty > available.get(product.id, 0):
+                new_qty = available.get(product.id, 0)
 
             cart_item.quantity = new_qty
             cart_item.save()
 
-        cart.refresh_from_db()
+        cart = cart_with_items(cart.id)
 
         return success_response(
             message="Guest cart merged",
@@ -153,6 +169,13 @@ class MergeGuestCartView(APIView):
         )
 
 class AddToCartView(APIView):
+    """
+    Add a product to the active cart.
+
+    The line is written with a single upsert. Pass `response=line` (body or
+    query string) to get back only the changed line plus cart totals;
+    otherwise the full cart is returned as before.
+    """
     permission_classes = [IsAuthenticated]
 
     @transaction.atomic
@@ -160,9 +183,12 @@ class AddToCartView(APIView):
 
         product_id = request.data.get("product_id")
         quantity = int(request.data.get("quantity", 1))
+        lean = (
+            request.data.get("response") or request.query_params.get("response")
+        ) == "line"
 
         product = get_object_or_404(
-            Product,
+            Product.objects.only("id", "mall_id", "price"),
             id=product_id,
             is_available=True,
         )
@@ -173,54 +199,235 @@ class AddToCartView(APIView):
         if not cart:
             cart = Cart.objects.create(
                 user=request.user,
-                mall=product.mall,
+                mall_id=product.mall_id,
                 status="ACTIVE",
             )
 
         # 🔥 Conflict detection
-        elif cart.mall != product.mall:
+        elif cart.mall_id != product.mall_id:
+            existing_mall, new_mall = cart.mall, product.mall
             return success_response(
                 message="Cart conflict",
                 data={
                     "conflict": True,
                     "existing_mall": {
-                        "id": str(cart.mall.id),
-                        "name": cart.mall.name,
-                        "logo": request.build_absolute_uri(cart.mall.image.url)
-                        if cart.mall.image else None,
+                        "id": str(existing_mall.id),
+                        "name": existing_mall.name,
+                        "logo": request.build_absolute_uri(existing_mall.image.url)
+                        if existing_mall.image else None,
                     },
                     "new_mall": {
-                        "id": str(product.mall.id),
-                        "name": product.mall.name,
-                        "logo": request.build_absolute_uri(product.mall.image.url)
-                        if product.mall.image else None,
+                        "id": str(new_mall.id),
+                        "name": new_mall.name,
+                        "logo": request.build_absolute_uri(new_mall.image.url)
+                        if new_mall.image else None,
                     },
                 },
                 status=200,
             )
 
-        # Add or update item
-        item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
+        # ✅ Insert or bump the line, capped at on-hand stock minus other
+        # shoppers' checkout holds
+        row = upsert_cart_item(
+            cart,
+            product.id,
+            quantity,
+            max_quantity=available_stock([product.id], exclude_user=request.user)[product.id],
         )
 
-        new_quantity = quantity if created else item.quantity + quantity
-
-        if new_quantity > product.stock_quantity:
+        if row is None:
             return error_response(
                 message="Stock limit exceeded",
                 status=400,
             )
 
-        item.quantity = new_quantity
-        item.save()
+        if not lean:
+            return success_response(
+                message="Item added",
+                data=CartSerializer(
+                    cart_with_items(cart.id), context={"request": request}
+                ).data,
+                status=200,
+            )
 
-        cart.refresh_from_db()
+        item_id, new_quantity = row
 
         return success_response(
             message="Item added",
-            data=CartSerializer(cart, context={"request": request}).data,
+            data={
+                "cart_id": cart.id,
+                "item": {
+                    "id": item_id,
+                    "product": str(product.id),
+                    "quantity": new_quantity,
+                    "total_price": money(product.price * new_quantity),
+                },
+                **cart_totals(cart.id),
+            },
+            status=200,
+        )
+
+
+class CartBatchView(APIView):
+    """
+    Apply an ordered list of cart operations in one transaction.
+
+    Body: {"operations": [{"op": "add" | "set" | "remove",
+                           "product_id": "...", "quantity": 1}, ...]}
+
+    Operations run in order against the cart as left by the previous ones.
+    A failing operation is reported in `results` and skipped; it does not
+    abort the rest of the batch. Products, stock and existing lines are read
+    once up front and changes are written with bulk queries, so the query
+    count does not grow with the number of operations.
+
+    The cart row stays locked until the batch commits, so concurrent
+    batches for one user run one after the other and each sees the lines
+    the previous one wrote.
+    """
+    permission_classes = [IsAuthenticated]
+
+    MAX_OPERATIONS = 200
+
+    @transaction.atomic
+    def post(self, request):
+        operations = request.data.get("operations", [])
+
+        if not isinstance(operations, list):
+            return error_response(message="operations must be a list", status=400)
+
+        if len(operations) > self.MAX_OPERATIONS:
+            return error_response(
+                message=f"At most {self.MAX_OPERATIONS} operations per batch",
+                status=400,
+            )
+
+        # 🔹 Parse every operation before touching the database
+        parsed = []
+        for op in operations:
+            try:
+                kind = op["op"]
+                product_id = uuid.UUID(str(op["product_id"]))
+                quantity = int(op.get("quantity", 1 if kind == "add" else 0))
+            except (KeyError, TypeError, ValueError):
+                parsed.append(None)
+                continue
+
+            if kind not in ("add", "set", "remove"):
+                parsed.append(None)
+                continue
+
+            parsed.append((kind, product_id, quantity))
+
+        product_ids = {p[1] for p in parsed if p}
+
+        # 🔹 One query for all products
+        products = {
+            p.id: p
+            for p in Product.objects.filter(
+                id__in=product_ids, is_available=True
+            ).only("id", "mall_id")
+        }
+
+        cart = get_active_cart(request.user)
+
+        if not cart:
+            first = next(
+                (products[p[1]] for p in parsed if p and p[1] in products),
+                None,
+            )
+            if not first:
+                return error_response(message="No valid products", status=400)
+
+            cart = create_active_cart(request.user, mall_id=first.mall_id)
+
+        existing = {item.product_id: item for item in cart.items.all()}
+        quantities = {pid: item.quantity for pid, item in existing.items()}
+        available = available_stock(list(products), exclude_user=request.user)
+
+        results = []
+        for index, op in enumerate(parsed):
+            if op is None:
+                results.append(
+                    {"index": index, "status": "error", "message": "Invalid operation"}
+                )
+                continue
+
+            kind, product_id, quantity = op
+            result = {"index": index, "op": kind, "product_id": str(product_id)}
+            results.append(result)
+
+            product = products.get(product_id)
+
+            if kind != "remove":
+                if not product:
+                    result.update(status="error", message="Product not available")
+                    continue
+
+                if product.mall_id != cart.mall_id:
+                    result.update(status="error", message="Product belongs to another mall")
+                    continue
+
+            current = quantities.get(product_id, 0)
+
+            if kind == "add":
+                new_quantity = current + quantity
+            elif kind == "set":
+                new_quantity = quantity
+            else:
+                new_quantity = 0
+
+            # ✅ On-hand stock minus other shoppers' checkout holds
+            if new_quantity > 0 and new_quantity > available.get(product_id, 0):
+                result.update(
+                    status="error",
+                    message="Stock limit exceeded",
+                    quantity=current,
+                )
+                continue
+
+            if new_quantity > 0:
+                quantities[product_id] = new_quantity
+            else:
+                quantities.pop(product_id, None)
+
+            result.update(status="ok", quantity=new_quantity)
+
+        # 🔹 Bulk writes for the net change
+        now = timezone.now()
+        to_create, to_update, to_delete = [], [], []
+
+        for product_id, item in existing.items():
+            new_quantity = quantities.get(product_id)
+            if new_quantity is None:
+                to_delete.append(item.id)
+            elif new_quantity != item.quantity:
+                item.quantity = new_quantity
+                item.updated_at = now
+                to_update.append(item)
+
+        for product_id, new_quantity in quantities.items():
+            if product_id not in existing:
+                to_create.append(
+                    CartItem(cart=cart, product_id=product_id, quantity=new_quantity)
+                )
+
+        if to_delete:
+            CartItem.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ["quantity", "updated_at"])
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+
+        return success_response(
+            message="Cart updated",
+            data={
+                "results": results,
+                "cart": CartSerializer(
+                    cart_with_items(cart.id), context={"request": request}
+                ).data
+                if quantities else None,
+            },
             status=200,
         )
 
@@ -249,7 +456,7 @@ class CartItemUpdateView(APIView):
 
         if quantity <= 0:
             item.delete()
-            cart.refresh_from_db()
+            cart = cart_with_items(cart.id)
 
             if not cart.items.exists():
                 return success_response(
@@ -264,7 +471,7 @@ class CartItemUpdateView(APIView):
                 status=status.HTTP_200_OK,
             )
 
-        if quantity > item.product.stock_quantity:
+        if quantity > available_stock([item.product_id], exclude_user=request.user)[item.product_id]:
             return error_response(
                 message="Insufficient stock",
                 status=status.HTTP_400_BAD_REQUEST,
@@ -273,7 +480,7 @@ class CartItemUpdateView(APIView):
         item.quantity = quantity
         item.save()
 
-        cart.refresh_from_db()
+        cart = cart_with_items(cart.id)
 
         return success_response(
             message="Cart item updated",
@@ -314,7 +521,7 @@ class RemoveCartItemView(APIView):
         cart = item.cart
         item.delete()
 
-        cart.refresh_from_db()
+        cart = cart_with_items(cart.id)
 
         if not cart.items.exists():
             return success_response(
@@ -373,7 +580,7 @@ class ReplaceCartView(APIView):
             quantity=quantity,
         )
 
-        cart.refresh_from_db()
+        cart = cart_with_items(cart.id)
 
         return success_response(
             message="Cart replaced",
@@ -401,12 +608,14 @@ class SaveCartView(APIView):
             mall=cart.mall,
         )
 
-        for item in cart.items.all():
-            SavedCartItem.objects.create(
+        SavedCartItem.objects.bulk_create([
+            SavedCartItem(
                 saved_cart=saved_cart,
-                product=item.product,
+                product_id=item.product_id,
                 quantity=item.quantity,
             )
+            for item in cart.items.all()
+        ])
 
         cart.items.all().delete()
 
@@ -419,7 +628,7 @@ class SaveCartView(APIView):
             quantity=quantity,
         )
 
-        cart.refresh_from_db()
+        cart = cart_with_items(cart.id)
 
         return success_response(
             message="Cart saved and new cart started",
@@ -434,7 +643,14 @@ class SavedCartListView(APIView):
             SavedCart.objects
             .filter(user=request.user)
             .select_related("mall")
-            .prefetch_related("items__product")
+            .prefetch_related(
+                Prefetch(
+                    "items",
+                    queryset=SavedCartItem.objects.select_related(
+                        "product__category", "product__mall"
+                    ),
+                )
+            )
             .order_by("-created_at")
         )
 
@@ -497,17 +713,19 @@ class RestoreSavedCartView(APIView):
         active_cart.items.all().delete()
 
         # 🟢 Copy items from saved cart
-        for item in saved_cart.items.all():
-            CartItem.objects.create(
+        CartItem.objects.bulk_create([
+            CartItem(
                 cart=active_cart,
-                product=item.product,
+                product_id=item.product_id,
                 quantity=item.quantity,
             )
+            for item in saved_cart.items.all()
+        ])
 
         # Delete saved cart after restore
         saved_cart.delete()
 
-        active_cart.refresh_from_db()
+        active_cart = cart_with_items(active_cart.id)
 
         return success_response(
             message="Saved cart restored",
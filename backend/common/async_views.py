@@ -0,0 +1,104 @@
+"""
+Async APIViews for the read-heavy and I/O-bound endpoints.
+
+Under ASGI (PayMall/asgi.py, see backend/README.md) an AsyncAPIView
+handler runs on the worker's event loop and awaits the async ORM, so a
+slow client, an invoice download or a payment status long-poll holds a
+coroutine instead of a whole sync worker. Under WSGI the same views still
+work: Django runs each one to completion in its own event loop.
+
+    class ProductListView(ReplicaReadMixin, AsyncAPIView):
+        async def get(self, request):
+            data = await PRODUCT_LIST.aserialize(queryset, request=request)
+            return success_response(data=data)
+
+Handlers must not touch the database synchronously (lazy relations,
+serializers walking foreign keys): select_related what the response
+needs, or wrap the sync code in sync_to_async.
+"""
+
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines.
+
+    DRF's dispatch is synchronous, so this one replaces it. Authentication
+    (a user lookup for JWTs) runs in a thread; the rest of initial()
+    (permissions, ReplicaReadMixin, content negotiation), exception
+    handling and finalize_response are DRF's own code, run on the loop.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # request.user is cached afterwards, so initial() won't query
+            await sync_to_async(self.perform_authentication)(request)
+            self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            # options() and http_method_not_allowed() are DRF's sync ones
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+# Read size for files streamed under ASGI (FileResponse reads 4 KB blocks)
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+async def _read_chunks(file, chunk_size):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while chunk := await read(chunk_size):
+            yield chunk
+    finally:
+        await sync_to_async(file.close, thread_sensitive=False)()
+
+
+def is_asgi_request(request):
+    """
+    True when the request (Django or DRF) is served by an ASGI server.
+    Streaming responses need an async iterator there: Django reads a sync
+    one into memory before sending it.
+    """
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+def file_attachment(request, file, *, filename, content_type):
+    """
+    Download response for an open storage file.
+
+    Under WSGI this is a FileResponse (gunicorn hands it to sendfile).
+    Under ASGI the file is streamed through an async iterator instead, one
+    chunk per read in a worker thread.
+    """
+    if not is_asgi_request(request):
+        return FileResponse(file, as_attachment=True, filename=filename, content_type=content_type)
+
+    response = StreamingHttpResponse(_read_chunks(file, FILE_CHUNK_SIZE), content_type=content_type)
+    response["Content-Length"] = str(file.size)
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
@@ -0,0 +1,254 @@
+"""
+In-process benchmarks of the hot shopping flows.
+
+Each flow is timed through the DRF test client against whatever data is in
+the configured database (see generate_synthetic_data). Everything a run
+writes happens inside a transaction that is rolled back at the end, and
+every mutating request runs in its own rolled-back savepoint, so repeated
+iterations see the same starting state.
+
+Run it with `python manage.py bench_flows`.
+"""
+
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from cart.models import Cart, CartItem
+from malls.models import Mall
+from orders.models import Order
+from products.models import Product
+
+from .profiling import QueryProfile
+
+
+class FlowContext:
+    """
+    The mall, products, shopper and paid order the flows run against.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+
+        self.mall = (
+            Mall.objects.filter(is_active=True)
+            .annotate(n=Count("products", filter=Q(products__status="ACTIVE")))
+            .order_by("-n")
+            .first()
+        )
+        if not self.mall:
+            raise LookupError("No malls found; run generate_synthetic_data first")
+
+        self.products = list(
+            Product.objects.filter(
+                mall=self.mall,
+                status="ACTIVE",
+                is_available=True,
+                stock_quantity__gte=25,
+            ).only("id", "name", "barcode")[:500]
+        )
+        if len(self.products) < 10:
+            raise LookupError("Not enough products; run generate_synthetic_data first")
+
+        self.shopper = User.objects.create_user(
+            email=f"bench-{uuid.uuid4().hex[:8]}@paymall.local",
+            password=None,
+            signup_source=User.SignupSource.CUSTOMER,
+        )
+        cart = Cart.objects.create(user=self.shopper, mall=self.mall, status="ACTIVE")
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=p, quantity=1) for p in self.products[:5]
+        ])
+
+        self.paid_order = Order.objects.create(
+            user=self.shopper,
+            mall=self.mall,
+            order_number=f"BENCH-{uuid.uuid4().hex[:12].upper()}",
+            status="PAID",
+            subtotal=Decimal("0.00"),
+            tax=Decimal("0.00"),
+            total=Decimal("0.00"),
+        )
+        self.paid_order.items.create(
+            product=self.products[0],
+            product_name=self.products[0].name,
+            product_price=Decimal("118.00"),
+            product_barcode=self.products[0].barcode,
+            quantity=1,
+            gst_rate=Decimal("18.00"),
+            taxable_value=Decimal("100.00"),
+            tax_amount=Decimal("18.00"),
+            cgst_amount=Decimal("9.00"),
+            sgst_amount=Decimal("9.00"),
+            total_price=Decimal("118.00"),
+        )
+
+        self.client = APIClient(raise_request_exception=False)
+        self.client.force_authenticate(self.shopper)
+
+    def product(self):
+        return self.rng.choice(self.products)
+
+
+def barcode_scan(ctx):
+    return ctx.client.post(
+        "/api/products/scan/",
+        {"barcode": ctx.product().barcode, "mall_id": str(ctx.mall.id)},
+        format="json",
+    )
+
+
+def product_list(ctx):
+    return ctx.client.get("/api/products/list/", {"mall": str(ctx.mall.id)})
+
+
+def product_search(ctx):
+    term = ctx.product().name.split()[0]
+    return ctx.client.get("/api/products/list/", {"mall": str(ctx.mall.id), "search": term})
+
+
+def nearby_malls(ctx):
+    return ctx.client.get(
+        "/api/malls/nearby/",
+        {"latitude": ctx.mall.latitude, "longitude": ctx.mall.longitude},
+    )
+
+
+def cart_add(ctx):
+    return ctx.client.post(
+        "/api/cart/add/",
+        {"product_id": str(ctx.product().id), "quantity": 1},
+        format="json",
+    )
+
+
+def checkout(ctx):
+    return ctx.client.post("/api/orders/checkout/", {}, format="json")
+
+
+def payment_verify_setup(ctx):
+    order_id = ctx.client.post("/api/orders/checkout/", {}, format="json").data["data"]["id"]
+    attempt = ctx.client.post(
+        "/api/payments/create-attempt/", {"order_id": order_id}, format="json"
+    )
+    return {"attempt_id": attempt.data["data"]["attempt_id"]}
+
+
+def payment_verify(ctx, attempt_id):
+    return ctx.client.post(
+        "/api/payments/verify/",
+        {"attempt_id": attempt_id, "success": True, "provider_payment_id": "pay_bench"},
+        format="json",
+    )
+
+
+def invoice(ctx):
+    response = ctx.client.get(f"/api/orders/{ctx.paid_order.id}/invoice/")
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
+
+
+# name -> (flow, untimed per-iteration setup or None, mutates data)
+FLOWS = {
+    "barcode_scan": (barcode_scan, None, False),
+    "product_list": (product_list, None, False),
+    "product_search": (product_search, None, False),
+    "nearby_malls": (nearby_malls, None, False),
+    "cart_add": (cart_add, None, True),
+    "checkout": (checkout, None, True),
+    "payment_verify": (payment_verify, payment_verify_setup, True),
+    "invoice": (invoice, None, False),
+}
+
+
+def percentile(sorted_values, pct):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[pct - 1]
+
+
+def run_flow(ctx, name, iterations, warmup):
+    flow, setup, mutates = FLOWS[name]
+    timings, queries = [], []
+
+    for i in range(warmup + iterations):
+        with transaction.atomic():
+            kwargs = setup(ctx) if setup else {}
+
+            with QueryProfile(capture_call_sites=False) as profile:
+                started = time.perf_counter()
+                response = flow(ctx, **kwargs)
+                elapsed = time.perf_counter() - started
+
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}")
+
+            if mutates or setup:
+                transaction.set_rollback(True)
+
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(profile.count)
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(timings[-1], 3),
+        "queries_per_op": round(statistics.fmean(queries), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(flows, *, iterations=50, warmup=5, seed=42):
+    """
+    Time each named flow and return a JSON-serializable report.
+    """
+    rng = random.Random(seed)
+    report = {"meta": {}, "flows": {}}
+
+    with transaction.atomic():
+        ctx = FlowContext(rng)
+
+        report["meta"] = {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "database": connection.vendor,
+            "products": Product.objects.count(),
+            "mall_products": Product.objects.filter(mall=ctx.mall).count(),
+            "iterations": iterations,
+            "warmup": warmup,
+            "seed": seed,
+        }
+
+        for name in flows:
+            report["flows"][name] = run_flow(ctx, name, iterations, warmup)
+
+        transaction.set_rollback(True)
+
+    return report
@@ -0,0 +1,204 @@
+"""
+Response compression for the JSON API.
+
+CompressionMiddleware negotiates Brotli (when the `brotli` package is
+installed) or gzip from Accept-Encoding and compresses responses whose
+content type is in COMPRESSION_CONTENT_TYPES and whose body is at least
+COMPRESSION_MIN_SIZE bytes. PDFs, images and anything already carrying a
+Content-Encoding are passed through untouched. Streaming responses are
+compressed chunk by chunk and flushed after every chunk, so the client
+keeps receiving data as it is produced.
+
+Responses that set cookies (login and token refresh) are never
+compressed: they carry secrets next to request-controlled data, which is
+what BREACH-style length attacks need.
+"""
+
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level):
+        self.level = level
+
+    def _compressor(self):
+        # wbits=31: gzip container
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        z = self._compressor()
+        return z.compress(data) + z.flush()
+
+    def stream(self, chunks):
+        z = self._compressor()
+        for chunk in chunks:
+            data = z.compress(chunk) + z.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield z.flush()
+
+    async def astream(self, chunks):
+        z = self._compressor()
+        async for chunk in chunks:
+            data = z.compress(chunk) + z.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield z.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=self.quality)
+
+    def stream(self, chunks):
+        c = brotli.Compressor(mode=brotli.MODE_TEXT, quality=self.quality)
+        for chunk in chunks:
+            data = c.process(chunk) + c.flush()
+            if data:
+                yield data
+        yield c.finish()
+
+    async def astream(self, chunks):
+        c = brotli.Compressor(mode=brotli.MODE_TEXT, quality=self.quality)
+        async for chunk in chunks:
+            data = c.process(chunk) + c.flush()
+            if data:
+                yield data
+        yield c.finish()
+
+
+def available_encoders():
+    """
+    Encoders in server preference order.
+    """
+    encoders = {}
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder(settings.COMPRESSION_BROTLI_QUALITY)
+    encoders["gzip"] = GzipEncoder(settings.COMPRESSION_GZIP_LEVEL)
+    return encoders
+
+
+def parse_accept_encoding(header):
+    """
+    Returns: {coding: q} for an Accept-Encoding header
+    """
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header, encoders):
+    """
+    Pick the encoder the client rates highest; ties go to server preference
+    (Brotli first). Returns None when nothing acceptable is available.
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+
+    for name, encoder in encoders.items():
+        q = accepted.get(name, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoder, q
+    return best
+
+
+class CompressionMiddleware:
+    # Runs inline under ASGI too: compressing is CPU work, nothing to await,
+    # and a sync-only middleware would push every async view through a thread
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encoders = available_encoders()
+        self.content_types = tuple(settings.COMPRESSION_CONTENT_TYPES)
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not self._compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoder = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""), self.encoders)
+        if encoder is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = encoder.astream(response.streaming_content)
+            else:
+                response.streaming_content = encoder.stream(response.streaming_content)
+            # The compressed size is unknown until the stream ends
+            del response.headers["Content-Length"]
+        else:
+            compressed = encoder.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The body changed, so a strong validator no longer applies
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoder.name
+
+        return response
+
+    def _compressible(self, response):
+        if response.has_header("Content-Encoding") or response.cookies:
+            return False
+        if response.status_code in (204, 206, 304):
+            return False
+        if "no-transform" in response.get("Cache-Control", ""):
+            return False
+
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if not content_type.startswith(self.content_types):
+            return False
+
+        if not response.streaming and len(response.content) < self.min_size:
+            return False
+        return True
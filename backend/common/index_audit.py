@@ -0,0 +1,374 @@
+"""
+Index audit: run every budgeted endpoint (common/query_budgets.py), capture
+the SQL each one issues, EXPLAIN every distinct SELECT / UPDATE / DELETE
+and report
+
+- full table scans (SQLite `SCAN table`, PostgreSQL `Seq Scan`),
+- index searches that leave equality filters on the table to be checked
+  row by row (the index used covers fewer columns than the WHERE
+  clause), and
+- sorts the database does without an index (`USE TEMP B-TREE`, `Sort`),
+
+with a proposed index for each: the table's equality columns from the
+WHERE clause (foreign keys first), then either one range column or the
+ORDER BY columns when they caused the sort. A boolean column test
+becomes the condition of a partial index; Django writes those as a bare
+column (`WHERE "is_triggered"`), so both SQLite and PostgreSQL can match
+the index condition. Proposals already covered by a declared index are
+dropped.
+
+The endpoints run against the large budget fixture in a rolled-back
+transaction, with ANALYZE run inside it so the planner sees fixture-sized
+tables. Run it with `python manage.py audit_indexes`.
+"""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.db import connection, models, transaction
+
+from .profiling import fingerprint
+from .query_budgets import BUDGETS, FIXTURE_SIZES, measure
+from .testing import ShopFixture
+
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+# FROM "products_product" U0 / INNER JOIN "malls_mall" T3
+_ALIAS = re.compile(r'"(\w+)"\s+(?:AS\s+)?"?([A-Z]\d+)"?(?=[\s,)]|$)')
+# "products_product"."mall_id" = %s, or a bare (NOT) "products_product"."is_available"
+_PREDICATE = re.compile(
+    r'(NOT\s+)?"?(\w+)"?\."(\w+)"\s*(=|IN\b|IS\b|<=|>=|<|>|(?=AND\b|OR\b|\)|$))',
+    re.IGNORECASE,
+)
+_ORDER_BY = re.compile(r"\bORDER BY (.+?)(?:\bLIMIT\b|\bOFFSET\b|\bFOR UPDATE\b|$)", re.IGNORECASE | re.DOTALL)
+_ORDER_COLUMN = re.compile(r'"?(\w+)"?\."(\w+)"')
+# ON ("products_inventoryalert"."product_id" = "products_product"."id")
+_JOIN_COLUMN = re.compile(r'"?(\w+)"?\."(\w+)"(?= = "?\w+"?\."\w+"\))|(?<=" = )"?(\w+)"?\."(\w+)"(?=\))')
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)$")
+_SQLITE_SEARCH = re.compile(r"^SEARCH (\w+) USING (?:COVERING )?INDEX \w+ \((.+)\)$")
+_SQLITE_SEARCH_COLUMN = re.compile(r"(\w+)[=<>]")
+_SQLITE_TEMP = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+_PG_SCAN = re.compile(r"Seq Scan on (\w+)")
+_PG_INDEX_SCAN = re.compile(r"Index (?:Only )?Scan using \w+ on (\w+)|Bitmap Heap Scan on (\w+)")
+_PG_INDEX_COND = re.compile(r"(?:Index Cond|Recheck Cond): (.+)$")
+_PG_COND_COLUMN = re.compile(r"\((?:\w+\.)?(\w+) (?:=|<|>|<=|>=)")
+_PG_SORT_KEY = re.compile(r"Sort Key: (.+)$")
+
+
+@dataclass
+class Statement:
+    sql: str
+    params: tuple
+    routes: set = field(default_factory=set)
+    count: int = 0
+
+
+@dataclass
+class Finding:
+    statement: Statement
+    plan: list
+    full_scans: list
+    partial_searches: list
+    temp_sorts: list
+    proposals: list
+
+
+class StatementCapture:
+    """
+    execute_wrapper that keeps one example (SQL + params) per fingerprint,
+    tagged with the route that was running.
+    """
+
+    def __init__(self):
+        self.route = None
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith(_EXPLAINABLE):
+            key = fingerprint(sql)
+            statement = self.statements.get(key)
+            if statement is None:
+                statement = self.statements[key] = Statement(sql, tuple(params or ()))
+            statement.routes.add(self.route)
+            statement.count += 1
+        return execute(sql, params, many, context)
+
+
+def explain(sql, params):
+    """
+    Returns: the plan as a list of lines
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute("EXPLAIN " + sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def plan_problems(plan, aliases):
+    """
+    Returns: (tables scanned in full, {table: index columns of each index
+    search on it}, what was sorted without an index)
+    """
+    scans, searches, sorts = [], defaultdict(list), []
+    index_scan = None
+
+    for line in plan:
+        line = line.strip().lstrip("->").strip()
+
+        if connection.vendor == "sqlite":
+            match = _SQLITE_SCAN.match(line)
+            if match:
+                scans.append(aliases.get(match.group(1), match.group(1)))
+            match = _SQLITE_SEARCH.match(line)
+            if match:
+                table = aliases.get(match.group(1), match.group(1))
+                searches[table].append(_SQLITE_SEARCH_COLUMN.findall(match.group(2)))
+            match = _SQLITE_TEMP.search(line)
+            if match:
+                sorts.append(match.group(1))
+        else:
+            match = _PG_SCAN.search(line)
+            if match:
+                scans.append(match.group(1))
+            match = _PG_INDEX_SCAN.search(line)
+            if match:
+                index_scan = match.group(1) or match.group(2)
+            match = _PG_INDEX_COND.search(line)
+            if match and index_scan:
+                searches[index_scan].append(_PG_COND_COLUMN.findall(match.group(1)))
+                index_scan = None
+            match = _PG_SORT_KEY.search(line)
+            if match:
+                sorts.append(f"ORDER BY {match.group(1)}")
+    return scans, searches, sorts
+
+
+class _Table:
+    def __init__(self, model):
+        self.model = model
+        self.columns = {f.column: f for f in model._meta.concrete_fields}
+
+    def _declared(self):
+        """
+        Returns: [(field names, condition, unique)] for every index the
+        model declares, implicit ones included
+        """
+        declared = []
+        for f in self.model._meta.concrete_fields:
+            if f.primary_key or f.unique or f.db_index:
+                declared.append(([f.name], None, f.primary_key or f.unique))
+        for index in self.model._meta.indexes:
+            declared.append((list(index.fields), index.condition, False))
+        for constraint in self.model._meta.constraints:
+            if isinstance(constraint, models.UniqueConstraint) and constraint.fields:
+                declared.append((list(constraint.fields), constraint.condition, True))
+        for together in self.model._meta.unique_together:
+            declared.append((list(together), None, True))
+        return declared
+
+    def covered(self, fields, equality, condition):
+        """
+        True if a declared index starts with the `equality` columns (in
+        any order) followed by the rest of `fields`; for a partial index
+        proposal, under the same condition.
+        """
+        n = len(equality)
+        return any(
+            set(existing[:n]) == set(equality)
+            and existing[n : len(fields)] == fields[n:]
+            and existing_condition == condition
+            for existing, existing_condition, _ in self._declared()
+        )
+
+    def unique(self, columns):
+        """
+        True if an equality search on `columns` finds at most one row.
+        """
+        names = {self.columns[c].name for c in columns if c in self.columns}
+        if "rowid" in columns:
+            return True
+        return any(
+            is_unique and condition is None and set(existing) <= names
+            for existing, condition, is_unique in self._declared()
+        )
+
+
+def _tables():
+    return {m._meta.db_table: _Table(m) for m in apps.get_models()}
+
+
+def _pk_only(order_by, aliases, tables):
+    columns = _ORDER_COLUMN.findall(order_by)
+    for qualifier, column in columns:
+        table = tables.get(aliases.get(qualifier, qualifier))
+        if table is None or column != table.model._meta.pk.column:
+            return False
+    return bool(columns)
+
+
+def predicates(statement, table, names):
+    """
+    Returns: (equality field names, range field names, partial index
+    condition) that the WHERE clause puts on one table
+    """
+    where = statement.sql.split(" WHERE ", 1)[1] if " WHERE " in statement.sql else ""
+    where = _ORDER_BY.split(where, 1)[0]
+    equality, ranges, condition = [], [], None
+
+    for match in _PREDICATE.finditer(where):
+        negated, qualifier, column, op = match.groups()
+        model_field = table.columns.get(column)
+        if qualifier not in names or model_field is None:
+            continue
+
+        if not op:
+            if isinstance(model_field, models.BooleanField) and condition is None:
+                condition = models.Q(**{model_field.name: not negated})
+            continue
+
+        op = op.upper()
+        if op == "IS":
+            # IS NULL: left to the planner (or a partial index condition)
+            continue
+        if op in ("=", "IN"):
+            if model_field.name not in equality:
+                equality.append(model_field.name)
+        elif model_field.name not in ranges:
+            ranges.append(model_field.name)
+
+    # Foreign keys first: they are what most lookups are scoped by
+    equality.sort(key=lambda name: not table.model._meta.get_field(name).is_relation)
+    return equality, ranges, condition
+
+
+def propose(statement, table_name, aliases, tables, sorted_here):
+    """
+    Returns: (model label, fields, partial index condition) or None
+    """
+    table = tables.get(table_name)
+    if table is None:
+        return None
+    names = {table_name} | {alias for alias, real in aliases.items() if real == table_name}
+
+    equality, ranges, condition = predicates(statement, table, names)
+    if table.unique([table.model._meta.get_field(name).column for name in equality]):
+        # Single-row lookup: nothing to gain
+        return None
+    fields = equality + ranges[:1]
+
+    # An index can only return rows in order after equality columns
+    if sorted_here and not ranges:
+        order_by = _ORDER_BY.search(statement.sql)
+        if order_by:
+            for qualifier, column in _ORDER_COLUMN.findall(order_by.group(1)):
+                model_field = table.columns.get(column)
+                if qualifier in names and model_field is not None and model_field.name not in fields:
+                    fields.append(model_field.name)
+
+    if not fields and condition is not None:
+        # Flag-only filter: index the column the table is joined on under
+        # the condition
+        for match in _JOIN_COLUMN.finditer(statement.sql):
+            qualifier, column = match.group(1) or match.group(3), match.group(2) or match.group(4)
+            model_field = table.columns.get(column)
+            if qualifier in names and model_field is not None and model_field.is_relation:
+                fields = [model_field.name]
+                break
+    if not fields or table.covered(fields, equality, condition):
+        return None
+    return table.model._meta.label, fields, condition
+
+
+def partial_searches(statement, searches, aliases, tables):
+    """
+    Tables searched through an index that covers fewer of the WHERE
+    clause's equality columns than it could, and isn't a unique lookup.
+    """
+    partial = []
+    for table_name, used in searches.items():
+        table = tables.get(table_name)
+        if table is None:
+            continue
+        names = {table_name} | {alias for alias, real in aliases.items() if real == table_name}
+        equality, _, _ = predicates(statement, table, names)
+        wanted = {table.model._meta.get_field(name).column for name in equality}
+
+        for columns in used:
+            if table.unique(columns):
+                continue
+            if wanted - set(columns):
+                partial.append(table_name)
+                break
+    return partial
+
+
+def audit(budgets=BUDGETS, size="large"):
+    """
+    Returns: ([Finding] for each statement with a problem, number of
+    distinct statements explained)
+    """
+    capture = StatementCapture()
+    tables = _tables()
+    findings = []
+
+    with transaction.atomic():
+        fixture = ShopFixture(*FIXTURE_SIZES[size])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        with connection.execute_wrapper(capture):
+            for budget in budgets:
+                capture.route = f"{budget.method} {budget.route}"
+                measure(budget, fixture)
+
+        for statement in capture.statements.values():
+            aliases = dict((alias, table) for table, alias in _ALIAS.findall(statement.sql))
+            try:
+                with transaction.atomic():
+                    plan = explain(statement.sql, statement.params)
+            except Exception:  # noqa: BLE001 - statements that need state the savepoint rolled back
+                continue
+
+            scans, searches, sorts = plan_problems(plan, aliases)
+            order_by = _ORDER_BY.search(statement.sql)
+            if sorts and order_by and _pk_only(order_by.group(1), aliases, tables):
+                # .first() on an unordered queryset; sorting the few matches is cheap
+                sorts = []
+            partial = partial_searches(statement, searches, aliases, tables)
+            if not scans and not partial and not sorts:
+                continue
+
+            candidates = list(dict.fromkeys(scans + partial))
+            if sorts and order_by:
+                for qualifier, _ in _ORDER_COLUMN.findall(order_by.group(1)):
+                    table_name = aliases.get(qualifier, qualifier)
+                    if table_name not in candidates:
+                        candidates.append(table_name)
+
+            proposals = []
+            for table_name in candidates:
+                proposal = propose(statement, table_name, aliases, tables, bool(sorts))
+                if proposal and proposal not in proposals:
+                    proposals.append(proposal)
+
+            findings.append(Finding(statement, plan, scans, partial, sorts, proposals))
+
+        transaction.set_rollback(True)
+
+    return findings, len(capture.statements)
+
+
+def proposals_by_model(findings):
+    """
+    Returns: {model label: {(fields, condition): set of routes}}
+    """
+    grouped = defaultdict(dict)
+    for finding in findings:
+        for label, fields, condition in finding.proposals:
+            key = (tuple(fields), condition)
+            grouped[label].setdefault(key, set()).update(finding.statement.routes)
+    return grouped
@@ -0,0 +1,467 @@
+"""
+Concurrent load test of the shopping flow over real HTTP.
+
+Each simulated shopper runs shopping trips against a server: discover a
+nearby mall, scan and add items, checkout, create a payment attempt, verify
+it and download the invoice. Shoppers run in parallel threads and start
+together, so they contend on the select_for_update paths in checkout and
+payments.
+
+Run it with `python manage.py load_test`.
+"""
+
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from malls.models import Mall
+from orders.models import Order, OrderItem
+from payments.models import Payment, PaymentAttempt
+from products.models import Product
+
+from .benchmarks import git_commit, percentile
+
+
+LOADTEST_EMAIL_DOMAIN = "loadtest.paymall.local"
+
+# Substrings of a failed response body that identify lock trouble
+LOCK_TIMEOUT_MARKERS = (
+    "database is locked",
+    "lock timeout",
+    "could not obtain lock",
+    "lock wait timeout",
+)
+DEADLOCK_MARKERS = ("deadlock",)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class GunicornServer:
+    """
+    Run the project under gunicorn on a local port for the duration of a
+    `with` block.
+    """
+
+    name = "gunicorn"
+
+    def __init__(self, *, workers=4, threads=1, port=None, timeout=30):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = os.environ.copy()
+        self.command = [
+            sys.executable, "-m", "gunicorn", "PayMall.wsgi:application",
+            "--bind", f"127.0.0.1:{self.port}",
+            "--workers", str(workers),
+            "--threads", str(threads),
+            "--timeout", "120",
+            "--log-level", "warning",
+        ]
+        self.timeout = timeout
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, cwd=settings.BASE_DIR, env=self.env)
+
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited during startup (is it installed?)")
+            try:
+                urllib.request.urlopen(f"{self.url}/api/malls/offers/", timeout=1)
+                return self
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+
+        self.__exit__()
+        raise RuntimeError(f"{self.name} did not answer within {self.timeout}s")
+
+    def __exit__(self, *exc_info):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class UvicornServer(GunicornServer):
+    """
+    The ASGI application (PayMall/asgi.py) under uvicorn, for the async views.
+    """
+
+    name = "uvicorn"
+
+    def __init__(self, *, workers=1, port=None, timeout=30):
+        super().__init__(workers=workers, port=port, timeout=timeout)
+        # Persistent connections don't suit ASGI: each request's sync work
+        # runs in its own thread, which would keep its own connection open
+        self.env.setdefault("DB_CONN_MAX_AGE", "0")
+        self.command = [
+            sys.executable, "-m", "uvicorn", "PayMall.asgi:application",
+            "--host", "127.0.0.1",
+            "--port", str(self.port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+        ]
+
+
+class Shopper:
+    def __init__(self, base_url, token, mall, products, rng, results):
+        self.base_url = base_url
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+        self.mall = mall
+        self.products = products
+        self.rng = rng
+        self.results = results
+
+    def request(self, step, method, path, data=None):
+        body = json.dumps(data).encode() if data is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=body, headers=self.headers, method=method
+        )
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=120) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+            status, payload = 0, str(e).encode()
+        elapsed = (time.perf_counter() - started) * 1000
+
+        self.results.record(step, status, elapsed, payload)
+
+        if status >= 400 or status == 0:
+            return None
+        if response_is_json(payload):
+            return json.loads(payload)
+        return {}
+
+    def trip(self, items):
+        self.request(
+            "nearby_malls", "GET",
+            f"/api/malls/nearby/?latitude={self.mall.latitude}&longitude={self.mall.longitude}",
+        )
+
+        for product in self.rng.sample(self.products, items):
+            self.request(
+                "scan", "POST", "/api/products/scan/",
+                {"barcode": product.barcode, "mall_id": str(self.mall.id)},
+            )
+            self.request(
+                "cart_add", "POST", "/api/cart/add/",
+                {"product_id": str(product.id), "quantity": 1, "response": "line"},
+            )
+
+        order = self.request("checkout", "POST", "/api/orders/checkout/", {})
+        if not order:
+            self.request("cart_clear", "DELETE", "/api/cart/clear/")
+            return
+        order_id = order["data"]["id"]
+
+        attempt = self.request(
+            "create_attempt", "POST", "/api/payments/create-attempt/", {"order_id": order_id}
+        )
+        if not attempt:
+            return
+
+        paid = self.request(
+            "verify", "POST", "/api/payments/verify/",
+            {
+                "attempt_id": attempt["data"]["attempt_id"],
+                "success": True,
+                "provider_payment_id": f"pay_{uuid.uuid4().hex[:12]}",
+            },
+        )
+        if paid:
+            self.request("invoice", "GET", f"/api/orders/{order_id}/invoice/")
+
+
+def response_is_json(payload):
+    return payload[:1] in (b"{", b"[")
+
+
+class LoadResults:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, step, status, elapsed_ms, payload):
+        text = payload[:20000].decode(errors="replace").lower() if status >= 400 or status == 0 else ""
+
+        with self.lock:
+            self.latencies[step].append(elapsed_ms)
+            self.statuses[step][status] += 1
+
+            if status == 0:
+                self.errors["connection_errors"] += 1
+            elif any(marker in text for marker in DEADLOCK_MARKERS):
+                self.errors["deadlocks"] += 1
+            elif any(marker in text for marker in LOCK_TIMEOUT_MARKERS):
+                self.errors["lock_timeouts"] += 1
+            elif status == 409:
+                self.errors["conflicts"] += 1
+            elif status >= 500:
+                self.errors["server_errors"] += 1
+            elif status >= 400:
+                self.errors["client_errors"] += 1
+
+
+def pick_mall_and_products(limit=500):
+    mall = (
+        Mall.objects.filter(is_active=True)
+        .annotate(n=Count("products", filter=Q(products__status="ACTIVE")))
+        .order_by("-n")
+        .first()
+    )
+    if not mall:
+        raise LookupError("No malls found; run generate_synthetic_data first")
+
+    products = list(
+        Product.objects.filter(
+            mall=mall, status="ACTIVE", is_available=True, stock_quantity__gte=25
+        ).only("id", "barcode")[:limit]
+    )
+    if len(products) < 10:
+        raise LookupError("Not enough products; run generate_synthetic_data first")
+
+    return mall, products
+
+
+def create_shoppers(count):
+    tag = uuid.uuid4().hex[:8]
+    users = [
+        User.objects.create_user(
+            email=f"shopper{i + 1}-{tag}@{LOADTEST_EMAIL_DOMAIN}",
+            password=None,
+            signup_source=User.SignupSource.CUSTOMER,
+        )
+        for i in range(count)
+    ]
+    return users, [str(RefreshToken.for_user(u).access_token) for u in users]
+
+
+def delete_shoppers():
+    # Payment.attempt is PROTECT, so payments have to go before their orders
+    Payment.objects.filter(order__user__email__endswith=f"@{LOADTEST_EMAIL_DOMAIN}").delete()
+    User.objects.filter(email__endswith=f"@{LOADTEST_EMAIL_DOMAIN}").delete()
+
+
+def run_load(base_url, *, shoppers=20, trips=5, items=3, seed=42):
+    """
+    Run `shoppers` concurrent shoppers for `trips` shopping trips each and
+    return a JSON-serializable report.
+    """
+    mall, products = pick_mall_and_products()
+    _, tokens = create_shoppers(shoppers)
+
+    # The shopper threads only talk HTTP; release this thread's connection
+    # so SQLite is not held open by the harness during the run
+    connection.close()
+
+    results = LoadResults()
+    start = threading.Barrier(shoppers)
+
+    def run_shopper(i):
+        shopper = Shopper(
+            base_url, tokens[i], mall, products, random.Random(seed + i), results
+        )
+        start.wait()
+        for _ in range(trips):
+            shopper.trip(items)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=shoppers) as pool:
+        list(pool.map(run_shopper, range(shoppers)))
+    duration = time.perf_counter() - started
+
+    requests = sum(len(v) for v in results.latencies.values())
+    all_latencies = sorted(x for v in results.latencies.values() for x in v)
+    completed = sum(results.statuses["invoice"][s] for s in results.statuses["invoice"] if s < 400)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "database": connection.vendor,
+            "shoppers": shoppers,
+            "trips": trips,
+            "items": items,
+            "seed": seed,
+        },
+        "duration_s": round(duration, 3),
+        "requests": requests,
+        "throughput_rps": round(requests / duration, 2),
+        "completed_trips": completed,
+        "trips_per_s": round(completed / duration, 2),
+        "latency_ms": _summary(all_latencies),
+        "steps": {
+            step: {
+                **_summary(sorted(latencies)),
+                "statuses": {str(k): v for k, v in sorted(results.statuses[step].items())},
+            }
+            for step, latencies in results.latencies.items()
+        },
+        "errors": {
+            key: results.errors[key]
+            for key in (
+                "lock_timeouts",
+                "deadlocks",
+                "conflicts",
+                "server_errors",
+                "client_errors",
+                "connection_errors",
+            )
+        },
+    }
+
+
+def _order(user, mall, products, status):
+    order = Order.objects.create(
+        user=user,
+        mall=mall,
+        order_number=f"LOAD-{uuid.uuid4().hex[:12].upper()}",
+        status=status,
+        expires_at=timezone.now() + timedelta(hours=1),
+        subtotal=Decimal("0.00"),
+        tax=Decimal("0.00"),
+        total=Decimal("0.00"),
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product=p,
+            product_name=p.name,
+            product_price=p.price,
+            product_barcode=p.barcode,
+            quantity=1,
+            total_price=p.price,
+        )
+        for p in products
+    ])
+    return order
+
+
+def run_concurrency(base_url, *, levels=(1, 8, 32, 64), duration=10.0, hold=2.0, poll_share=0.25, seed=42):
+    """
+    Concurrency one server sustains: for each level, that many clients
+    send requests back to back for `duration` seconds. A `poll_share` of
+    them long-poll the status of a payment attempt that stays pending
+    (each request is held `hold` seconds); the rest loop over the reads
+    the async views serve (product list, scan, nearby malls, offers,
+    invoice download). Returns a JSON-serializable report.
+    """
+    mall, products = pick_mall_and_products()
+    (user,), (token,) = create_shoppers(1)
+
+    lines = list(Product.objects.filter(pk__in=[p.pk for p in products[:10]]))
+    paid = _order(user, mall, lines, "PAID")
+    pending = _order(user, mall, lines[:3], "PAYMENT_PENDING")
+    attempt = PaymentAttempt.objects.create(order=pending, provider="UPI", status="PENDING")
+
+    reads = [
+        ("product_list", "GET", f"/api/products/list/?mall={mall.id}", None),
+        ("nearby_malls", "GET", f"/api/malls/nearby/?latitude={mall.latitude}&longitude={mall.longitude}", None),
+        ("offers", "GET", "/api/malls/offers/", None),
+        ("invoice", "GET", f"/api/orders/{paid.id}/invoice/", None),
+    ]
+    poll = ("payment_status", "GET", f"/api/payments/status/?attempt_id={attempt.id}&wait={hold}", None)
+
+    connection.close()
+
+    report = []
+    for clients in levels:
+        pollers = int(clients * poll_share)
+        results = LoadResults()
+        start = threading.Barrier(clients)
+
+        def run_client(i):
+            rng = random.Random(seed + i)
+            client = Shopper(base_url, token, mall, products, rng, results)
+            start.wait()
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                if i < pollers:
+                    client.request(*poll)
+                elif rng.random() < 0.2:
+                    product = rng.choice(products)
+                    client.request(
+                        "scan", "POST", "/api/products/scan/",
+                        {"barcode": product.barcode, "mall_id": str(mall.id)},
+                    )
+                else:
+                    client.request(*rng.choice(reads))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(run_client, range(clients)))
+        elapsed = time.perf_counter() - started
+
+        read_latencies = sorted(
+            x for step, v in results.latencies.items() if step != "payment_status" for x in v
+        )
+        poll_latencies = sorted(results.latencies["payment_status"])
+        report.append({
+            "clients": clients,
+            "pollers": pollers,
+            "reads_per_s": round(len(read_latencies) / elapsed, 2),
+            "read_latency_ms": _summary(read_latencies),
+            "polls_per_s": round(len(poll_latencies) / elapsed, 2),
+            "poll_latency_ms": _summary(poll_latencies),
+            "errors": {k: v for k, v in results.errors.items() if v},
+        })
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "database": connection.vendor,
+            "duration_s": duration,
+            "hold_s": hold,
+            "poll_share": poll_share,
+        },
+        "levels": report,
+    }
+
+
+def _summary(sorted_latencies):
+    if not sorted_latencies:
+        return {}
+    return {
+        "count": len(sorted_latencies),
+        "p50": round(percentile(sorted_latencies, 50), 2),
+        "p95": round(percentile(sorted_latencies, 95), 2),
+        "p99": round(percentile(sorted_latencies, 99), 2),
+        "mean": round(statistics.fmean(sorted_latencies), 2),
+        "max": round(sorted_latencies[-1], 2),
+    }
@@ -0,0 +1,36 @@
+from django.db import OperationalError, connections, transaction
+
+
+class RowLocked(Exception):
+    """
+    The row is locked by another transaction and the caller chose not to wait.
+    """
+
+
+def first_for_update_nowait(queryset, of=()):
+    """
+    Lock and return the first row of `queryset` with SELECT ... FOR UPDATE
+    NOWAIT, or raise RowLocked if another transaction holds it. `of` is
+    passed through to select_for_update, e.g. ("self",) to leave rows joined
+    by select_related unlocked.
+
+    Used where the only competitor is a duplicate of the same request (a
+    double-tapped checkout or verify), so failing fast with a 409 beats
+    tying up a worker until the first one commits. The lock attempt runs in
+    a savepoint so a refused lock leaves the outer transaction usable.
+
+    Backends without NOWAIT fall back to a plain select_for_update (a no-op
+    on SQLite) and never raise RowLocked.
+    """
+    if not connections[queryset.db].features.has_select_for_update_nowait:
+        return queryset.select_for_update(of=of).first()
+
+    try:
+        with transaction.atomic(using=queryset.db):
+            return queryset.select_for_update(nowait=True, of=of).first()
+    except OperationalError as e:
+        # PostgreSQL lock_not_available (psycopg 3 / psycopg2)
+        code = getattr(e.__cause__, "sqlstate", None) or getattr(e.__cause__, "pgcode", None)
+        if code == "55P03":
+            raise RowLocked from e
+        raise
@@ -0,0 +1,73 @@
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from common.index_audit import audit, proposals_by_model
+
+
+def _condition(q):
+    return "models.Q(" + ", ".join(f"{k}={v!r}" for k, v in q.children) + ")"
+
+
+class Command(BaseCommand):
+    help = (
+        "Run every budgeted endpoint, EXPLAIN the SQL it issues and report "
+        "full table scans and index-less sorts, with proposed composite and "
+        "partial indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plans", action="store_true", help="Print the full plan of each finding")
+
+    def handle(self, *args, **options):
+        # Same isolation as the query budget tests
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root,
+            ALLOWED_HOSTS=["testserver"],
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "index-audit",
+                }
+            },
+        ):
+            findings, explained = audit()
+
+        for finding in findings:
+            statement = finding.statement
+            routes = ", ".join(sorted(statement.routes))
+            problems = (
+                [f"full scan: {t}" for t in finding.full_scans]
+                + [f"index covers only part of the filter: {t}" for t in finding.partial_searches]
+                + [f"temp sort: {s}" for s in finding.temp_sorts]
+            )
+
+            self.stdout.write(f"\n{routes}")
+            self.stdout.write(f"  {statement.sql[:300]}{'...' if len(statement.sql) > 300 else ''}")
+            for problem in problems:
+                self.stdout.write(f"  ✗ {problem}")
+            if options["plans"]:
+                for line in finding.plan:
+                    self.stdout.write(f"    | {line}")
+            for label, fields, condition in finding.proposals:
+                self.stdout.write(f"  → {label}: {list(fields)}{f' WHERE {_condition(condition)}' if condition else ''}")
+
+        self.stdout.write(
+            f"\n{connection.vendor}: {explained} distinct statements, {len(findings)} with a problem"
+        )
+
+        grouped = proposals_by_model(findings)
+        if not grouped:
+            self.stdout.write("No indexes to propose")
+            return
+
+        self.stdout.write("\nProposed indexes:")
+        for label, proposals in sorted(grouped.items()):
+            self.stdout.write(f"  {label}")
+            for (fields, condition), routes in proposals.items():
+                index = f"models.Index(fields={list(fields)!r}"
+                if condition is not None:
+                    index += f", condition={_condition(condition)}"
+                self.stdout.write(f"    {index})  # {len(routes)} route(s)")
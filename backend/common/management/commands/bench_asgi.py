@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.loadtest import GunicornServer, UvicornServer, delete_shoppers, run_concurrency
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how much concurrency one worker sustains on the async "
+        "endpoints: a gunicorn sync worker (WSGI) against a uvicorn worker "
+        "(ASGI), at increasing client counts with a share of payment status "
+        "long-polls. Reports JSON. Uses the configured database; run "
+        "generate_synthetic_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--levels", default="1,8,32,64",
+            help="Comma-separated concurrent client counts",
+        )
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+        parser.add_argument("--hold", type=float, default=2.0, help="Long-poll wait in seconds")
+        parser.add_argument(
+            "--poll-share", type=float, default=0.25,
+            help="Share of the clients that long-poll the payment status",
+        )
+        parser.add_argument("--threads", type=int, default=1, help="Threads of the gunicorn sync worker")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--wsgi-url", help="Target an already running WSGI server")
+        parser.add_argument("--asgi-url", help="Target an already running ASGI server")
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(n) for n in options["levels"].split(",") if n]
+        except ValueError:
+            raise CommandError("--levels takes comma-separated integers")
+
+        load = dict(
+            levels=levels,
+            duration=options["duration"],
+            hold=options["hold"],
+            poll_share=options["poll_share"],
+            seed=options["seed"],
+        )
+
+        servers = {
+            "wsgi": (options["wsgi_url"], lambda: GunicornServer(workers=1, threads=options["threads"])),
+            "asgi": (options["asgi_url"], lambda: UvicornServer(workers=1)),
+        }
+
+        report = {}
+        try:
+            for name, (url, start_server) in servers.items():
+                if url:
+                    report[name] = run_concurrency(url.rstrip("/"), **load)
+                else:
+                    with start_server() as server:
+                        report[name] = run_concurrency(server.url, **load)
+                    report[name]["meta"]["server"] = server.name
+                delete_shoppers()
+        except (LookupError, RuntimeError) as e:
+            raise CommandError(str(e))
+        finally:
+            delete_shoppers()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,111 @@
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from common import compression
+from common.benchmarks import FlowContext, percentile
+from orders.models import Order
+
+
+def endpoints(ctx):
+    mall = str(ctx.mall.id)
+    return {
+        "product_list": ("/api/products/list/", {"mall": mall}),
+        "nearby_malls": (
+            "/api/malls/nearby/",
+            {"latitude": ctx.mall.latitude, "longitude": ctx.mall.longitude},
+        ),
+        "cart": ("/api/cart/", {}),
+        "order_list": ("/api/orders/list/", {}),
+        "invoice_data": (f"/api/orders/{ctx.paid_order.id}/invoice-data/", {}),
+        "invoice_pdf": (f"/api/orders/{ctx.paid_order.id}/invoice/", {}),
+    }
+
+
+def body(response):
+    if response.streaming:
+        return b"".join(response.streaming_content)
+    return response.content
+
+
+class Command(BaseCommand):
+    help = (
+        "Bytes saved and CPU cost of CompressionMiddleware per endpoint: each "
+        "response is fetched uncompressed, then compressed with gzip and "
+        "Brotli at the configured levels. The last column is what the "
+        "middleware actually serves to a client sending "
+        "`Accept-Encoding: br, gzip`. Runs in a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--orders", type=int, default=50, help="Order history length for order_list")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        encoders = compression.available_encoders()
+        if "br" not in encoders:
+            self.stdout.write("brotli is not installed: only gzip is negotiated")
+
+        self.stdout.write(
+            f"{'endpoint':<14} {'raw':>9} "
+            + "".join(f"{name:>8} {'saved':>6} {'ms':>6} " for name in encoders)
+            + f"{'served':>8}"
+        )
+
+        with override_settings(ALLOWED_HOSTS=["testserver"]), transaction.atomic():
+            try:
+                ctx = FlowContext(random.Random(options["seed"]))
+            except LookupError as e:
+                raise CommandError(str(e))
+            self._order_history(ctx, options["orders"])
+
+            for name, (path, params) in endpoints(ctx).items():
+                response = ctx.client.get(path, params)
+                if response.status_code != 200:
+                    raise CommandError(f"{name}: {path} returned {response.status_code}")
+                raw = body(response)
+
+                row = f"{name:<14} {self._size(len(raw)):>9} "
+                for encoder in encoders.values():
+                    compressed = encoder.compress(raw)
+                    saved = 100 * (1 - len(compressed) / len(raw))
+                    ms = self._time(encoder.compress, raw, options["repeat"])
+                    row += f"{self._size(len(compressed)):>8} {saved:>5.0f}% {ms:>6.2f} "
+
+                served = ctx.client.get(path, params, HTTP_ACCEPT_ENCODING="br, gzip")
+                body(served)
+                row += f"{served.get('Content-Encoding', 'identity'):>8}"
+                self.stdout.write(row)
+
+            transaction.set_rollback(True)
+
+    def _order_history(self, ctx, count):
+        Order.objects.bulk_create([
+            Order(
+                user=ctx.shopper,
+                mall=ctx.mall,
+                order_number=f"BENCH-{uuid.uuid4().hex[:12].upper()}",
+                status="PAID",
+                subtotal=Decimal("100.00"),
+                tax=Decimal("18.00"),
+                total=Decimal("118.00"),
+            )
+            for _ in range(count)
+        ])
+
+    def _size(self, n):
+        return f"{n / 1024:.1f} KB" if n >= 1024 else f"{n} B"
+
+    def _time(self, compress, data, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            compress(data)
+            timings.append((time.perf_counter() - started) * 1000)
+        return percentile(sorted(timings), 50)
@@ -0,0 +1,70 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from common.benchmarks import FLOWS, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot shopping flows in-process and report p50/p95/p99 "
+        "latency and queries per op as JSON. Run generate_synthetic_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flows", nargs="+", choices=list(FLOWS), default=list(FLOWS))
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write the JSON report to this file")
+        parser.add_argument("--baseline", help="Earlier report to compare against")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root,
+            ALLOWED_HOSTS=["testserver"],
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "bench-flows",
+                }
+            },
+        ):
+            try:
+                report = run_benchmarks(
+                    options["flows"],
+                    iterations=options["iterations"],
+                    warmup=options["warmup"],
+                    seed=options["seed"],
+                )
+            except (LookupError, RuntimeError) as e:
+                raise CommandError(str(e))
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            self._compare(baseline, report)
+
+    def _compare(self, baseline, report):
+        self.stderr.write(f"compared with {baseline['meta'].get('commit')}:")
+        self.stderr.write(f"  {'flow':<16} {'p50':>8} {'p95':>8} {'queries':>8}")
+
+        for name, current in report["flows"].items():
+            before = baseline["flows"].get(name)
+            if not before:
+                continue
+            self.stderr.write(
+                f"  {name:<16} "
+                f"{current['p50_ms'] / before['p50_ms']:>7.2f}x "
+                f"{current['p95_ms'] / before['p95_ms']:>7.2f}x "
+                f"{current['queries_per_op'] - before['queries_per_op']:>+8.1f}"
+            )
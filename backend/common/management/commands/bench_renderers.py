@@ -0,0 +1,114 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from common import renderers
+from common.benchmarks import percentile
+from common.responses import success_response
+from malls.models import Mall
+from products.models import Category, Product
+from products.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer with common.renderers.FastJSONRenderer on "
+        "product-list envelopes, and check both produce the same bytes. "
+        "Payloads are built in memory; no database access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write("orjson is not installed: FastJSONRenderer falls back to DRF's renderer")
+
+        rng = random.Random(options["seed"])
+        products = self._products(options["products"], rng)
+
+        payloads = {
+            # ProductSerializer output: Decimals already strings, FK ids as UUIDs
+            "serialized": success_response(
+                message="Products fetched successfully",
+                data=ProductSerializer(products, many=True).data,
+            ).data,
+            # values()-style rows: raw Decimal, UUID and datetime values
+            "raw rows": success_response(
+                message="Products fetched successfully",
+                data=[
+                    {
+                        "id": p.id,
+                        "name": p.name,
+                        "barcode": p.barcode,
+                        "price": p.price,
+                        "marked_price": p.marked_price,
+                        "discount_percentage": p.discount_percentage,
+                        "category": p.category_id,
+                        "mall": p.mall_id,
+                        "stock_quantity": p.stock_quantity,
+                        "is_available": p.is_available,
+                        "created_at": p.created_at,
+                    }
+                    for p in products
+                ],
+            ).data,
+        }
+
+        drf, fast = JSONRenderer(), renderers.FastJSONRenderer()
+
+        self.stdout.write(
+            f"{'payload':<12} {'size':>10} {'drf p50':>10} {'fast p50':>10} {'speedup':>8}"
+        )
+        for name, payload in payloads.items():
+            expected = drf.render(payload)
+            if fast.render(payload) != expected:
+                raise CommandError(f"{name}: FastJSONRenderer output differs from JSONRenderer")
+
+            drf_p50 = self._time(drf.render, payload, options["repeat"])
+            fast_p50 = self._time(fast.render, payload, options["repeat"])
+
+            self.stdout.write(
+                f"{name:<12} {len(expected) / 1024:>7.0f} KB "
+                f"{drf_p50:>7.2f} ms {fast_p50:>7.2f} ms {drf_p50 / fast_p50:>7.1f}x"
+            )
+
+    def _products(self, count, rng):
+        mall = Mall(id=uuid.uuid4(), name="Benchmark Mall")
+        categories = [Category(id=uuid.UUID(int=rng.getrandbits(128)), name=f"Category {i}") for i in range(20)]
+        now = timezone.now()
+
+        products = []
+        for i in range(count):
+            price = Decimal(rng.randrange(1000, 500000)) / 100
+            products.append(Product(
+                id=uuid.UUID(int=rng.getrandbits(128)),
+                name=f"Product {i} – {rng.choice(['Atta', 'Dal', 'Soap', 'Chai', 'Ghee'])}",
+                barcode=f"890{i:010d}",
+                description="Synthetic product used for renderer benchmarks",
+                price=price,
+                marked_price=price + Decimal("10.00"),
+                discount_percentage=Decimal("5.00"),
+                category=rng.choice(categories),
+                mall=mall,
+                stock_quantity=rng.randrange(0, 500),
+                is_available=True,
+                created_at=now - timedelta(minutes=i),
+            ))
+        return products
+
+    def _time(self, render, payload, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render(payload)
+            timings.append((time.perf_counter() - started) * 1000)
+        return percentile(sorted(timings), 50)
@@ -0,0 +1,188 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from accounts.models import User
+from common.benchmarks import percentile
+from malls.models import Mall
+from orders.models import Order, OrderItem
+from products.models import Product
+
+
+PROFILES = {
+    "default": {},
+    "tuned": settings.SQLITE_TUNING_OPTIONS,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SQLite with default settings against the tuned profile "
+        "(settings.SQLITE_TUNING_OPTIONS) under concurrent checkout-style "
+        "writes and catalog reads. Each profile runs on a fresh temporary "
+        "database file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--ops", type=int, default=50, help="Operations per thread")
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'profile':<8} {'writes/s':>9} {'reads/s':>9} "
+            f"{'write p95':>10} {'read p95':>10} {'locked':>7}"
+        )
+
+        for name in options["profiles"]:
+            with tempfile.TemporaryDirectory() as tmp:
+                alias = f"bench_{name}"
+                connections.settings[alias] = {
+                    **connections.settings["default"],
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": os.path.join(tmp, "bench.sqlite3"),
+                    "OPTIONS": PROFILES[name],
+                    "TEST": {},
+                }
+                try:
+                    call_command("migrate", database=alias, verbosity=0)
+                    result = self._run(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.settings[alias]
+
+            self.stdout.write(
+                f"{name:<8} {result['writes_per_s']:>9.1f} {result['reads_per_s']:>9.1f} "
+                f"{result['write_p95_ms']:>7.1f} ms {result['read_p95_ms']:>7.1f} ms "
+                f"{result['locked']:>7}"
+            )
+
+    def _run(self, alias, options):
+        # bulk_create so accounts.signals (which write to "default") don't fire
+        user = User.objects.using(alias).bulk_create([
+            User(
+                email=f"bench-{uuid.uuid4().hex[:8]}@paymall.local",
+                signup_source=User.SignupSource.CUSTOMER,
+            )
+        ])[0]
+        mall = Mall.objects.using(alias).create(
+            name="Benchmark Mall", address="1 Benchmark Road", latitude=0.0, longitude=0.0
+        )
+        products = Product.objects.using(alias).bulk_create([
+            Product(
+                name=f"Benchmark product {i}",
+                barcode=f"BENCH{i:08d}",
+                price=Decimal("118.00"),
+                marked_price=Decimal("130.00"),
+                mall=mall,
+                stock_quantity=1_000_000,
+                status="ACTIVE",
+                gst_rate=Decimal("18.00"),
+            )
+            for i in range(options["products"])
+        ])
+
+        lock = threading.Lock()
+        write_times, read_times = [], []
+        locked = [0]
+        start = threading.Barrier(options["writers"] + options["readers"])
+
+        def checkout(n):
+            # Read-then-write, like OrderCheckoutView: the read takes a
+            # shared lock that has to be upgraded for the writes
+            picked = [products[(n * 7 + k) % len(products)] for k in range(3)]
+            with transaction.atomic(using=alias):
+                rows = list(
+                    Product.objects.using(alias)
+                    .filter(id__in=[p.id for p in picked])
+                    .values_list("id", "price")
+                )
+                order = Order.objects.using(alias).create(
+                    user=user,
+                    mall=mall,
+                    order_number=f"BENCH-{uuid.uuid4().hex[:12].upper()}",
+                    subtotal=Decimal("300.00"),
+                    tax=Decimal("54.00"),
+                    total=Decimal("354.00"),
+                )
+                OrderItem.objects.using(alias).bulk_create([
+                    OrderItem(
+                        order=order,
+                        product_id=product_id,
+                        product_name="Benchmark product",
+                        product_price=price,
+                        product_barcode="BENCH",
+                        quantity=1,
+                        gst_rate=Decimal("18.00"),
+                        taxable_value=Decimal("100.00"),
+                        tax_amount=Decimal("18.00"),
+                        cgst_amount=Decimal("9.00"),
+                        sgst_amount=Decimal("9.00"),
+                        total_price=price,
+                    )
+                    for product_id, price in rows
+                ])
+                Product.objects.using(alias).filter(
+                    id__in=[product_id for product_id, _ in rows]
+                ).update(stock_quantity=F("stock_quantity") - 1)
+
+        def browse(n):
+            list(
+                Product.objects.using(alias)
+                .filter(mall=mall, status="ACTIVE")
+                .values("id", "name", "price", "stock_quantity")[:50]
+            )
+
+        def worker(op, timings, seed):
+            start.wait()
+            try:
+                for i in range(options["ops"]):
+                    started = time.perf_counter()
+                    try:
+                        op(seed * options["ops"] + i)
+                    except OperationalError:
+                        with lock:
+                            locked[0] += 1
+                        continue
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        timings.append(elapsed)
+            finally:
+                connections[alias].close()
+
+        threads = [
+            threading.Thread(target=worker, args=(checkout, write_times, i))
+            for i in range(options["writers"])
+        ] + [
+            threading.Thread(target=worker, args=(browse, read_times, i))
+            for i in range(options["readers"])
+        ]
+
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duration = time.perf_counter() - started
+
+        write_times.sort()
+        read_times.sort()
+        return {
+            "writes_per_s": len(write_times) / duration,
+            "reads_per_s": len(read_times) / duration,
+            "write_p95_ms": percentile(write_times, 95) if write_times else 0.0,
+            "read_p95_ms": percentile(read_times, 95) if read_times else 0.0,
+            "locked": locked[0],
+        }
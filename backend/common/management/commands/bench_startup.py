@@ -0,0 +1,117 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# What a worker does before its first request: load the app, then the
+# URLconf (every view module). `eager` modules are imported on top, to show
+# the cost they would add if loaded at startup again
+PROBE = """
+import importlib, json, os, resource, sys, time
+
+started = time.perf_counter()
+
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+
+get_wsgi_application()
+get_resolver().url_patterns
+for name in {eager!r}:
+    importlib.import_module(name)
+
+ready = time.perf_counter() - started
+
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss_kb //= 1024
+
+print(json.dumps({{
+    "ready_ms": ready * 1000,
+    "rss_kb": rss_kb,
+    "modules": len(sys.modules),
+    "heavy": sorted(name for name in {heavy!r} if name in sys.modules),
+}}))
+"""
+
+# Dependencies that should only load when a request needs them
+HEAVY_MODULES = ("reportlab", "PIL")
+
+# The invoice renderer, as orders/views.py imported it before it was lazy
+EAGER_RENDERER = ("orders.invoice_pdf",)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker cold start: time from a fresh interpreter to a loaded "
+        "app and URLconf, and peak RSS, with the invoice renderer loaded "
+        "lazily (as deployed) and eagerly (as before)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=10, help="Fresh processes per variant")
+        parser.add_argument(
+            "--eager",
+            nargs="*",
+            default=list(EAGER_RENDERER),
+            help="Modules the eager variant imports at startup",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        variants = {"lazy": [], "eager": options["eager"]}
+
+        report = {
+            "meta": {
+                "python": sys.version.split()[0],
+                "runs": options["runs"],
+                "eager_modules": options["eager"],
+            },
+        }
+        for name, eager in variants.items():
+            samples = [self._probe(eager) for _ in range(options["runs"])]
+            report[name] = {
+                "process_ms": self._median(samples, "process_ms"),
+                "ready_ms": self._median(samples, "ready_ms"),
+                "rss_mb": round(statistics.median(s["rss_kb"] for s in samples) / 1024, 1),
+                "modules": samples[0]["modules"],
+                "heavy_loaded": samples[0]["heavy"],
+            }
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def _probe(self, eager):
+        env = os.environ.copy()
+        env.setdefault("DJANGO_SETTINGS_MODULE", "PayMall.settings")
+
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(eager=tuple(eager), heavy=HEAVY_MODULES)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - started
+
+        if result.returncode != 0:
+            raise CommandError(f"Startup probe failed:\n{result.stderr}")
+
+        # Apps may print while loading; the probe's JSON is the last line
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample["process_ms"] = elapsed * 1000
+        return sample
+
+    @staticmethod
+    def _median(samples, key):
+        return round(statistics.median(s[key] for s in samples), 1)
@@ -0,0 +1,170 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from malls.models import Mall
+from malls.projections import MALL_LIST
+from malls.serializers import MallSerializer
+from orders.models import Order
+from orders.projections import ORDER_LIST
+from orders.serializers import OrderListSerializer
+from products.models import Category, Product
+from products.projections import CATEGORY_LIST, PRODUCT_LIST
+from products.serializers import CategorySerializer, ProductSerializer
+
+
+def _distance(i):
+    return round(i * 137.5 + 0.125, 2)
+
+
+def products(request, limit):
+    qs = Product.objects.order_by("id")[:limit]
+    return (
+        ProductSerializer(qs, many=True, context={"request": request}).data,
+        lambda: PRODUCT_LIST.serialize(qs, request=request),
+    )
+
+
+def categories(request, limit):
+    qs = Category.objects.annotate(product_count=Count("products")).order_by("name")[:limit]
+    return (
+        CategorySerializer(qs, many=True, context={"request": request}).data,
+        lambda: CATEGORY_LIST.serialize(qs, request=request),
+    )
+
+
+def malls(request, limit):
+    qs = Mall.objects.order_by("id")[:limit]
+
+    objects = list(qs)
+    for i, mall in enumerate(objects):
+        mall.distance = _distance(i)
+
+    def projected():
+        rows = []
+        for i, row in enumerate(MALL_LIST.values(qs)):
+            row = MALL_LIST.row(row, request)
+            row["distance"] = _distance(i)
+            rows.append(row)
+        return rows
+
+    return MallSerializer(objects, many=True, context={"request": request}).data, projected
+
+
+def orders(request, limit):
+    qs = Order.objects.order_by("-created_at", "-id")
+    return (
+        OrderListSerializer(qs.select_related("mall")[:limit], many=True).data,
+        lambda: [ORDER_LIST.row(r) for r in ORDER_LIST.values(qs)[:limit]],
+    )
+
+
+CONTRACTS = {
+    "products": products,
+    "categories": categories,
+    "malls": malls,
+    "orders": orders,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Contract check for the read projections: render each list with the "
+        "serializer it replaces and with the projection, and fail unless the "
+        "JSON is byte-identical. Runs over the rows in the database plus "
+        "edge-case rows (nulls, images, deleted malls) created in a "
+        "rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=5000, help="Rows per contract")
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get("/")
+        renderer = JSONRenderer()
+        failures = []
+
+        self.stdout.write(f"{'contract':<12} {'rows':>6} {'serializer':>11} {'projection':>11}")
+
+        with override_settings(ALLOWED_HOSTS=["testserver"]), transaction.atomic():
+            self._edge_cases()
+
+            for name, contract in CONTRACTS.items():
+                started = time.perf_counter()
+                expected, projected = contract(request, options["limit"])
+                old_ms = (time.perf_counter() - started) * 1000
+
+                started = time.perf_counter()
+                actual = projected()
+                new_ms = (time.perf_counter() - started) * 1000
+
+                self.stdout.write(f"{name:<12} {len(expected):>6} {old_ms:>8.1f} ms {new_ms:>8.1f} ms")
+
+                if renderer.render(expected) != renderer.render(actual):
+                    failures.append(name)
+                    for old, new in zip(expected, actual):
+                        if renderer.render(old) != renderer.render(new):
+                            self.stdout.write(f"  first difference:\n    serializer: {dict(old)}\n    projection: {new}")
+                            break
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"Projection output differs for: {', '.join(failures)}")
+
+    def _edge_cases(self):
+        tag = uuid.uuid4().hex[:8]
+        mall = Mall.objects.create(
+            name=f"Contract Mall {tag}",
+            address="1 Contract Road",
+            latitude=0.0,
+            longitude=0.0,
+            image="mall_images/contract.png",
+        )
+        category = Category.objects.create(
+            name=f"Contract {tag}",
+            image="category_images/contract.png",
+        )
+        Product.objects.create(
+            name="Uncategorised ünïcode product",
+            barcode=f"CONTRACT-{tag}-1",
+            description=None,
+            price=Decimal("0.50"),
+            marked_price=Decimal("1"),
+            mall=mall,
+            category=None,
+            image="product_images/contract.png",
+        )
+        Product.objects.create(
+            name="Categorised product",
+            barcode=f"CONTRACT-{tag}-2",
+            description="",
+            price=Decimal("99999999.99"),
+            marked_price=Decimal("99999999.99"),
+            discount_percentage=Decimal("12.5"),
+            mall=mall,
+            category=category,
+            stock_quantity=7,
+        )
+
+        user = User.objects.create_user(
+            email=f"contract-{tag}@paymall.local",
+            password=None,
+            signup_source=User.SignupSource.CUSTOMER,
+        )
+        Order.objects.create(
+            user=user,
+            mall=None,
+            order_number=f"CONTRACT-{tag}",
+            subtotal=Decimal("0"),
+            tax=Decimal("0"),
+            total=Decimal("10.5"),
+        )
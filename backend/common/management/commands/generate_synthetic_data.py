@@ -0,0 +1,390 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Profile, User, UserRole
+from cart.models import Cart, CartItem
+from cart.utils import split_gst_inclusive
+from malls.models import Mall, MallStaff
+from orders.models import Order, OrderItem
+from payments.models import Payment, PaymentAttempt
+from products import category_counts
+from products.models import Category, Product
+
+
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.paymall.local"
+SYNTHETIC_MALL_PREFIX = "Synthetic"
+SYNTHETIC_CATEGORY_SLUG_PREFIX = "synthetic-"
+
+CITIES = [
+    ("Bengaluru", 12.9716, 77.5946),
+    ("Mumbai", 19.0760, 72.8777),
+    ("Delhi", 28.6139, 77.2090),
+    ("Chennai", 13.0827, 80.2707),
+    ("Hyderabad", 17.3850, 78.4867),
+    ("Pune", 18.5204, 73.8567),
+    ("Kolkata", 22.5726, 88.3639),
+]
+
+# (category, GST slab, HSN code)
+CATEGORY_SLABS = [
+    ("Fresh Produce", "0.00", "0702"),
+    ("Staples", "5.00", "1006"),
+    ("Dairy", "5.00", "0401"),
+    ("Snacks", "12.00", "1905"),
+    ("Beverages", "12.00", "2202"),
+    ("Apparel", "12.00", "6109"),
+    ("Personal Care", "18.00", "3305"),
+    ("Home Care", "18.00", "3402"),
+    ("Electronics", "18.00", "8517"),
+    ("Footwear", "18.00", "6403"),
+    ("Furniture", "18.00", "9403"),
+    ("Luxury", "28.00", "7113"),
+]
+
+# (status, weight)
+ORDER_STATUSES = [
+    ("PAID", 70),
+    ("FULFILLED", 15),
+    ("EXPIRED", 7),
+    ("CANCELLED", 5),
+    ("PAYMENT_PENDING", 3),
+]
+
+
+def ean13(n):
+    """
+    EAN-13 barcode in the Indian GS1 prefix (890) with a valid check digit.
+    """
+    body = f"890{n:09d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic malls, categories, products, users, carts and "
+        "order history for benchmarking. Rows are tagged so --flush can "
+        "remove them again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--malls", type=int, default=25)
+        parser.add_argument("--categories", type=int, default=len(CATEGORY_SLABS))
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--customers", type=int, default=5_000)
+        parser.add_argument("--carts", type=int, default=1_000)
+        parser.add_argument("--orders", type=int, default=20_000)
+        parser.add_argument("--days", type=int, default=365, help="Order history span")
+        parser.add_argument("--batch-size", type=int, default=2_000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete previously generated synthetic data first",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        if options["flush"]:
+            self._timed("flush", self._flush)
+        elif Mall.objects.filter(name__startswith=SYNTHETIC_MALL_PREFIX).exists():
+            raise CommandError("Synthetic data already exists; pass --flush to regenerate")
+
+        malls = self._timed("malls", self._malls, options["malls"])
+        categories = self._timed("categories", self._categories, options["categories"])
+        catalog = self._timed("products", self._products, malls, categories, options["products"])
+        # bulk_create skips products.signals, so the category counts are rebuilt here
+        self._timed("counts", category_counts.rebuild)
+        customers = self._timed("users", self._users, malls, options["customers"])
+        self._timed("carts", self._carts, customers, catalog, options["carts"])
+        self._timed("orders", self._orders, customers, catalog, options["orders"], options["days"])
+
+    def _timed(self, label, fn, *args):
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = fn(*args)
+        self.stdout.write(f"{label:<12} {time.perf_counter() - started:8.1f} s")
+        return result
+
+    def _flush(self):
+        # Payment.attempt is PROTECT, so payments have to go before their orders
+        Payment.objects.filter(order__user__email__endswith=f"@{SYNTHETIC_EMAIL_DOMAIN}").delete()
+        User.objects.filter(email__endswith=f"@{SYNTHETIC_EMAIL_DOMAIN}").delete()
+        Mall.objects.filter(name__startswith=SYNTHETIC_MALL_PREFIX).delete()
+        Category.objects.filter(slug__startswith=SYNTHETIC_CATEGORY_SLUG_PREFIX).delete()
+
+    def _malls(self, count):
+        malls = []
+        for i in range(count):
+            city, lat, lng = CITIES[i % len(CITIES)]
+            malls.append(Mall(
+                name=f"{SYNTHETIC_MALL_PREFIX} {city} Mall {i + 1}",
+                address=f"{i + 1} Synthetic Road, {city}",
+                latitude=lat + self.rng.uniform(-0.15, 0.15),
+                longitude=lng + self.rng.uniform(-0.15, 0.15),
+            ))
+        return Mall.objects.bulk_create(malls)
+
+    def _categories(self, count):
+        categories = []
+        for i in range(count):
+            name, gst_rate, hsn_code = CATEGORY_SLABS[i % len(CATEGORY_SLABS)]
+            if i >= len(CATEGORY_SLABS):
+                name = f"{name} {i // len(CATEGORY_SLABS) + 1}"
+
+            category = Category(
+                name=name,
+                slug=f"{SYNTHETIC_CATEGORY_SLUG_PREFIX}{i + 1}",
+            )
+            category.gst_rate = Decimal(gst_rate)
+            category.hsn_code = hsn_code
+            categories.append(category)
+
+        # bulk_create returns the same instances, so the slab stays attached
+        return Category.objects.bulk_create(categories)
+
+    def _products(self, malls, categories, count):
+        """
+        Returns {mall_id: [(id, name, barcode, hsn, price, gst_rate), ...]}.
+        """
+        catalog = {mall.id: [] for mall in malls}
+        batch = []
+
+        def flush():
+            for p in Product.objects.bulk_create(batch):
+                catalog[p.mall_id].append(
+                    (p.id, p.name, p.barcode, p.hsn_code, p.price, p.gst_rate)
+                )
+            batch.clear()
+
+        for n in range(count):
+            mall = malls[n % len(malls)]
+            category = categories[self.rng.randrange(len(categories))]
+            price = Decimal(self.rng.randrange(1000, 500000)) / 100
+            marked = (price * Decimal(self.rng.choice(["1.00", "1.05", "1.10", "1.25"]))).quantize(Decimal("0.01"))
+
+            batch.append(Product(
+                name=f"{category.name} item {n + 1}",
+                barcode=ean13(n + 1),
+                description=f"Synthetic {category.name.lower()} product",
+                price=price,
+                marked_price=marked,
+                discount_percentage=((marked - price) / marked * 100).quantize(Decimal("0.01")),
+                category=category,
+                mall=mall,
+                stock_quantity=self.rng.choice([0, 3, 8, 25, 60, 150, 500]),
+                is_available=self.rng.random() > 0.03,
+                gst_rate=category.gst_rate,
+                hsn_code=category.hsn_code,
+                status="ACTIVE" if self.rng.random() > 0.05 else "PENDING_APPROVAL",
+            ))
+
+            if len(batch) >= self.batch_size:
+                flush()
+
+        if batch:
+            flush()
+
+        return catalog
+
+    def _users(self, malls, customers):
+        # Hashing a real password per user would dominate the run
+        password = make_password(None)
+
+        users = [
+            User(
+                email=f"customer{i + 1}@{SYNTHETIC_EMAIL_DOMAIN}",
+                password=password,
+                signup_source=User.SignupSource.CUSTOMER,
+                is_active=True,
+            )
+            for i in range(customers)
+        ]
+        admins = [
+            User(
+                email=f"mall-admin{i + 1}@{SYNTHETIC_EMAIL_DOMAIN}",
+                password=password,
+                signup_source=User.SignupSource.MANAGEMENT,
+                is_active=True,
+                is_approved=True,
+            )
+            for i in range(len(malls))
+        ]
+        master = User(
+            email=f"master@{SYNTHETIC_EMAIL_DOMAIN}",
+            password=password,
+            signup_source=User.SignupSource.MANAGEMENT,
+            is_active=True,
+            is_approved=True,
+        )
+
+        # bulk_create skips accounts.signals, so profiles and roles are added here
+        created = User.objects.bulk_create(users + admins + [master], batch_size=self.batch_size)
+        customers, admins, master = created[:customers], created[customers:-1], created[-1]
+
+        Profile.objects.bulk_create(
+            [Profile(user=u, full_name=u.email.split("@")[0]) for u in created],
+            batch_size=self.batch_size,
+        )
+        UserRole.objects.bulk_create(
+            [UserRole(user=u, role=UserRole.Role.CUSTOMER) for u in customers]
+            + [UserRole(user=u, role=UserRole.Role.MALL_ADMIN) for u in admins]
+            + [UserRole(user=master, role=UserRole.Role.MASTER_ADMIN)],
+            batch_size=self.batch_size,
+        )
+        MallStaff.objects.bulk_create([
+            MallStaff(user=admin, mall=mall, role="MALL_ADMIN")
+            for admin, mall in zip(admins, malls)
+        ])
+
+        return customers
+
+    def _carts(self, customers, catalog, count):
+        mall_ids = [mall_id for mall_id, products in catalog.items() if products]
+        shoppers = self.rng.sample(customers, min(count, len(customers)))
+
+        carts = Cart.objects.bulk_create(
+            [Cart(user=u, mall_id=self.rng.choice(mall_ids), status="ACTIVE") for u in shoppers],
+            batch_size=self.batch_size,
+        )
+
+        items = []
+        for cart in carts:
+            products = catalog[cart.mall_id]
+            for product in self.rng.sample(products, min(self.rng.randint(1, 15), len(products))):
+                items.append(CartItem(cart=cart, product_id=product[0], quantity=self.rng.randint(1, 3)))
+
+        CartItem.objects.bulk_create(items, batch_size=self.batch_size)
+
+    def _orders(self, customers, catalog, count, days):
+        mall_ids = [mall_id for mall_id, products in catalog.items() if products]
+        statuses, weights = zip(*ORDER_STATUSES)
+        now = timezone.now()
+
+        for start in range(0, count, self.batch_size):
+            orders, lines = [], []
+
+            for n in range(start, min(start + self.batch_size, count)):
+                mall_id = self.rng.choice(mall_ids)
+                products = catalog[mall_id]
+                picked = self.rng.sample(products, min(self.rng.randint(1, 8), len(products)))
+
+                rows = []
+                for product_id, name, barcode, hsn, price, gst_rate in picked:
+                    quantity = self.rng.randint(1, 4)
+                    taxable, gst, cgst, sgst = split_gst_inclusive(price, gst_rate)
+                    rows.append(OrderItem(
+                        product_id=product_id,
+                        product_name=name,
+                        product_price=price,
+                        product_barcode=barcode,
+                        hsn_code=hsn or "",
+                        quantity=quantity,
+                        gst_rate=gst_rate,
+                        taxable_value=taxable * quantity,
+                        tax_amount=gst * quantity,
+                        cgst_amount=cgst * quantity,
+                        sgst_amount=sgst * quantity,
+                        total_price=price * quantity,
+                    ))
+
+                created_at = now - timedelta(seconds=self.rng.randrange(days * 86400))
+                status = self.rng.choices(statuses, weights)[0]
+
+                order = Order(
+                    user=self.rng.choice(customers),
+                    mall_id=mall_id,
+                    order_number=f"SYN-{n + 1:010d}",
+                    status=status,
+                    subtotal=sum(r.taxable_value for r in rows),
+                    tax=sum(r.tax_amount for r in rows),
+                    cgst=sum(r.cgst_amount for r in rows),
+                    sgst=sum(r.sgst_amount for r in rows),
+                    total=sum(r.total_price for r in rows),
+                    expires_at=created_at + timedelta(minutes=15),
+                    is_exited=status == "FULFILLED",
+                )
+                order.synthetic_created_at = created_at
+                orders.append(order)
+                lines.append(rows)
+
+            orders = Order.objects.bulk_create(orders)
+
+            # auto_now_add overwrote the timestamps; bulk_update writes them as given
+            for order in orders:
+                order.created_at = order.updated_at = order.synthetic_created_at
+            Order.objects.bulk_update(orders, ["created_at", "updated_at"], batch_size=500)
+
+            items = []
+            for order, rows in zip(orders, lines):
+                for row in rows:
+                    row.order = order
+                    items.append(row)
+            OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+
+            self._payments(orders)
+
+    def _payments(self, orders):
+        attempts, paid = [], []
+
+        for order in orders:
+            attempt_no = 1
+
+            if order.status in ("PAID", "FULFILLED", "EXPIRED", "CANCELLED") and self.rng.random() < 0.15:
+                attempts.append(PaymentAttempt(
+                    order=order,
+                    provider="UPI",
+                    status="FAILED",
+                    attempt_no=attempt_no,
+                    amount=order.total,
+                    provider_order_id=f"SYN_{order.order_number}_{attempt_no}",
+                    failure_reason="Payment declined",
+                ))
+                attempt_no += 1
+
+            if order.status in ("PAID", "FULFILLED"):
+                attempt = PaymentAttempt(
+                    order=order,
+                    provider=self.rng.choice(["UPI", "UPI", "CARD", "RAZORPAY"]),
+                    status="SUCCESS",
+                    attempt_no=attempt_no,
+                    amount=order.total,
+                    provider_order_id=f"SYN_{order.order_number}_{attempt_no}",
+                    provider_payment_id=f"pay_{order.order_number}",
+                )
+                attempts.append(attempt)
+                paid.append(attempt)
+            elif order.status == "PAYMENT_PENDING":
+                attempts.append(PaymentAttempt(
+                    order=order,
+                    provider="UPI",
+                    status="PENDING",
+                    attempt_no=attempt_no,
+                    amount=order.total,
+                    provider_order_id=f"SYN_{order.order_number}_{attempt_no}",
+                ))
+
+        PaymentAttempt.objects.bulk_create(attempts, batch_size=self.batch_size)
+        Payment.objects.bulk_create(
+            [
+                Payment(
+                    order=attempt.order,
+                    attempt=attempt,
+                    provider=attempt.provider,
+                    gateway_payment_id=attempt.provider_payment_id,
+                    amount=attempt.amount,
+                    status="PAID",
+                )
+                for attempt in paid
+            ],
+            batch_size=self.batch_size,
+        )
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.loadtest import GunicornServer, delete_shoppers, run_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate concurrent shoppers (scan, cart, checkout, pay, invoice) "
+        "against a gunicorn server started for the run, and report "
+        "throughput, tail latency and lock errors as JSON. Uses the "
+        "configured database; run generate_synthetic_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shoppers", type=int, default=20)
+        parser.add_argument("--trips", type=int, default=5, help="Shopping trips per shopper")
+        parser.add_argument("--items", type=int, default=3, help="Items scanned per trip")
+        parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+        parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--url",
+            help="Target an already running server instead of starting gunicorn",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the shopper accounts and their orders afterwards",
+        )
+
+    def handle(self, *args, **options):
+        load = dict(
+            shoppers=options["shoppers"],
+            trips=options["trips"],
+            items=options["items"],
+            seed=options["seed"],
+        )
+
+        try:
+            if options["url"]:
+                report = run_load(options["url"].rstrip("/"), **load)
+            else:
+                with GunicornServer(workers=options["workers"], threads=options["threads"]) as server:
+                    report = run_load(server.url, **load)
+                report["meta"]["gunicorn"] = {
+                    "workers": options["workers"],
+                    "threads": options["threads"],
+                }
+        except (LookupError, RuntimeError) as e:
+            raise CommandError(str(e))
+        finally:
+            if not options["keep"]:
+                delete_shoppers()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
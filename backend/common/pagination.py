@@ -0,0 +1,47 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Returns: (created_at, pk), or None if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(queryset, *, cursor=None, limit=20):
+    """
+    Newest-first keyset page over (created_at, id).
+
+    `queryset` must be ordered by ("-created_at", "-id") and yield dicts
+    (values()). The cursor points at the last row of the previous page, so
+    every page is an index range scan no matter how deep it is.
+
+    Returns: (rows, next_cursor)
+    """
+    if cursor:
+        created_at, pk = cursor
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    rows = list(queryset[: limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return rows, next_cursor
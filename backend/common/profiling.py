@@ -0,0 +1,235 @@
+import json
+import logging
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger("paymall.sql")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+_SKIP_PATHS = ("/django/", "/rest_framework/", "/site-packages/", __file__)
+
+
+def fingerprint(sql):
+    """
+    Normalize SQL so that the same statement with different parameters (or
+    a different number of IN (...) values) maps to the same string.
+    """
+    sql = _SAVEPOINT.sub("?", sql)
+    sql = _STRING.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def _call_site():
+    """
+    First stack frame inside the project, skipping Django, DRF and this module.
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+
+    while frame:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base_dir) and not any(
+            skip in filename for skip in _SKIP_PATHS
+        ):
+            path = Path(filename).relative_to(base_dir)
+            return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+
+    return None
+
+
+# Profiles active in the current context. Async ORM calls run in a worker
+# thread with a copy of the caller's context, so their queries are recorded
+# by the profile of the request (or block) that awaited them.
+_active_profiles = ContextVar("paymall_sql_profiles", default=())
+
+
+def _record_queries(execute, sql, params, many, context):
+    profiles = _active_profiles.get()
+    if not profiles:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        key = fingerprint(sql)
+        site = _call_site() if any(p.capture_call_sites for p in profiles) else None
+
+        for profile in profiles:
+            profile.record(key, duration, site)
+
+
+def _install(connection, **kwargs):
+    if _record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_queries)
+
+
+# Connections opened from now on, in any thread
+connection_created.connect(_install, dispatch_uid="paymall_sql_profiling")
+
+
+class QueryProfile:
+    """
+    Record every query run on any database connection while active, in
+    this thread or in async ORM calls awaited from it.
+
+        with QueryProfile() as profile:
+            ...
+        profile.count, profile.duration, profile.repeated(5)
+    """
+
+    def __init__(self, capture_call_sites=True):
+        self.capture_call_sites = capture_call_sites
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.call_sites = defaultdict(Counter)
+        self._token = None
+
+    def __enter__(self):
+        # Connections this thread opened before the module was imported
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+
+        self._token = _active_profiles.set(_active_profiles.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_profiles.reset(self._token)
+        self._token = None
+
+    def record(self, key, duration, site):
+        self.duration += duration
+        self.count += 1
+
+        self.fingerprints[key] += 1
+        if self.capture_call_sites:
+            self.call_sites[key][site] += 1
+
+    def duplicates(self):
+        """
+        Fingerprints that ran more than once, most frequent first.
+        """
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > 1]
+
+    def repeated(self, threshold):
+        """
+        Likely N+1 patterns: fingerprints that ran more than `threshold` times,
+        with the call sites that issued them.
+        """
+        return [
+            {
+                "sql": sql,
+                "count": n,
+                "call_sites": [
+                    {"site": site, "count": count}
+                    for site, count in self.call_sites[sql].most_common(3)
+                ],
+            }
+            for sql, n in self.fingerprints.most_common()
+            if n > threshold
+        ]
+
+
+class SQLProfilingMiddleware:
+    """
+    Opt-in per-request SQL profile (SQL_PROFILING=1).
+
+    Logs query count, DB time and duplicate fingerprints for each request to
+    the "paymall.sql" logger as one JSON line, and a warning for every N+1
+    candidate (same normalized SQL more than SQL_PROFILING_NPLUSONE_THRESHOLD
+    times). Outside production the totals are also sent as X-Query-Count and
+    Server-Timing headers.
+
+    Works under WSGI and ASGI. Under ASGI it stays on the event loop, so async
+    views keep running as coroutines, and queries from their async ORM calls
+    are counted.
+
+    Queries run while a streaming response is being consumed happen after
+    this middleware returns and are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, "SQL_PROFILING_NPLUSONE_THRESHOLD", 5)
+        self.send_headers = not getattr(settings, "IS_PRODUCTION", False)
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        with QueryProfile() as profile:
+            response = self.get_response(request)
+        return self.report(request, response, profile, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with QueryProfile() as profile:
+            response = await self.get_response(request)
+        return self.report(request, response, profile, time.perf_counter() - start)
+
+    def report(self, request, response, profile, elapsed):
+        n_plus_one = profile.repeated(self.threshold)
+
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "queries": profile.count,
+                    "db_ms": round(profile.duration * 1000, 2),
+                    "total_ms": round(elapsed * 1000, 2),
+                    "duplicates": [
+                        {"sql": sql, "count": n} for sql, n in profile.duplicates()
+                    ],
+                }
+            )
+        )
+
+        for entry in n_plus_one:
+            logger.warning(
+                json.dumps(
+                    {
+                        "event": "n_plus_one",
+                        "method": request.method,
+                        "path": request.path,
+                        **entry,
+                    }
+                )
+            )
+
+        if self.send_headers:
+            response["X-Query-Count"] = str(profile.count)
+            response["Server-Timing"] = (
+                f'db;dur={profile.duration * 1000:.2f};desc="{profile.count} queries", '
+                f"total;dur={elapsed * 1000:.2f}"
+            )
+
+        return response
@@ -0,0 +1,190 @@
+"""
+Compiled read projections for high-volume list endpoints.
+
+A Projection is a declarative field list for one model. It turns into a
+single values() query (joins included) and a row -> dict function that is
+generated once, as Python source, when the projection is defined. The
+dicts it returns render to exactly the same JSON as the ModelSerializer
+they replace; `manage.py check_projections` diffs the two.
+
+    PRODUCT_LIST = Projection(Product, [
+        "id", "name", "price",
+        Field("category_name", "category__name"),
+        "image",
+    ])
+
+    data = PRODUCT_LIST.serialize(queryset, request=request)
+    data = await PRODUCT_LIST.aserialize(queryset, request=request)  # async views
+
+Converters are picked from the model field at the end of each source path
+to match what DRF would output for it. Values that need no conversion
+(strings, ints, bools, floats, foreign key ids) are copied straight
+through, and None stays None (or the key is left out, see Field.omit_none),
+as in DRF.
+"""
+
+import decimal
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import default_storage
+from django.db import models
+from django.db.models import F
+from rest_framework import serializers
+
+
+@dataclass(frozen=True)
+class Field:
+    key: str
+    source: Optional[str] = None
+    # convert(value) or, with needs_request, convert(value, request)
+    convert: Optional[Callable] = None
+    needs_request: bool = False
+    # Leave the key out when the value is None. Defaults to True for
+    # sources that go through a nullable relation, which DRF skips
+    # instead of outputting null (`source="category.name"` with no category)
+    omit_none: Optional[bool] = None
+
+
+def media_url(name, request, storage=default_storage):
+    """
+    Stored file name -> URL, absolute when there is a request: the output
+    of DRF's ImageField / FileField (and ProductSerializer.get_image).
+    """
+    if not name:
+        return None
+
+    url = storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def _decimal_converter(field):
+    # DRF DecimalField.to_representation with COERCE_DECIMAL_TO_STRING
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = field.max_digits
+
+    def convert(value):
+        return "{:f}".format(value.quantize(exponent, context=context))
+
+    return convert
+
+
+def _converter_for(model_field):
+    if isinstance(model_field, models.ForeignKey):
+        # PrimaryKeyRelatedField outputs the raw pk
+        return None, False
+    if isinstance(model_field, models.FileField):
+        return partial(media_url, storage=model_field.storage), True
+    if isinstance(model_field, models.UUIDField):
+        return str, False
+    if isinstance(model_field, models.DecimalField):
+        return _decimal_converter(model_field), False
+    if isinstance(model_field, models.DateTimeField):
+        return serializers.DateTimeField().to_representation, False
+    if isinstance(model_field, models.DateField):
+        return serializers.DateField().to_representation, False
+    return None, False
+
+
+def _resolve(model, source):
+    """
+    Returns: (model field at the end of an `a__b__c` source path, or None
+    for an annotation; whether the path goes through a nullable relation)
+    """
+    *path, name = source.split("__")
+    nullable = False
+    try:
+        for part in path:
+            relation = model._meta.get_field(part)
+            nullable = nullable or relation.null
+            model = relation.related_model
+        return model._meta.get_field(name), nullable
+    except FieldDoesNotExist:
+        return None, False
+
+
+class Projection:
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = []
+
+        for spec in fields:
+            if isinstance(spec, str):
+                spec = Field(spec)
+
+            source = spec.source or spec.key
+            model_field, through_nullable = _resolve(model, source)
+
+            convert, needs_request = spec.convert, spec.needs_request
+            if convert is None and model_field is not None:
+                convert, needs_request = _converter_for(model_field)
+
+            self.fields.append(Field(
+                spec.key,
+                source,
+                convert,
+                needs_request,
+                through_nullable if spec.omit_none is None else spec.omit_none,
+            ))
+
+        self.row = self._compile()
+
+    def _compile(self):
+        """
+        Generate `row(values_dict, request) -> dict` as straight-line code,
+        so no per-field Python loop runs at request time. Keys keep the
+        declared order: a dict display up to the first omit_none field,
+        assignments after it.
+        """
+        namespace = {}
+        head, tail = [], []
+
+        for i, field in enumerate(self.fields):
+            key = repr(field.key)
+            value = f"r[{key}]"
+
+            if field.convert is not None:
+                namespace[f"_c{i}"] = field.convert
+                args = f"{value}, request" if field.needs_request else value
+                value = f"(None if {value} is None else _c{i}({args}))"
+
+            if field.omit_none:
+                tail.append(f"    if r[{key}] is not None: d[{key}] = {value}")
+            elif tail:
+                tail.append(f"    d[{key}] = {value}")
+            else:
+                head.append(f"{key}: {value}")
+
+        source = "\n".join([
+            "def row(r, request=None):",
+            "    d = {" + ", ".join(head) + "}",
+            *tail,
+            "    return d",
+        ]) + "\n"
+        exec(compile(source, f"<projection {self.model.__name__}>", "exec"), namespace)
+        return namespace["row"]
+
+    def values(self, queryset, *extra):
+        """
+        values() query for this projection. `extra` columns (e.g. fields a
+        view filters or paginates on) are fetched too but not output.
+        """
+        plain, renamed = dict.fromkeys(extra), {}
+        for field in self.fields:
+            if field.source == field.key:
+                plain[field.key] = None
+            else:
+                renamed[field.key] = F(field.source)
+        return queryset.values(*plain, **renamed)
+
+    def serialize(self, queryset, *, request=None):
+        row = self.row
+        return [row(r, request) for r in self.values(queryset)]
+
+    async def aserialize(self, queryset, *, request=None):
+        # Async views (common/async_views.py): one query in a worker thread
+        row = self.row
+        return [row(r, request) async for r in self.values(queryset)]
@@ -0,0 +1,460 @@
+"""
+Query-count budgets for the API.
+
+BUDGETS is the single table of per-endpoint limits, with at least one entry
+for every route under /api/. `run_budgets()` builds a small and a large
+fixture, calls every budgeted endpoint against each and reports an endpoint
+as failing when
+
+- it returns an error status,
+- it needs more queries than its budget, or
+- it needs more queries on the large fixture than on the small one.
+
+Bulk inserts are split into batches on SQLite (999 parameters per
+statement), so an endpoint that writes one row per cart line may take a
+few more queries on the large fixture. Those entries set
+`max_queries_large`, a fixed ceiling for the large fixture, instead.
+
+common/tests.py runs them on the test database: `python manage.py test common`.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import UserRole
+from payments.models import Payment
+from products.catalog import make_version
+from products.models import Product
+
+from .profiling import QueryProfile
+from .testing import FIXTURE_PASSWORD, ShopFixture
+
+
+# (products, cart / order lines) per fixture size
+FIXTURE_SIZES = {
+    "small": (10, 1),
+    "large": (1000, 100),
+}
+
+
+@dataclass(frozen=True)
+class Budget:
+    method: str
+    route: str
+    user: Optional[str]  # "customer" | "mall_admin" | "master" | None
+    max_queries: int
+    args: dict = field(default_factory=dict)
+    query: Optional[Callable] = None
+    data: Optional[Callable] = None
+    # Ceiling on the large fixture, where it may differ from max_queries
+    max_queries_large: Optional[int] = None
+    # State the call needs, set up in its savepoint but outside the count
+    setup: Optional[Callable] = None
+    cookies: Optional[Callable] = None
+    # Send data as multipart/form-data (file uploads) instead of JSON
+    multipart: bool = False
+    # Row locks taken with first_for_update_nowait. Where the backend
+    # supports NOWAIT each one runs in a savepoint: two more statements
+    nowait_locks: int = 0
+
+    def limit(self, size="small"):
+        limit = self.max_queries
+        if size != "small" and self.max_queries_large is not None:
+            limit = self.max_queries_large
+        if connection.features.has_select_for_update_nowait:
+            return limit + 2 * self.nowait_locks
+        return limit
+
+
+def _login(user):
+    return lambda f: {"email": getattr(f, user).email, "password": FIXTURE_PASSWORD}
+
+
+def _signup(source):
+    return lambda f: {
+        "email": f"budget-signup-{source}-{f.tag}@paymall.local",
+        "password": FIXTURE_PASSWORD,
+        "password2": FIXTURE_PASSWORD,
+    }
+
+
+def _bulk_upload(f):
+    # One restocked product and one new one
+    rows = [
+        "barcode,name,price,marked_price,stock_quantity",
+        f"{f.spare_product.barcode},{f.spare_product.name},118.00,130.00,10",
+        f"BUDNEW{f.tag},Budget new product,59.00,65.00,20",
+    ]
+    return {
+        "csv": SimpleUploadedFile("products.csv", "\n".join(rows).encode(), "text/csv"),
+        "mode": "increment",
+    }
+
+
+def _pending_approval(f):
+    Product.objects.filter(pk__in=[p.pk for p in f.products[:5]]).update(status="PENDING_APPROVAL")
+
+
+def _failed_payment(f):
+    # The pending payment failed, so initiating starts a new attempt
+    Payment.objects.filter(pk=f.pending_payment.pk).update(status="FAILED")
+
+
+BUDGETS = [
+    # accounts
+    Budget("POST", "api/accounts/login/", None, 4, data=_login("customer")),
+    Budget("POST", "api/accounts/admin/login/", None, 1, data=_login("mall_admin")),
+    Budget(
+        "POST", "api/accounts/token/refresh/", None, 0,
+        data=lambda f: {"refresh": str(RefreshToken.for_user(f.customer))},
+    ),
+    Budget(
+        "POST", "api/accounts/admin/token/refresh/", None, 0,
+        cookies=lambda f: {"refresh": str(RefreshToken.for_user(f.mall_admin))},
+    ),
+    Budget("POST", "api/accounts/signup/customer/", None, 13, data=_signup("customer")),
+    Budget("POST", "api/accounts/signup/management/", None, 7, data=_signup("management")),
+    Budget("POST", "api/accounts/logout/", "customer", 0),
+    Budget("GET", "api/accounts/me/", "customer", 1),
+    Budget("GET", "api/accounts/admin/me/", "mall_admin", 2),
+    Budget("GET", "api/accounts/profile/", "customer", 1),
+    Budget("GET", "api/accounts/management/pending-users/", "master", 2),
+    Budget(
+        "POST", "api/accounts/management/assign-role/", "master", 7,
+        data=lambda f: {
+            "user_id": str(f.pending_manager.id),
+            "role": UserRole.Role.MALL_ADMIN,
+            "mall_id": str(f.mall.id),
+        },
+    ),
+    Budget("GET", "api/accounts/admin/dashboard/stats/", "master", 7),
+    Budget("GET", "api/accounts/mall/dashboard/stats/", "mall_admin", 9),
+    # cart
+    Budget("GET", "api/cart/", "customer", 2),
+    Budget(
+        "POST", "api/cart/merge-guest/", "customer", 17,
+        data=lambda f: {"items": [{"product_id": str(f.spare_product.id), "quantity": 1}]},
+    ),
+    Budget(
+        "POST", "api/cart/add/", "customer", 10,
+        data=lambda f: {"product_id": str(f.spare_product.id), "quantity": 1},
+    ),
+    Budget(
+        "POST", "api/cart/add/", "customer", 9,
+        data=lambda f: {
+            "product_id": str(f.spare_product.id),
+            "quantity": 1,
+            "response": "line",
+        },
+    ),
+    Budget(
+        "POST", "api/cart/batch/", "customer", 11,
+        data=lambda f: {
+            "operations": [
+                {"op": "add", "product_id": str(p.id), "quantity": 1}
+                for p in f.products[f.lines:][:50]
+            ]
+        },
+    ),
+    Budget(
+        "POST", "api/cart/replace/", "customer", 12,
+        data=lambda f: {"product_id": str(f.spare_product.id)},
+    ),
+    Budget(
+        "PATCH", "api/cart/item/update/", "customer", 6,
+        data=lambda f: {"cart_item_id": f.cart_item.id, "quantity": 2},
+    ),
+    Budget(
+        "DELETE", "api/cart/item/remove/", "customer", 4,
+        data=lambda f: {"cart_item_id": f.cart_item.id},
+    ),
+    Budget("DELETE", "api/cart/clear/", "customer", 2),
+    Budget(
+        "POST", "api/cart/save/", "customer", 17,
+        data=lambda f: {"product_id": str(f.spare_product.id)},
+    ),
+    Budget("GET", "api/cart/saved/", "customer", 2),
+    Budget(
+        "POST", "api/cart/saved/restore/", "customer", 18,
+        data=lambda f: {"saved_cart_id": f.saved_cart.id},
+    ),
+    # malls
+    Budget(
+        "GET", "api/malls/nearby/", None, 1,
+        query=lambda f: {"latitude": f.mall.latitude, "longitude": f.mall.longitude},
+    ),
+    Budget("GET", "api/malls/<uuid:mall_id>/", None, 1, args={"mall_id": "mall"}),
+    Budget("GET", "api/malls/offers/", None, 1),
+    # orders
+    Budget("GET", "api/orders/list/", "customer", 1),
+    Budget("GET", "api/orders/<int:pk>/", "customer", 2, args={"pk": "paid_order"}),
+    Budget(
+        "POST", "api/orders/checkout/", "customer", 14,
+        max_queries_large=15,
+        nowait_locks=1,
+    ),
+    Budget(
+        "POST", "api/orders/<int:pk>/cancel/", "customer", 6,
+        args={"pk": "pending_order"},
+    ),
+    Budget(
+        "GET", "api/orders/<int:pk>/invoice-data/", "customer", 3,
+        args={"pk": "paid_order"},
+    ),
+    Budget(
+        "GET", "api/orders/<int:pk>/invoice/", "customer", 8,
+        args={"pk": "paid_order"},
+    ),
+    # payments
+    Budget(
+        "POST", "api/payments/initiate/", "customer", 7,
+        data=lambda f: {"order_id": f.pending_order.id, "provider": "UPI"},
+        setup=_failed_payment,
+    ),
+    Budget(
+        "POST", "api/payments/success/", "customer", 21,
+        data=lambda f: {"payment_id": f.pending_payment.id, "gateway_payment_id": f"pay_{f.tag}_2"},
+    ),
+    Budget(
+        "POST", "api/payments/failed/", "customer", 5,
+        data=lambda f: {"payment_id": f.payment.id},
+    ),
+    Budget("GET", "api/payments/payment-methods/", "customer", 1),
+    Budget(
+        "GET", "api/payments/payment-methods/<int:pk>/", "customer", 1,
+        args={"pk": "payment_method"},
+    ),
+    Budget(
+        "POST", "api/payments/create-attempt/", "customer", 4,
+        data=lambda f: {"order_id": f.pending_order.id},
+        nowait_locks=1,
+    ),
+    Budget(
+        "POST", "api/payments/verify/", "customer", 14,
+        data=lambda f: {"attempt_id": f.pending_attempt.id, "success": True},
+        nowait_locks=1,
+    ),
+    Budget(
+        "POST", "api/payments/verify/", "customer", 4,
+        data=lambda f: {"attempt_id": f.pending_attempt.id, "success": False},
+        nowait_locks=1,
+    ),
+    Budget(
+        "GET", "api/payments/status/", "customer", 1,
+        query=lambda f: {"attempt_id": f.pending_attempt.id},
+    ),
+    # products
+    Budget(
+        "GET", "api/products/categories/", None, 1,
+        query=lambda f: {"mall": str(f.mall.id)},
+    ),
+    Budget(
+        "GET", "api/products/list/", None, 1,
+        query=lambda f: {"mall": str(f.mall.id)},
+    ),
+    Budget(
+        "GET", "api/products/<uuid:pk>/", None, 3,
+        args={"pk": "spare_product"},
+    ),
+    Budget(
+        "GET", "api/products/catalog/", None, 2,
+        query=lambda f: {"mall": str(f.mall.id)},
+    ),
+    Budget(
+        "GET", "api/products/catalog/", None, 3,
+        query=lambda f: {
+            "mall": str(f.mall.id),
+            "since": make_version(timezone.now() - timedelta(hours=1)),
+        },
+    ),
+    Budget(
+        "POST", "api/products/scan/", None, 1,
+        data=lambda f: {"barcode": f.spare_product.barcode, "mall_id": str(f.mall.id)},
+    ),
+    # admin
+    Budget("GET", "api/admin/products/", "mall_admin", 6),
+    Budget(
+        "POST", "api/admin/products/create/", "mall_admin", 7,
+        data=lambda f: {
+            "name": "Budget new product",
+            "barcode": f"BUDNEW{f.tag}",
+            "price": "59.00",
+            "marked_price": "65.00",
+            "category": str(f.category.id),
+            "stock_quantity": 20,
+        },
+    ),
+    Budget(
+        "PUT", "api/admin/products/<uuid:product_id>/update/", "mall_admin", 9,
+        args={"product_id": "spare_product"},
+        data=lambda f: {"price": "110.00"},
+    ),
+    Budget(
+        "PATCH", "api/admin/products/<uuid:product_id>/toggle/", "mall_admin", 5,
+        args={"product_id": "spare_product"},
+    ),
+    Budget(
+        "POST", "api/admin/products/bulk-upload/", "mall_admin", 18,
+        data=_bulk_upload,
+        multipart=True,
+    ),
+    Budget(
+        "POST", "api/admin/products/bulk-approval/", "master", 16,
+        data=lambda f: {"product_ids": [str(p.id) for p in f.products[:5]], "action": "APPROVE"},
+        setup=_pending_approval,
+    ),
+    Budget("GET", "api/admin/categories/", "mall_admin", 3),
+    Budget(
+        "POST", "api/admin/categories/create/", "master", 3,
+        data=lambda f: {"name": f"Budget new {f.tag}"},
+    ),
+    Budget(
+        "PUT", "api/admin/categories/<uuid:category_id>/update/", "master", 3,
+        args={"category_id": "category"},
+        data=lambda f: {"description": "Updated"},
+    ),
+    Budget(
+        "PATCH", "api/admin/categories/<uuid:category_id>/toggle/", "master", 3,
+        args={"category_id": "category"},
+    ),
+    Budget("GET", "api/admin/low-stock/", "mall_admin", 3),
+    Budget("GET", "api/admin/malls/", "master", 2),
+    Budget(
+        "POST", "api/admin/malls/create/", "master", 2,
+        data=lambda f: {
+            "name": f"Budget new mall {f.tag}",
+            "address": "2 Budget Road",
+            "latitude": 12.9,
+            "longitude": 77.6,
+        },
+    ),
+    Budget(
+        "GET", "api/admin/malls/<uuid:mall_id>/", "mall_admin", 3,
+        args={"mall_id": "mall"},
+    ),
+    Budget(
+        "PUT", "api/admin/malls/<uuid:mall_id>/update/", "mall_admin", 4,
+        args={"mall_id": "mall"},
+        data=lambda f: {"description": "Updated"},
+    ),
+    Budget(
+        "PATCH", "api/admin/malls/<uuid:mall_id>/toggle-status/", "master", 3,
+        args={"mall_id": "mall"},
+    ),
+    Budget(
+        "GET", "api/admin/orders/invoices/export/", "mall_admin", 5,
+        query=lambda f: {"from": timezone.localdate(), "to": timezone.localdate()},
+    ),
+]
+
+
+def budget_url(budget, fixture):
+    def value(match):
+        target = getattr(fixture, budget.args[match.group(1)])
+        return str(target.pk)
+
+    return "/" + re.sub(r"<(?:\w+:)?(\w+)>", value, budget.route)
+
+
+def measure(budget, fixture):
+    """
+    Call the endpoint once inside a rolled-back savepoint.
+    Returns (status_code, query_count).
+    """
+    client = APIClient(raise_request_exception=False)
+    if budget.user:
+        client.force_authenticate(getattr(fixture, budget.user))
+    if budget.cookies:
+        client.cookies.load(budget.cookies(fixture))
+
+    url = budget_url(budget, fixture)
+
+    if budget.query:
+        query = budget.query(fixture)
+        url += "?" + "&".join(f"{k}={v}" for k, v in query.items())
+
+    with transaction.atomic():
+        if budget.setup:
+            budget.setup(fixture)
+        data = budget.data(fixture) if budget.data else {}
+
+        with QueryProfile(capture_call_sites=False) as profile:
+            if budget.multipart:
+                response = getattr(client, budget.method.lower())(url, data, format="multipart")
+            else:
+                response = client.generic(
+                    budget.method,
+                    url,
+                    data=json.dumps(data, default=str),
+                    content_type="application/json",
+                )
+            if response.streaming:
+                b"".join(response.streaming_content)
+        transaction.set_rollback(True)
+
+    return response.status_code, profile.count
+
+
+def run_budgets(budgets=BUDGETS, sizes=FIXTURE_SIZES):
+    """
+    Measure every budget against each fixture size. Each fixture lives in a
+    rolled-back transaction. Returns one result dict per budget.
+    """
+    counts = {id(b): {} for b in budgets}
+
+    for size, (products, lines) in sizes.items():
+        with transaction.atomic():
+            fixture = ShopFixture(products, lines)
+
+            for budget in budgets:
+                counts[id(budget)][size] = measure(budget, fixture)
+
+            transaction.set_rollback(True)
+
+    results = []
+    for budget in budgets:
+        measured = counts[id(budget)]
+        problems = []
+
+        for size, (status_code, count) in measured.items():
+            if status_code >= 400:
+                problems.append(f"{size}: HTTP {status_code}")
+            if count > budget.limit(size):
+                problems.append(f"{size}: {count} queries > budget {budget.limit(size)}")
+
+        query_counts = [count for _, count in measured.values()]
+        if budget.max_queries_large is None and len(set(query_counts)) > 1:
+            problems.append("query count grows with data size")
+
+        results.append({"budget": budget, "counts": measured, "problems": problems})
+
+    return results
+
+
+def api_routes():
+    """
+    Every route under /api/, as the strings Budget.route uses.
+    """
+    def walk(patterns, prefix):
+        for p in patterns:
+            if isinstance(p, URLResolver):
+                yield from walk(p.url_patterns, prefix + str(p.pattern))
+            elif isinstance(p, URLPattern):
+                yield prefix + str(p.pattern)
+
+    return sorted({r for r in walk(get_resolver().url_patterns, "") if r.startswith("api/")})
+
+
+def unbudgeted_routes(budgets=BUDGETS):
+    budgeted = {b.route for b in budgets}
+    return [route for route in api_routes() if route not in budgeted]
@@ -0,0 +1,69 @@
+"""
+JSON renderer for the success_response / error_response envelope.
+
+With orjson installed the whole envelope is encoded in one C pass: dicts,
+lists, strings, numbers, UUIDs and dates/times are native (orjson's
+datetime format with OPT_UTC_Z matches DRF's). Decimal is converted in a
+one-line hook, and anything rarer (lazy strings, querysets) calls back
+into DRF's own encoder. The output is byte-identical to DRF's JSONRenderer
+with the default COMPACT_JSON / UNICODE_JSON settings.
+
+Without orjson, or when orjson refuses the data (e.g. integers beyond 64
+bits) or the client asked for indented output, DRF's stdlib renderer is
+used instead.
+"""
+
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    ORJSON_ERRORS = (orjson.JSONEncodeError, TypeError)
+
+_drf_default = JSONEncoder().default
+
+
+def _default(obj):
+    # Money is by far the most common non-native value; skip DRF's
+    # isinstance chain for it
+    if type(obj) is Decimal:
+        return float(obj)
+    return _drf_default(obj)
+
+
+def _orjson_dumps(data):
+    ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+
+    # Same escaping as DRF: keep the output a strict JavaScript subset
+    if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer (DEFAULT_RENDERER_CLASSES).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            return _orjson_dumps(data)
+        except ORJSON_ERRORS:
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,102 @@
+"""
+Read-replica routing.
+
+Replica aliases come from DATABASE_REPLICA_URLS (see settings). Reads only
+go to a replica inside views that opt in with ReplicaReadMixin; every other
+query, and every write, stays on "default".
+
+A user who has just changed something (any successful POST/PUT/PATCH/DELETE,
+e.g. adding to the cart or checking out) is pinned to the primary for
+REPLICA_STICKY_SECONDS, so their next order history or catalog read cannot
+come from a replica that has not caught up yet.
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+
+_read_from_replica = ContextVar("read_from_replica", default=False)
+
+
+def _pin_key(user_id):
+    return f"replicas:pinned:{user_id}"
+
+
+def pin_to_primary(user):
+    cache.set(_pin_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user):
+    return bool(user and user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Inside a transaction on the primary, reads must see its writes
+        if (
+            settings.DATABASE_REPLICAS
+            and _read_from_replica.get()
+            and not connections["default"].in_atomic_block
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    """
+    APIView mixin: serve safe requests from a replica unless the user is
+    pinned to the primary. Runs after authentication, so the pin of a
+    JWT-authenticated user is seen.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if request.method in SAFE_METHODS and not is_pinned(request.user):
+            self._replica_token = _read_from_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            _read_from_replica.reset(token)
+            self._replica_token = None
+
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """
+    Pin a user to the primary after a successful write.
+
+    DRF copies the authenticated user onto the Django request, so
+    JWT-authenticated writes are seen here too. MiddlewareMixin makes it
+    async-capable; under ASGI the cache write runs in a thread.
+    """
+
+    def process_response(self, request, response):
+        user = getattr(request, "user", None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user)
+
+        return response
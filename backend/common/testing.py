@@ -0,0 +1,183 @@
+"""
+Test data shared by the app tests, the query budgets and the index audit.
+"""
+
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from functools import cache
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from accounts.models import User, UserRole
+from cart.models import Cart, CartItem, SavedCart, SavedCartItem
+from malls.models import Mall, MallStaff
+from orders.models import Order, OrderItem
+from payments.models import Payment, PaymentAttempt, PaymentMethod
+from products.models import Category, InventoryAlert, MallCategoryCount, Product
+
+
+# Every fixture user signs in with this password
+FIXTURE_PASSWORD = "budget-password"
+
+
+@cache
+def fixture_password_hash():
+    # Hashed once per process: the hasher is slow on purpose
+    return make_password(FIXTURE_PASSWORD)
+
+
+class ShopFixture:
+    """
+    A mall with `products` products, a customer whose cart, saved cart and
+    orders each have `lines` lines, plus the admin users the admin routes need
+    and a management signup waiting for a role.
+
+    The query budgets build it at their two sizes; tests ask for the few
+    products and lines they check.
+    """
+
+    def __init__(self, products=3, lines=1):
+        tag = uuid.uuid4().hex[:8]
+        self.tag = tag
+        self.lines = lines
+
+        self.customer = self._user(f"budget-customer-{tag}", UserRole.Role.CUSTOMER)
+        self.mall_admin = self._user(f"budget-mall-admin-{tag}", UserRole.Role.MALL_ADMIN)
+        self.master = self._user(f"budget-master-{tag}", UserRole.Role.MASTER_ADMIN)
+        self.pending_manager = User.objects.create(
+            email=f"budget-pending-{tag}@paymall.local",
+            password=fixture_password_hash(),
+            is_active=False,
+            signup_source=User.SignupSource.MANAGEMENT,
+        )
+
+        self.mall = Mall.objects.create(
+            name=f"Budget Mall {tag}",
+            address="1 Budget Road",
+            latitude=12.9716,
+            longitude=77.5946,
+        )
+        MallStaff.objects.create(user=self.mall_admin, mall=self.mall, role="MALL_ADMIN")
+
+        self.category = Category.objects.create(name=f"Budget {tag}", slug=f"budget-{tag}")
+
+        self.products = Product.objects.bulk_create([
+            Product(
+                name=f"Budget product {i}",
+                barcode=f"BUD{tag}{i:06d}",
+                price=Decimal("118.00"),
+                marked_price=Decimal("130.00"),
+                mall=self.mall,
+                category=self.category,
+                stock_quantity=5 if i % 10 == 0 else 500,
+                status="ACTIVE",
+                gst_rate=Decimal("18.00"),
+            )
+            for i in range(products)
+        ])
+        self.spare_product = self.products[-1]
+        # bulk_create skips the signals that keep the category counts
+        MallCategoryCount.objects.create(mall=self.mall, category=self.category, product_count=products)
+
+        InventoryAlert.objects.bulk_create([
+            InventoryAlert(product=p, threshold=10, is_triggered=True)
+            for p in self.products
+            if p.stock_quantity < 10
+        ])
+
+        cart = Cart.objects.create(user=self.customer, mall=self.mall, status="ACTIVE")
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=p, quantity=1) for p in self.products[:lines]
+        ])
+        self.cart_item = cart.items.order_by("id").first()
+
+        self.saved_cart = SavedCart.objects.create(user=self.customer, mall=self.mall)
+        SavedCartItem.objects.bulk_create([
+            SavedCartItem(saved_cart=self.saved_cart, product=p, quantity=1)
+            for p in self.products[:lines]
+        ])
+
+        self.paid_order = self._order(f"BUDPAID{tag}", "PAID", lines)
+        self.pending_order = self._order(f"BUDPEND{tag}", "PAYMENT_PENDING", lines)
+        self.pending_order.expires_at = timezone.now() + timedelta(minutes=15)
+        self.pending_order.save(update_fields=["expires_at"])
+
+        paid_attempt = PaymentAttempt.objects.create(
+            order=self.paid_order,
+            provider="UPI",
+            status="SUCCESS",
+            amount=self.paid_order.total,
+        )
+        self.payment = Payment.objects.create(
+            order=self.paid_order,
+            attempt=paid_attempt,
+            provider="UPI",
+            gateway_payment_id=f"pay_{tag}",
+            amount=self.paid_order.total,
+            status="PAID",
+        )
+        self.pending_attempt = PaymentAttempt.objects.create(
+            order=self.pending_order,
+            provider="UPI",
+            status="PENDING",
+            amount=self.pending_order.total,
+        )
+        self.pending_payment = Payment.objects.create(
+            order=self.pending_order,
+            attempt=self.pending_attempt,
+            provider="UPI",
+            amount=self.pending_order.total,
+            status="PENDING",
+        )
+
+        self.payment_method = PaymentMethod.objects.create(
+            user=self.customer,
+            payment_type="UPI",
+            upi_id=f"{tag}@upi",
+        )
+
+    def _user(self, name, role):
+        user = User.objects.create(
+            email=f"{name}@paymall.local",
+            password=fixture_password_hash(),
+            is_active=True,
+            signup_source=(
+                User.SignupSource.CUSTOMER
+                if role == UserRole.Role.CUSTOMER
+                else User.SignupSource.MANAGEMENT
+            ),
+        )
+        # Customer signups get their role from accounts.signals
+        UserRole.objects.get_or_create(user=user, role=role)
+        return user
+
+    def _order(self, order_number, status, lines):
+        order = Order.objects.create(
+            user=self.customer,
+            mall=self.mall,
+            order_number=order_number,
+            status=status,
+            subtotal=Decimal("100.00") * lines,
+            tax=Decimal("18.00") * lines,
+            total=Decimal("118.00") * lines,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=p,
+                product_name=p.name,
+                product_price=p.price,
+                product_barcode=p.barcode,
+                quantity=1,
+                gst_rate=p.gst_rate,
+                taxable_value=Decimal("100.00"),
+                tax_amount=Decimal("18.00"),
+                cgst_amount=Decimal("9.00"),
+                sgst_amount=Decimal("9.00"),
+                total_price=p.price,
+            )
+            for p in self.products[:lines]
+        ])
+        return order
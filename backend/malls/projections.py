@@ -0,0 +1,14 @@
+from common.projections import Projection
+
+from .models import Mall
+
+
+# Same JSON as MallSerializer, minus "distance", which NearbyMallView
+# computes per row and appends
+MALL_LIST = Projection(Mall, [
+    "id",
+    "name",
+    "address",
+    "image",
+    "description",
+])
@@ -1,11 +1,14 @@
 from rest_framework import permissions, status
 from .models import Mall, Offer
-from .serializers import MallSerializer, MallDetailSerializer, OfferSerializer
+from .serializers import MallDetailSerializer, OfferSerializer
+from .projections import MALL_LIST
 import math
 from django.utils.timezone import now
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+from common.async_views import AsyncAPIView
 from common.responses import success_response, error_response
+from common.replicas import ReplicaReadMixin
 import os
 
 
@@ -19,10 +22,10 @@ def haversine(lat1, lon1, lat2, lon2):
         math.cos(math.radians(lat2)) * math.sin(d_lon/2)**2
     return R * (2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)))
 
-class NearbyMallView(APIView):
+class NearbyMallView(ReplicaReadMixin, AsyncAPIView):
     permission_classes = [permissions.AllowAny]  # public for mobile
 
-    def get(self, request):
+    async def get(self, request):
         try:
             lat = float(request.query_params.get("latitude"))
             lng = float(request.query_params.get("longitude"))
@@ -33,27 +36,27 @@ class NearbyMallView(APIView):
             )
 
         malls = []
-        for mall in Mall.objects.filter(is_active=True).only("id", "name", "latitude", "longitude"):
-            dist = haversine(lat, lng, mall.latitude, mall.longitude)
-            
+        async for row in MALL_LIST.values(Mall.objects.filter(is_active=True), "latitude", "longitude"):
+            dist = haversine(lat, lng, row["latitude"], row["longitude"])
+
             if dist <= MAX_DISTANCE:
-                mall.distance = round(dist, 2)
+                mall = MALL_LIST.row(row, request)
+                mall["distance"] = round(dist, 2)
                 malls.append(mall)
 
-        malls.sort(key=lambda m: m.distance)
-        serializer = MallSerializer(malls, many=True, context={"request": request})
+        malls.sort(key=lambda m: m["distance"])
 
         return success_response(
             message="Nearby malls fetched successfully",
-            data=serializer.data,
+            data=malls,
             status=status.HTTP_200_OK,
         )
 
     
-class MallOffersView(APIView):
+class MallOffersView(ReplicaReadMixin, AsyncAPIView):
     permission_classes = [permissions.AllowAny]
 
-    def get(self, request):
+    async def get(self, request):
         current_time = now()
 
         offers = (
@@ -74,7 +77,8 @@ class MallOffersView(APIView):
         #         seen_malls.add(offer.mall_id)
         #         unique_offers.append(offer)
 
-        serializer = OfferSerializer(offers, many=True, context={"request": request})
+        # Fetch before serializing: mall_name comes from the select_related join
+        serializer = OfferSerializer([offer async for offer in offers], many=True, context={"request": request})
 
         return success_response(
             message="Active mall offers fetched",
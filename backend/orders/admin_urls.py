@@ -0,0 +1,6 @@
+from django.urls import path
+from .admin_views import AdminInvoiceExportView
+
+urlpatterns = [
+    path("invoices/export/", AdminInvoiceExportView.as_view()),
+]
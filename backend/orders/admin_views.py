@@ -0,0 +1,64 @@
+from rest_framework.views import APIView
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+
+from common.responses import error_response
+from malls.models import MallStaff
+from .exports import stream_invoice_zip
+from .invoice import INVOICE_FINAL_STATUSES, invoice_queryset
+
+
+class AdminInvoiceExportView(APIView):
+    """
+    GET /api/admin/orders/invoices/export/?from=YYYY-MM-DD&to=YYYY-MM-DD
+
+    Streams a ZIP of the mall's PAID/FULFILLED invoices in the date range
+    (inclusive) plus gst_summary.csv.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        staff = MallStaff.objects.filter(
+            user=request.user,
+            role="MALL_ADMIN"
+        ).select_related("mall").first()
+
+        if not staff:
+            return error_response(
+                message="Not authorized",
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        date_from = parse_date(request.query_params.get("from") or "")
+        date_to = parse_date(request.query_params.get("to") or "")
+
+        if not date_from or not date_to or date_from > date_to:
+            return error_response(
+                message="A valid from/to date range is required",
+                errors={"from": ["YYYY-MM-DD"], "to": ["YYYY-MM-DD"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        orders = (
+            invoice_queryset()
+            .select_related("invoice_artifact")
+            .filter(
+                mall=staff.mall,
+                status__in=INVOICE_FINAL_STATUSES,
+                created_at__date__gte=date_from,
+                created_at__date__lte=date_to,
+            )
+            .order_by("created_at", "id")
+        )
+
+        response = StreamingHttpResponse(
+            stream_invoice_zip(orders, workers=settings.INVOICE_EXPORT_WORKERS),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="invoices_{date_from}_{date_to}.zip"'
+        )
+        return response
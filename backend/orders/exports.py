@@ -0,0 +1,189 @@
+import csv
+import io
+import logging
+import multiprocessing
+import shutil
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from decimal import Decimal
+
+import django
+from django.db.models import Count, Sum
+
+from .invoice import invoice_context
+from .models import OrderItem
+from .utils import money
+
+
+logger = logging.getLogger(__name__)
+
+
+GST_SUMMARY_FIELDS = [
+    "gst_rate",
+    "lines",
+    "taxable_value",
+    "cgst",
+    "sgst",
+    "tax",
+    "total",
+]
+
+
+class _ZipChunkWriter(io.RawIOBase):
+    """
+    Write-only, unseekable sink for zipfile. Because it cannot seek,
+    zipfile writes each member with a trailing data descriptor, so bytes can
+    be handed to the client as soon as a member is finished.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def gst_summary_rows(orders):
+    """
+    Rate-wise GST totals over the given orders, aggregated in SQL.
+    """
+    rows = (
+        OrderItem.objects.filter(order__in=orders)
+        .values("gst_rate")
+        .annotate(
+            lines=Count("id"),
+            taxable_value=Sum("taxable_value"),
+            cgst=Sum("cgst_amount"),
+            sgst=Sum("sgst_amount"),
+            tax=Sum("tax_amount"),
+            total=Sum("total_price"),
+        )
+        .order_by("gst_rate")
+    )
+
+    totals = {field: Decimal("0.00") for field in GST_SUMMARY_FIELDS[2:]}
+    totals["lines"] = 0
+
+    for row in rows:
+        for field in GST_SUMMARY_FIELDS[2:]:
+            row[field] = money(row[field] or 0)
+            totals[field] += row[field]
+        totals["lines"] += row["lines"]
+        yield row
+
+    yield {"gst_rate": "TOTAL", **totals}
+
+
+def _open_artifact(order):
+    """
+    The order's stored invoice PDF open for reading, or None when there is
+    none or its file has gone missing from storage.
+    """
+    artifact = getattr(order, "invoice_artifact", None)
+    if not artifact:
+        return None
+
+    try:
+        return artifact.file.open("rb")
+    except OSError:
+        logger.warning(
+            "Invoice file %s for order %s is missing; drawing it again",
+            artifact.file.name,
+            order.id,
+        )
+        return None
+
+
+def stream_invoice_zip(orders, *, workers=2, chunk_size=50):
+    """
+    Yield a ZIP archive of invoice PDFs for `orders` (an invoice_queryset()),
+    followed by gst_summary.csv.
+
+    Stored invoice artifacts are copied straight into the archive; the rest,
+    and any whose file is missing, are drawn in a process pool. At most 2 * workers renders are in flight,
+    so memory stays flat however many orders the range covers.
+    """
+    return (
+        chunk
+        for chunk in _invoice_zip_chunks(orders, workers=workers, chunk_size=chunk_size)
+        if chunk
+    )
+
+
+def _invoice_zip_chunks(orders, *, workers, chunk_size):
+    # Loaded on first export, like the single invoice renderer
+    from .invoice_pdf import draw_invoice_pdf
+
+    sink = _ZipChunkWriter()
+    failed = []
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        # Workers only draw from plain dicts; they never touch the database
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        ) as pool:
+            in_flight = {}
+
+            def write_finished(futures):
+                for future in futures:
+                    order_number = in_flight.pop(future)
+                    try:
+                        pdf_bytes = future.result()
+                    except Exception as e:
+                        failed.append({"order_number": order_number, "error": str(e)})
+                        continue
+                    archive.writestr(f"invoice_{order_number}.pdf", pdf_bytes)
+
+            for order in orders.iterator(chunk_size=chunk_size):
+                src = _open_artifact(order)
+
+                if src:
+                    with src, archive.open(
+                        f"invoice_{order.order_number}.pdf", "w"
+                    ) as dst:
+                        shutil.copyfileobj(src, dst)
+                else:
+                    future = pool.submit(draw_invoice_pdf, invoice_context(order))
+                    in_flight[future] = order.order_number
+
+                    if len(in_flight) >= 2 * workers:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        write_finished(done)
+
+                yield sink.drain()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                write_finished(done)
+                yield sink.drain()
+
+        with archive.open("gst_summary.csv", "w") as raw:
+            text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+            writer = csv.DictWriter(text, fieldnames=GST_SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(gst_summary_rows(orders))
+            text.flush()
+            text.detach()
+
+        if failed:
+            with archive.open("failed.csv", "w") as raw:
+                text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                writer = csv.DictWriter(text, fieldnames=["order_number", "error"])
+                writer.writeheader()
+                writer.writerows(failed)
+                text.flush()
+                text.detach()
+
+    # Central directory
+    yield sink.drain()
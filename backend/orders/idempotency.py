@@ -0,0 +1,136 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from common.responses import error_response
+from .models import IdempotencyKey
+
+
+# Outcomes that depend on what else is happening at the moment (a row another
+# request has locked, stock held by other shoppers), not on the request itself.
+# They aren't stored, so a retry with the same key runs the handler again
+TRANSIENT_STATUSES = (
+    status.HTTP_409_CONFLICT,
+    status.HTTP_423_LOCKED,
+    status.HTTP_429_TOO_MANY_REQUESTS,
+)
+
+
+def _request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def idempotent(endpoint):
+    """
+    Decorate an APIView handler so that requests carrying an
+    Idempotency-Key header run at most once per (user, key, endpoint).
+
+    Replays return the stored response without entering the handler, so
+    retries never reach its select_for_update transaction. Put it above
+    @transaction.atomic. Requests without the header are unaffected.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if not key:
+                return handler(view, request, *args, **kwargs)
+
+            if len(key) > 255:
+                return error_response(
+                    message="Idempotency-Key is too long",
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            request_hash = _request_hash(request)
+            now = timezone.now()
+
+            record = IdempotencyKey.objects.filter(
+                user=request.user,
+                key=key,
+                endpoint=endpoint,
+            ).first()
+
+            if record:
+                expired = record.created_at <= now - settings.IDEMPOTENCY_KEY_TTL
+                abandoned = (
+                    record.response_status is None
+                    and record.created_at <= now - settings.IDEMPOTENCY_LOCK_TIMEOUT
+                )
+
+                if expired or abandoned:
+                    record.delete()
+                    record = None
+
+            if record:
+                if record.request_hash != request_hash:
+                    return error_response(
+                        message="Idempotency-Key was already used with a different request",
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+
+                if record.response_status is None:
+                    return error_response(
+                        message="A request with this Idempotency-Key is in progress",
+                        status=status.HTTP_409_CONFLICT,
+                    )
+
+                response = Response(record.response_body, status=record.response_status)
+                response["Idempotent-Replayed"] = "true"
+                return response
+
+            # ✅ Claim the key before running the handler
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        endpoint=endpoint,
+                        request_hash=request_hash,
+                    )
+            except IntegrityError:
+                return error_response(
+                    message="A request with this Idempotency-Key is in progress",
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            try:
+                response = handler(view, request, *args, **kwargs)
+            except Exception:
+                record.delete()
+                raise
+
+            # Only final outcomes are stored: server errors and conflicts are
+            # released, so the client can retry them
+            if response.status_code >= 500 or response.status_code in TRANSIENT_STATUSES:
+                record.delete()
+                return response
+
+            record.response_status = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=["response_status", "response_body"])
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def purge_expired_idempotency_keys():
+    """
+    Delete every key older than IDEMPOTENCY_KEY_TTL in one statement.
+
+    Returns: number of rows deleted
+    """
+    cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lte=cutoff).delete()
+    return deleted
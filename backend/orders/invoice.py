@@ -0,0 +1,250 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+from payments.models import Payment
+from .models import Order, OrderItem, InvoiceArtifact
+
+
+logger = logging.getLogger(__name__)
+
+# Orders in these states never change again, so their invoice is
+# rendered once and served from the stored artifact afterwards.
+INVOICE_FINAL_STATUSES = ("PAID", "FULFILLED")
+
+# Everything the invoice reads from related tables, fetched up front so a
+# batch of orders costs a fixed number of queries.
+INVOICE_PREFETCHES = (
+    Prefetch(
+        "items",
+        queryset=OrderItem.objects.order_by("id"),
+    ),
+    Prefetch(
+        "payments",
+        queryset=Payment.objects.filter(status="PAID").order_by("id"),
+        to_attr="paid_payments",
+    ),
+)
+
+
+def invoice_queryset():
+    return (
+        Order.objects.select_related("mall", "user")
+        .prefetch_related(*INVOICE_PREFETCHES)
+    )
+
+
+# OrderItem columns an invoice row is built from, in invoice_rows() order
+INVOICE_ITEM_FIELDS = (
+    "product_name",
+    "hsn_code",
+    "quantity",
+    "product_price",
+    "cgst_amount",
+    "sgst_amount",
+    "total_price",
+)
+
+# Lines fetched per query when an invoice is drawn straight from the database
+INVOICE_ITEM_CHUNK_SIZE = 500
+
+# A rendered PDF stays in memory up to this size, then spills to a temp file
+INVOICE_SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def invoice_rows(items):
+    """
+    Table rows from (product_name, hsn_code, quantity, product_price,
+    cgst_amount, sgst_amount, total_price) tuples. Lazy: rows are built as
+    the drawing code takes them.
+    """
+    for i, (name, hsn_code, quantity, price, cgst, sgst, total) in enumerate(items, start=1):
+        yield [
+            str(i),
+            name,
+            hsn_code,
+            str(quantity),
+            f"{price:.2f}",
+            f"{cgst:.2f}",
+            f"{sgst:.2f}",
+            f"{total:.2f}",
+        ]
+
+
+def invoice_context(order, items=None):
+    """
+    Flatten an order (loaded via invoice_queryset) into the plain values the
+    PDF needs. The result is picklable, so it can be rendered in a worker
+    process without database access.
+
+    `items` replaces the prefetched order lines with any iterable of rows
+    (see render_invoice_file); the result is then no longer picklable.
+    """
+    mall = order.mall
+    payment = order.paid_payments[0] if order.paid_payments else None
+
+    if items is None:
+        items = list(invoice_rows(
+            [getattr(item, field) for field in INVOICE_ITEM_FIELDS]
+            for item in order.items.all()
+        ))
+
+    return {
+        "order_number": order.order_number,
+        "invoice_no": f"PM-{order.created_at.strftime('%Y%m%d')}{order.id}",
+        "invoice_date": order.created_at.strftime("%d-%b-%Y"),
+        "mall": {
+            "name": mall.name,
+            "address": mall.address or "",
+            "gstin": getattr(mall, "gstin", ""),
+            "fssai": getattr(mall, "fssai", ""),
+            "state_name": getattr(mall, "state_name", ""),
+            "state_code": getattr(mall, "state_code", ""),
+        },
+        "customer_email": order.user.email,
+        "customer_phone": getattr(order.user, "phone_number", None),
+        "items": items,
+        "subtotal": order.subtotal,
+        "cgst": order.cgst,
+        "sgst": order.sgst,
+        "total": order.total,
+        "payment_provider": payment.provider if payment else None,
+        "gateway_payment_id": payment.gateway_payment_id if payment else None,
+    }
+
+
+def render_invoice_file(order):
+    """
+    Draw the tax invoice for an order into a spooled temp file, rewound and
+    wrapped in a django File (so it has a size).
+
+    The lines are read from the database in chunks and drawn a page at a
+    time, so neither the order's lines nor the laid-out table are ever held
+    in full: memory grows by one compressed page stream per page, whatever
+    the line count.
+    """
+    # Only the paid payment; the lines are streamed below
+    prefetch_related_objects([order], INVOICE_PREFETCHES[1])
+
+    items = (
+        OrderItem.objects.filter(order=order)
+        .order_by("id")
+        .values_list(*INVOICE_ITEM_FIELDS)
+        .iterator(chunk_size=INVOICE_ITEM_CHUNK_SIZE)
+    )
+
+    # ReportLab loads with the first invoice this process draws
+    from .invoice_pdf import write_invoice_pdf
+
+    out = SpooledTemporaryFile(max_size=INVOICE_SPOOL_MAX_SIZE)
+    try:
+        write_invoice_pdf(invoice_context(order, items=invoice_rows(items)), out)
+    except BaseException:
+        out.close()
+        raise
+
+    out.seek(0)
+    return File(out, name=f"invoice_{order.order_number}.pdf")
+
+
+def render_invoice_pdf(order) -> bytes:
+    """
+    Draw the tax invoice for an order and return the PDF bytes.
+    """
+    with render_invoice_file(order) as f:
+        return f.read()
+
+
+def invoice_artifact_path(content_hash):
+    return f"invoices/{content_hash[:2]}/{content_hash}.pdf"
+
+
+def get_or_create_invoice_artifact(order):
+    """
+    Return the stored invoice for a PAID/FULFILLED order, rendering and
+    storing it (content-addressed by sha256) on first use.
+    """
+    artifact = InvoiceArtifact.objects.filter(order=order).first()
+
+    if artifact and default_storage.exists(artifact.file.name):
+        return artifact
+
+    with render_invoice_file(order) as pdf:
+        digest = hashlib.sha256()
+        for chunk in pdf.chunks():
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+        size = pdf.size
+
+        name = invoice_artifact_path(content_hash)
+        if not default_storage.exists(name):
+            pdf.seek(0)
+            saved = default_storage.save(name, pdf)
+            # A concurrent first download stored the same bytes first and the
+            # storage gave this copy another name: keep theirs
+            if saved != name:
+                default_storage.delete(saved)
+
+    if artifact:
+        artifact.content_hash = content_hash
+        artifact.file.name = name
+        artifact.size = size
+        artifact.save(update_fields=["content_hash", "file", "size"])
+        return artifact
+
+    artifact, _ = InvoiceArtifact.objects.get_or_create(
+        order=order,
+        defaults={
+            "content_hash": content_hash,
+            "file": name,
+            "size": size,
+        },
+    )
+    return artifact
+
+
+# Renders invoices after payment without holding up the payment request.
+# Threads are only started by the first submit()
+_precompute_pool = ThreadPoolExecutor(
+    max_workers=max(settings.INVOICE_PRECOMPUTE_WORKERS, 1),
+    thread_name_prefix="invoice-precompute",
+)
+
+
+def _render_invoice_artifact(order_id):
+    try:
+        order = (
+            Order.objects.select_related("mall", "user")
+            .filter(id=order_id, status__in=INVOICE_FINAL_STATUSES)
+            .first()
+        )
+        if order:
+            get_or_create_invoice_artifact(order)
+    except Exception:
+        # Not fatal: the invoice is rendered on first download instead
+        logger.exception("Error precomputing invoice for order %s", order_id)
+    finally:
+        # Pool threads outlive requests, so nothing else closes this connection
+        connection.close()
+
+
+def precompute_invoice_on_commit(order_id):
+    """
+    Once the surrounding transaction has committed the order as PAID, render
+    its invoice on a background thread, so the first download is already a
+    plain file read and the payment response doesn't wait for ReportLab.
+
+    With INVOICE_PRECOMPUTE_WORKERS = 0 nothing is precomputed and the
+    invoice is rendered on first download.
+    """
+    if settings.INVOICE_PRECOMPUTE_WORKERS <= 0:
+        return
+
+    transaction.on_commit(lambda: _precompute_pool.submit(_render_invoice_artifact, order_id))
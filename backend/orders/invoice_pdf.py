@@ -0,0 +1,316 @@
+"""
+Invoice PDF drawing with ReportLab.
+
+Only orders/invoice.py (render_invoice_file) and the batch export import
+this module, inside the functions that draw. ReportLab, and the Pillow it
+pulls in, are therefore loaded by the first invoice a worker renders rather
+than by every worker at startup (`manage.py bench_startup` measures the
+difference).
+"""
+
+import logging
+import os
+from functools import lru_cache
+from io import BytesIO
+from itertools import chain, islice
+
+from django.conf import settings
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.platypus import Table, TableStyle
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase import pdfmetrics
+from reportlab.graphics.barcode import code128
+
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def register_invoice_fonts():
+    """
+    Register the DejaVu fonts (₹ support) once per process.
+
+    Returns: (normal_font_name, bold_font_name)
+    """
+    fonts_dir = os.path.join(settings.BASE_DIR, "static", "fonts")
+
+    # Define the fallback-safe variables
+    font_normal = "Helvetica"
+    font_bold = "Helvetica-Bold"
+
+    # Try to register Normal Font
+    try:
+        normal_font_path = os.path.join(fonts_dir, "DejaVuSans.ttf")
+        pdfmetrics.registerFont(TTFont("DejaVu", normal_font_path))
+        font_normal = "DejaVu"
+    except Exception as e:
+        logger.warning("Error loading DejaVuSans, using %s: %s", font_normal, e)
+
+    # Try to register Bold Font
+    try:
+        bold_font_path = os.path.join(fonts_dir, "DejaVuSans-Bold.ttf")
+        pdfmetrics.registerFont(TTFont("DejaVu-Bold", bold_font_path))
+        font_bold = "DejaVu-Bold"
+    except Exception as e:
+        logger.warning("Error loading DejaVuSans-Bold, using %s: %s", font_bold, e)
+
+    return font_normal, font_bold
+
+
+# Items table layout. Cells are single-line, so every row is the same height
+# and the number of rows that fit on a page is known before drawing it
+INVOICE_TABLE_HEADER = ["#", "Item", "HSN", "Qty", "Rate", "CGST", "SGST", "Total"]
+INVOICE_COL_WIDTHS = [25, 170, 50, 35, 55, 55, 55, 60]
+INVOICE_ROW_HEIGHT = 18
+INVOICE_BOTTOM_MARGIN = 40
+# Totals, payment, barcode and footer, measured from the bottom of the table
+INVOICE_SUMMARY_HEIGHT = 370
+
+
+def draw_invoice_pdf(ctx) -> bytes:
+    """
+    Draw the tax invoice from a picklable invoice_context() dict and return
+    the PDF bytes (the batch export renders these in a process pool).
+    """
+    buffer = BytesIO()
+    write_invoice_pdf(ctx, buffer)
+    return buffer.getvalue()
+
+
+def write_invoice_pdf(ctx, out):
+    """
+    Draw the tax invoice from an invoice_context() dict into the binary file
+    `out`.
+
+    ctx["items"] can be any iterable of rows. They are taken one page at a
+    time: each page's table is laid out, drawn and finished (compressed)
+    before the next page's rows are read. Pages after the first repeat the
+    table header under a short running header. The totals block moves to a
+    new page when it doesn't fit under the last rows.
+    """
+    fonts = register_invoice_fonts()
+    # invariant: no creation date or random document ID, so the same order
+    # always renders to the same bytes (and the same artifact hash)
+    pdf = canvas.Canvas(out, pagesize=A4, pageCompression=1, invariant=1)
+
+    y = _draw_first_page_header(pdf, ctx, fonts)
+
+    rows = iter(ctx["items"])
+    page = 1
+    while True:
+        # One row of the space goes to the table header
+        fits = int((y - INVOICE_BOTTOM_MARGIN) // INVOICE_ROW_HEIGHT) - 1
+        y = _draw_items_table(pdf, list(islice(rows, fits)), y)
+
+        following = next(rows, None)
+        if following is None:
+            break
+
+        rows = chain([following], rows)
+        pdf.showPage()
+        page += 1
+        y = _draw_continuation_header(pdf, ctx, fonts, page)
+
+    if y - INVOICE_SUMMARY_HEIGHT < INVOICE_BOTTOM_MARGIN:
+        pdf.showPage()
+        page += 1
+        y = _draw_continuation_header(pdf, ctx, fonts, page)
+
+    _draw_summary(pdf, ctx, fonts, y)
+
+    pdf.showPage()
+    pdf.save()
+
+
+def _draw_first_page_header(pdf, ctx, fonts):
+    """
+    Seller, logo, title, invoice details and customer. Returns the y the
+    items table starts at.
+    """
+    FONT_NORMAL, FONT_BOLD = fonts
+    width, height = A4
+    mall = ctx["mall"]
+
+    # -----------------------------------
+    # HEADER LEFT
+    # -----------------------------------
+    y = height - 50
+
+    pdf.setFont(FONT_BOLD, 14)
+    pdf.drawString(40, y, mall["name"])
+
+    pdf.setFont(FONT_NORMAL, 10)
+    pdf.drawString(40, y - 18, mall["address"])
+
+    pdf.drawString(40, y - 36, f"GSTIN: {mall['gstin']}")
+    pdf.drawString(40, y - 52, f"FSSAI: {mall['fssai']}")
+
+    # -----------------------------------
+    # LOGO RIGHT (Proper Placement)
+    # -----------------------------------
+    logo_path = os.path.join(settings.BASE_DIR, "static/images/logo.png")
+    if os.path.exists(logo_path):
+        pdf.drawImage(
+            logo_path,
+            width - 170,
+            height - 80,
+            width=130,
+            height=45,
+            preserveAspectRatio=True,
+            mask="auto",
+        )
+
+    # LINE
+    pdf.setStrokeColor(colors.grey)
+    pdf.line(40, height - 110, width - 40, height - 110)
+
+    # -----------------------------------
+    # TITLE
+    # -----------------------------------
+    pdf.setFont(FONT_BOLD, 12)
+
+    pdf.drawCentredString(width / 2, height - 130, "TAX INVOICE (IN-STORE PURCHASE)")
+    pdf.line(40, height - 140, width - 40, height - 140)
+
+    # -----------------------------------
+    # META
+    # -----------------------------------
+    pdf.setFont(FONT_NORMAL, 12)
+
+    meta_y = height - 160
+    pdf.drawString(40, meta_y, f"Invoice No: {ctx['invoice_no']}")
+    pdf.drawString(40, meta_y - 18, f"Order ID: {ctx['order_number']}")
+    pdf.drawString(40, meta_y - 36, f"Invoice Date: {ctx['invoice_date']}")
+    pdf.drawString(
+        40,
+        meta_y - 54,
+        f"Place of Supply: {mall['state_name']} ({mall['state_code']})",
+    )
+
+    pdf.line(40, meta_y - 70, width - 40, meta_y - 70)
+
+    # -----------------------------------
+    # BILL TO
+    # -----------------------------------
+    bill_y = meta_y - 100
+
+    pdf.setFillColor(colors.HexColor("#1E3A8A"))
+    pdf.drawString(40, bill_y, "BILL TO")
+    pdf.setFillColor(colors.black)
+
+    pdf.drawString(
+        40,
+        bill_y - 20,
+        f"Customer Name: {ctx['customer_email']}",
+    )
+
+    if ctx["customer_phone"]:
+        pdf.drawString(
+            40,
+            bill_y - 38,
+            f"Mobile: +91 {ctx['customer_phone']}",
+        )
+
+    return bill_y - 70
+
+
+def _draw_continuation_header(pdf, ctx, fonts, page):
+    FONT_NORMAL, FONT_BOLD = fonts
+    width, height = A4
+
+    pdf.setFont(FONT_BOLD, 12)
+    pdf.drawString(40, height - 50, ctx["mall"]["name"])
+
+    pdf.setFont(FONT_NORMAL, 10)
+    pdf.drawRightString(width - 40, height - 50, f"Invoice No: {ctx['invoice_no']} (page {page})")
+
+    pdf.setStrokeColor(colors.grey)
+    pdf.line(40, height - 60, width - 40, height - 60)
+
+    return height - 80
+
+
+def _draw_items_table(pdf, rows, top):
+    """
+    Draw one page's rows under the table header. Returns the table's bottom y.
+    """
+    width, height = A4
+
+    table = Table([INVOICE_TABLE_HEADER, *rows], colWidths=INVOICE_COL_WIDTHS)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1E3A8A")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#CBD5E1")),
+        ("ALIGN", (3, 1), (-1, -1), "RIGHT"),
+    ]))
+
+    table.wrapOn(pdf, width, height)
+    table_height = INVOICE_ROW_HEIGHT * (len(rows) + 1)
+    table.drawOn(pdf, 40, top - table_height)
+
+    return top - table_height
+
+
+def _draw_summary(pdf, ctx, fonts, table_bottom):
+    FONT_NORMAL, FONT_BOLD = fonts
+    width, height = A4
+    mall = ctx["mall"]
+
+    pdf.setStrokeColor(colors.grey)
+
+    # -----------------------------------
+    # TOTALS RIGHT SIDE
+    # -----------------------------------
+    summary_y = table_bottom - 30
+
+    pdf.setFont(FONT_NORMAL, 10)
+
+    pdf.drawRightString(width - 40, summary_y, f"Item Total: ₹{ctx['subtotal']:.2f}")
+    pdf.drawRightString(width - 40, summary_y - 18, f"CGST: ₹{ctx['cgst']:.2f}")
+    pdf.line(width - 200, summary_y - 22, width - 40, summary_y - 22)
+
+    pdf.drawRightString(width - 40, summary_y - 36, f"SGST: ₹{ctx['sgst']:.2f}")
+    pdf.line(width - 200, summary_y - 40, width - 40, summary_y - 40)
+
+    pdf.setFont(FONT_NORMAL, 11)
+    pdf.drawRightString(width - 40, summary_y - 60, f"Invoice Value: ₹{ctx['total']:.2f}")
+
+    pdf.line(40, summary_y - 80, width - 40, summary_y - 80)
+
+    # -----------------------------------
+    # PAYMENT (FROM Payment MODEL)
+    # -----------------------------------
+    pay_y = summary_y - 100
+
+    pdf.setFillColor(colors.HexColor("#1E3A8A"))
+    pdf.drawString(40, pay_y, f"Payment Mode: {ctx['payment_provider'] or 'Cash'}")
+    pdf.setFillColor(colors.black)
+
+    if ctx["gateway_payment_id"]:
+        pdf.setFillColor(colors.HexColor("#1E3A8A"))
+        pdf.drawString(40, pay_y - 18, f"Transaction ID: {ctx['gateway_payment_id']}")
+        pdf.setFillColor(colors.black)
+
+    pdf.line(40, pay_y - 35, width - 40, pay_y - 35)
+
+    # -----------------------------------
+    # BARCODE
+    # -----------------------------------
+    barcode = code128.Code128(ctx["order_number"], barHeight=40, barWidth=1)
+    barcode.drawOn(pdf, 40, pay_y - 90)
+
+    # -----------------------------------
+    # FOOTER
+    # -----------------------------------
+    pdf.drawString(40, pay_y - 120, "This is a system-generated invoice for an in-store purchase.")
+
+    pdf.setFont(FONT_NORMAL, 10)
+    pdf.drawString(40, pay_y - 150, "Seller")
+    pdf.drawString(40, pay_y - 165, mall["name"])
+    pdf.drawString(40, pay_y - 180, mall["address"])
+
+    pdf.drawString(40, pay_y - 210, "Platform:")
+    pdf.drawString(40, pay_y - 225, "PayMall Technologies Pvt. Ltd.")
+    pdf.drawString(40, pay_y - 240, "Made in India 🇮🇳")
@@ -0,0 +1,121 @@
+import re
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from accounts.models import User
+from malls.models import Mall
+from orders.models import Order, OrderItem
+from orders.invoice import get_or_create_invoice_artifact, render_invoice_pdf
+from orders.invoice_pdf import register_invoice_fonts
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark invoice generation for orders of different sizes. "
+        "All rows are created inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lines",
+            type=int,
+            nargs="+",
+            default=[10, 100, 500],
+            help="Order line counts to benchmark",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Font registration is a one-off per process; time it separately
+        started = time.perf_counter()
+        register_invoice_fonts()
+        self.stdout.write(f"font registration: {(time.perf_counter() - started) * 1000:.1f} ms (once per process)")
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=f"bench-{uuid.uuid4().hex[:8]}@paymall.local",
+                    password=None,
+                    signup_source=User.SignupSource.CUSTOMER,
+                )
+                mall = Mall.objects.create(
+                    name="Benchmark Mall",
+                    address="1 Benchmark Road",
+                    latitude=0.0,
+                    longitude=0.0,
+                )
+
+                self.stdout.write(
+                    f"{'lines':>6} {'pages':>6} {'render p50':>12} {'render max':>12} "
+                    f"{'peak mem':>10} {'stored hit':>12} {'size':>10}"
+                )
+
+                for lines in options["lines"]:
+                    order = self._make_order(user, mall, lines)
+
+                    timings = []
+                    for _ in range(options["repeat"]):
+                        started = time.perf_counter()
+                        pdf_bytes = render_invoice_pdf(order)
+                        timings.append(time.perf_counter() - started)
+
+                    # Python allocations while drawing: flat per page, not per line
+                    tracemalloc.start()
+                    render_invoice_pdf(order)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    pages = len(re.findall(rb"/Type /Page\b", pdf_bytes))
+
+                    get_or_create_invoice_artifact(order)
+                    started = time.perf_counter()
+                    get_or_create_invoice_artifact(order)
+                    hit = time.perf_counter() - started
+
+                    self.stdout.write(
+                        f"{lines:>6} {pages:>6} "
+                        f"{statistics.median(timings) * 1000:>9.1f} ms "
+                        f"{max(timings) * 1000:>9.1f} ms "
+                        f"{peak / 1024:>7.0f} KB "
+                        f"{hit * 1000:>9.2f} ms "
+                        f"{len(pdf_bytes):>8} B"
+                    )
+
+                transaction.set_rollback(True)
+
+    def _make_order(self, user, mall, lines):
+        order = Order.objects.create(
+            user=user,
+            mall=mall,
+            order_number=f"BENCH-{uuid.uuid4().hex[:12].upper()}",
+            status="PAID",
+            subtotal=Decimal("0.00"),
+            tax=Decimal("0.00"),
+            total=Decimal("0.00"),
+        )
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_name=f"Benchmark product {i}",
+                product_price=Decimal("118.00"),
+                product_barcode=f"BENCH{i:08d}",
+                quantity=1,
+                gst_rate=Decimal("18.00"),
+                taxable_value=Decimal("100.00"),
+                tax_amount=Decimal("18.00"),
+                cgst_amount=Decimal("9.00"),
+                sgst_amount=Decimal("9.00"),
+                total_price=Decimal("118.00"),
+            )
+            for i in range(lines)
+        ])
+
+        return order
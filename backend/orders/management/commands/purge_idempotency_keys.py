@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_expired_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_idempotency_keys()
+        self.stdout.write(f"Deleted {deleted} expired idempotency keys")
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_delete_paymentattempt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('file', models.FileField(max_length=255, upload_to='invoices/')),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_artifact', to='orders.order')),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:58
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_hsn_code(apps, schema_editor):
+    OrderItem = apps.get_model("orders", "OrderItem")
+    Product = apps.get_model("products", "Product")
+
+    OrderItem.objects.filter(product__isnull=False).update(
+        hsn_code=Coalesce(
+            Subquery(
+                Product.objects.filter(id=OuterRef("product_id")).values("hsn_code")[:1]
+            ),
+            models.Value(""),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_invoiceartifact'),
+        ('products', '0002_product_gst_rate_product_hsn_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='hsn_code',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.RunPython(backfill_hsn_code, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('malls', '0002_mall_malls_mall_is_acti_ca772f_idx'),
+        ('orders', '0007_orderitem_hsn_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='orders_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('malls', '0002_mall_malls_mall_is_acti_ca772f_idx'),
+        ('orders', '0009_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_orde_user_id_95ad3c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'mall', 'status', 'cart_hash', 'expires_at'], name='order_pending_lookup_idx'),
+        ),
+    ]
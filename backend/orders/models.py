@@ -2,6 +2,7 @@ from django.db import models
 from malls.models import Mall
 from products.models import Product
 from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
 
 class Order(models.Model):
     STATUS = (
@@ -38,7 +39,14 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=["user", "status"]),
             models.Index(fields=["order_number"]),
-            models.Index(fields=["user", "mall", "status"]),
+            # Checkout: expire / reuse the shopper's pending order for this
+            # mall and cart (prefix also serves (user, mall, status) filters)
+            models.Index(
+                fields=["user", "mall", "status", "cart_hash", "expires_at"],
+                name="order_pending_lookup_idx",
+            ),
+            # Order history keyset pages: (user, created_at, id) range scans
+            models.Index(fields=["user", "created_at", "id"], name="orders_user_created_idx"),
         ]
 
     def __str__(self):
@@ -54,6 +62,7 @@ class OrderItem(models.Model):
     product_name = models.CharField(max_length=200)
     product_price = models.DecimalField(max_digits=10, decimal_places=2)
     product_barcode = models.CharField(max_length=50)
+    hsn_code = models.CharField(max_length=20, blank=True, default="")
     quantity = models.PositiveIntegerField(default=1)
     
     gst_rate = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal("0.00"))
@@ -77,4 +86,45 @@ class ExitOTP(models.Model):
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["order"], name="unique_exit_otp_per_order")
-        ]
\ No newline at end of file
+        ]
+
+class InvoiceArtifact(models.Model):
+    """Rendered invoice PDF, stored once the order reaches a final state"""
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="invoice_artifact")
+
+    # sha256 of the PDF bytes; the file is stored under this name
+    content_hash = models.CharField(max_length=64, db_index=True)
+    file = models.FileField(upload_to="invoices/", max_length=255)
+    size = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Invoice {self.content_hash[:12]} - Order #{self.order_id}"
+
+
+class IdempotencyKey(models.Model):
+    """First response to a client-supplied Idempotency-Key, per user and endpoint"""
+    user = models.ForeignKey("accounts.User", on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=100)
+
+    # sha256 of the request body; a reused key with a different body is rejected
+    request_hash = models.CharField(max_length=64)
+
+    # Empty while the first request is still being processed
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key", "endpoint"],
+                name="unique_idempotency_key_per_endpoint",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.key}"
@@ -0,0 +1,15 @@
+from common.projections import Field, Projection
+
+from .models import Order
+
+
+# Same JSON as OrderListSerializer: an order whose mall was deleted has no
+# "mall_name" key
+ORDER_LIST = Projection(Order, [
+    "id",
+    "order_number",
+    "status",
+    "total",
+    Field("mall_name", "mall__name"),
+    "created_at",
+])
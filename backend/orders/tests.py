@@ -1,3 +1,397 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from common.locking import RowLocked
+from common.pagination import decode_cursor, encode_cursor
+from common.testing import ShopFixture
+from .invoice import (
+    _render_invoice_artifact,
+    get_or_create_invoice_artifact,
+    precompute_invoice_on_commit,
+)
+from .invoice_pdf import register_invoice_fonts
+from .models import IdempotencyKey, InvoiceArtifact, Order
+from .serializers import OrderListSerializer
+
+
+class MediaRootMixin:
+    """Files the tests store go to a temp MEDIA_ROOT"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "invoice-data",
+        }
+    },
+)
+class InvoiceDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture(lines=2)
+        cls.order = cls.fixture.paid_order
+        cls.url = f"/api/orders/{cls.order.id}/invoice-data/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.customer)
+
+    def test_etag_revalidation(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_number"], self.order.order_number)
+        self.assertEqual(len(response.data["items"]), 2)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_data_is_served_with_one_query(self):
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_status_change_gives_a_new_version(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        self.order.status = "FULFILLED"
+        self.order.save(update_fields=["status"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_mall_edit_reaches_the_invoice(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        mall = self.fixture.mall
+        mall.name = "Renamed Mall"
+        mall.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["mall"]["name"], "Renamed Mall")
+
+    def test_other_users_order(self):
+        self.client.force_authenticate(self.fixture.mall_admin)
+        self.client.get(self.url)
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class InvoiceArtifactTests(MediaRootMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+
+    def test_rendering_is_reproducible(self):
+        order = self.fixture.paid_order
+        first = get_or_create_invoice_artifact(order)
+
+        self.assertEqual(get_or_create_invoice_artifact(order).pk, first.pk)
+
+        # Rendered again from scratch: same bytes, so same hash and same file
+        first.delete()
+        second = get_or_create_invoice_artifact(order)
+
+        self.assertEqual(second.content_hash, first.content_hash)
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(len(default_storage.listdir(f"invoices/{first.content_hash[:2]}")[1]), 1)
+
+    def test_download_etag(self):
+        client = APIClient()
+        client.force_authenticate(self.fixture.customer)
+        url = f"/api/orders/{self.fixture.paid_order.id}/invoice/"
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+        etag = response["ETag"]
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_precompute_runs_on_the_pool_after_commit(self):
+        order = self.fixture.paid_order
+
+        with mock.patch("orders.invoice._precompute_pool") as pool:
+            with self.captureOnCommitCallbacks(execute=True):
+                precompute_invoice_on_commit(order.id)
+                pool.submit.assert_not_called()
+
+        pool.submit.assert_called_once_with(_render_invoice_artifact, order.id)
+
+    @override_settings(INVOICE_PRECOMPUTE_WORKERS=0)
+    def test_precompute_disabled(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            precompute_invoice_on_commit(self.fixture.paid_order.id)
+
+        self.assertEqual(callbacks, [])
+
+    # The pool thread closes its connection; here that would be the test's
+    @mock.patch("orders.invoice.connection")
+    def test_precompute_render(self, connection):
+        _render_invoice_artifact(self.fixture.paid_order.id)
+
+        self.assertTrue(InvoiceArtifact.objects.filter(order=self.fixture.paid_order).exists())
+        connection.close.assert_called_once()
+
+    @mock.patch("orders.invoice.connection")
+    @mock.patch("orders.invoice.get_or_create_invoice_artifact", side_effect=OSError("disk full"))
+    def test_precompute_failure_is_logged(self, render, connection):
+        with self.assertLogs("orders.invoice", "ERROR") as logs:
+            _render_invoice_artifact(self.fixture.paid_order.id)
+
+        self.assertIn(f"order {self.fixture.paid_order.id}", logs.output[0])
+        self.assertIn("disk full", logs.output[0])
+
+    @mock.patch("orders.invoice.connection")
+    def test_precompute_skips_unpaid_orders(self, connection):
+        _render_invoice_artifact(self.fixture.pending_order.id)
+
+        self.assertFalse(InvoiceArtifact.objects.exists())
+
+
+class InvoiceFontTests(SimpleTestCase):
+    def setUp(self):
+        register_invoice_fonts.cache_clear()
+        self.addCleanup(register_invoice_fonts.cache_clear)
+
+    def test_missing_fonts_fall_back_with_a_warning(self):
+        with tempfile.TemporaryDirectory() as base_dir, override_settings(BASE_DIR=Path(base_dir)):
+            with self.assertLogs("orders.invoice_pdf", "WARNING") as logs:
+                fonts = register_invoice_fonts()
+
+        self.assertEqual(fonts, ("Helvetica", "Helvetica-Bold"))
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("DejaVuSans-Bold, using Helvetica-Bold", logs.output[1])
+
+
+@override_settings(INVOICE_EXPORT_WORKERS=1)
+class InvoiceExportTests(MediaRootMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture(lines=2)
+        # A second paid order with no stored artifact: drawn by the pool
+        cls.unrendered = cls.fixture._order("EXPORT-UNRENDERED", "PAID", 1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.mall_admin)
+
+    def export(self, **params):
+        return self.client.get("/api/admin/orders/invoices/export/", params)
+
+    def test_zip_has_every_invoice_and_the_gst_summary(self):
+        get_or_create_invoice_artifact(self.fixture.paid_order)
+        today = timezone.localdate().isoformat()
+
+        response = self.export(**{"from": today, "to": today})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        invoices = [
+            f"invoice_{self.fixture.paid_order.order_number}.pdf",
+            "invoice_EXPORT-UNRENDERED.pdf",
+        ]
+        self.assertCountEqual(archive.namelist(), [*invoices, "gst_summary.csv"])
+
+        for name in invoices:
+            self.assertTrue(archive.read(name).startswith(b"%PDF"))
+
+        summary = list(csv.DictReader(io.TextIOWrapper(archive.open("gst_summary.csv"), encoding="utf-8")))
+        self.assertEqual(summary[-1]["gst_rate"], "TOTAL")
+        self.assertEqual(summary[-1]["lines"], "3")
+
+    def test_missing_artifact_file_is_drawn_again(self):
+        artifact = get_or_create_invoice_artifact(self.fixture.paid_order)
+        default_storage.delete(artifact.file.name)
+        today = timezone.localdate().isoformat()
+
+        with self.assertLogs("orders.exports", "WARNING"):
+            response = self.export(**{"from": today, "to": today})
+            archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+        name = f"invoice_{self.fixture.paid_order.order_number}.pdf"
+        self.assertIn(name, archive.namelist())
+        self.assertNotIn("failed.csv", archive.namelist())
+        self.assertTrue(archive.read(name).startswith(b"%PDF"))
+
+    def test_invalid_range(self):
+        response = self.export(**{"from": "2024-02-01", "to": "2024-01-01"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_customers_are_rejected(self):
+        self.client.force_authenticate(self.fixture.customer)
+        today = timezone.localdate().isoformat()
+
+        self.assertEqual(self.export(**{"from": today, "to": today}).status_code, 403)
+
+
+class OrderListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+        for i in range(3):
+            cls.fixture._order(f"LIST-{i}", "PAID", 1)
+        cls.orders = Order.objects.filter(user=cls.fixture.customer)
+        # Five orders placed in the same instant: only the id breaks the tie
+        cls.orders.update(created_at=timezone.now())
+        cls.newest_first = list(cls.orders.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.customer)
+
+    def page(self, **params):
+        return self.client.get("/api/orders/list/", params)
+
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+        self.assertNotIn("=", encode_cursor(created_at, 42))
+
+    def test_pages_cover_equal_timestamps_once(self):
+        seen = []
+        cursor = None
+
+        while True:
+            response = self.page(limit=2, **({"cursor": cursor} if cursor else {}))
+            self.assertEqual(response.status_code, 200)
+            data = response.json()["data"]
+            seen += [row["id"] for row in data["results"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(seen, self.newest_first)
+
+    def test_invalid_cursor(self):
+        for cursor in ("not-a-cursor", encode_cursor(timezone.now(), 1)[:-3] + "!!!"):
+            with self.subTest(cursor=cursor):
+                response = self.page(cursor=cursor)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["errors"], {"cursor": ["Invalid cursor"]})
+
+    def test_unpaged_list_matches_the_serializer(self):
+        # An order whose mall was deleted has no mall_name key
+        self.orders.filter(order_number="LIST-0").update(mall=None)
+
+        response = self.page()
+
+        expected = OrderListSerializer(
+            self.orders.select_related("mall").order_by("-created_at", "-id"), many=True
+        ).data
+        self.assertEqual(response.json()["data"], json.loads(JSONRenderer().render(expected)))
+        missing = [row for row in response.json()["data"] if "mall_name" not in row]
+        self.assertEqual([row["order_number"] for row in missing], ["LIST-0"])
+
+
+class IdempotencyKeyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.customer)
+
+    def checkout(self, key="checkout-1", data=None):
+        return self.client.post(
+            "/api/orders/checkout/",
+            data or {},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_replay_returns_the_stored_response(self):
+        first = self.checkout()
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", first)
+        orders = Order.objects.count()
+
+        replay = self.checkout()
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(replay.data["data"]["id"], first.data["data"]["id"])
+        self.assertEqual(Order.objects.count(), orders)
+
+    def test_same_key_different_request(self):
+        self.checkout()
+        response = self.checkout(data={"note": "different"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_key_in_progress(self):
+        IdempotencyKey.objects.create(
+            user=self.fixture.customer,
+            key="checkout-1",
+            endpoint="orders.checkout",
+            request_hash=hashlib.sha256(b"{}").hexdigest(),
+        )
+        self.assertEqual(self.checkout().status_code, 409)
+
+    def test_abandoned_key_is_reclaimed(self):
+        record = IdempotencyKey.objects.create(
+            user=self.fixture.customer,
+            key="checkout-1",
+            endpoint="orders.checkout",
+            request_hash="abandoned",
+        )
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        self.assertEqual(self.checkout().status_code, 201)
+
+    def test_conflict_is_not_stored(self):
+        with mock.patch("orders.views.first_for_update_nowait", side_effect=RowLocked):
+            response = self.checkout()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        # Once the lock is gone the same key completes the checkout
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_client_errors_are_stored(self):
+        self.fixture.cart_item.cart.items.all().delete()
+
+        self.assertEqual(self.checkout().status_code, 400)
+        self.assertEqual(self.checkout()["Idempotent-Replayed"], "true")
+
+    def test_requests_without_a_key_are_unaffected(self):
+        response = self.client.post("/api/orders/checkout/", {}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -6,46 +6,84 @@ from django.shortcuts import get_object_or_404
 import uuid
 from .utils import make_cart_hash, is_expired
 from common.responses import success_response, error_response
+from common.pagination import decode_cursor, keyset_page
+from common.locking import RowLocked, first_for_update_nowait
+from common.replicas import ReplicaReadMixin
 from cart.models import Cart
+from products.services import available_stock, reserve_stock, release_stock
 from .utils import split_gst_inclusive, money
 from .models import Order, OrderItem
-from .serializers import (
-    OrderListSerializer, 
-    OrderDetailSerializer
-)
+from .idempotency import idempotent
+from .projections import ORDER_LIST
+from .serializers import OrderDetailSerializer
 from django.utils import timezone
 from datetime import timedelta
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.graphics.barcode import code128
+from asgiref.sync import sync_to_async
 from django.http import HttpResponse
-from django.conf import settings
-import os
+from django.shortcuts import aget_object_or_404
+from common.async_views import AsyncAPIView, file_attachment
+from .invoice import (
+    INVOICE_FINAL_STATUSES,
+    get_or_create_invoice_artifact,
+    render_invoice_file,
+)
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(ReplicaReadMixin, generics.ListAPIView):
+    """
+    GET /api/orders/list/
+
+    Without paging params the whole history is returned as a list (what
+    older app builds expect). With ?limit= and/or ?cursor= it returns one
+    keyset page: {"results": [...], "next_cursor": "..."}.
+    """
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = OrderListSerializer
+
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
 
     def get_queryset(self):
-        return (
+        # Narrow projection; mall name comes from the SQL join
+        return ORDER_LIST.values(
             Order.objects
             .filter(user=self.request.user)
-            .order_by("-created_at")
+            .order_by("-created_at", "-id")
         )
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        params = request.query_params
+
+        if "limit" not in params and "cursor" not in params:
+            return success_response(
+                message="Orders fetched successfully",
+                data=[ORDER_LIST.row(r) for r in self.get_queryset()],
+                status=status.HTTP_200_OK,
+            )
+
+        try:
+            limit = int(params.get("limit", self.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            limit = self.DEFAULT_PAGE_SIZE
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+
+        cursor = None
+        if params.get("cursor"):
+            cursor = decode_cursor(params["cursor"])
+            if not cursor:
+                return error_response(
+                    message="Invalid cursor",
+                    errors={"cursor": ["Invalid cursor"]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        rows, next_cursor = keyset_page(self.get_queryset(), cursor=cursor, limit=limit)
 
         return success_response(
             message="Orders fetched successfully",
-            data=serializer.data,
+            data={
+                "results": [ORDER_LIST.row(r) for r in rows],
+                "next_cursor": next_cursor,
+            },
             status=status.HTTP_200_OK,
         )
 
@@ -69,18 +107,26 @@ class OrderDetailView(APIView):
 class OrderCheckoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent("orders.checkout")
     @transaction.atomic
     def post(self, request):
-        cart = (
-            Cart.objects.select_for_update()
-            .filter(user=request.user, status="ACTIVE")
-            .select_related("mall")
-            .prefetch_related("items__product")
-            .first()
-        )
+        try:
+            cart = first_for_update_nowait(
+                Cart.objects.filter(user=request.user, status="ACTIVE")
+                .select_related("mall")
+                .prefetch_related("items__product"),
+                # only the cart: locking the joined mall row would
+                # serialize every checkout in the mall
+                of=("self",),
+            )
+        except RowLocked:
+            return error_response(
+                message="Checkout is already in progress",
+                status=status.HTTP_409_CONFLICT,
+            )
 
         if not cart or not cart.items.exists():
-            return error_response("Cart is empty", status=status.HTTP_400_BAD_REQUEST)
+            return error_response(message="Cart is empty", status=status.HTTP_400_BAD_REQUEST)
 
         cart_hash = make_cart_hash(cart.items.all())
 
@@ -112,6 +158,21 @@ class OrderCheckoutView(APIView):
                 status=status.HTTP_200_OK,
             )
 
+        # ✅ Check stock against other shoppers' active holds up front
+        quantities = {}
+        names = {}
+        for item in cart.items.all():
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+            names[item.product_id] = item.product.name
+
+        available = available_stock(quantities, exclude_user=request.user)
+        for product_id, quantity in quantities.items():
+            if quantity > available.get(product_id, 0):
+                return error_response(
+                    message=f"Stock not available for {names[product_id]}",
+                    status=status.HTTP_409_CONFLICT,
+                )
+
         # ✅ Create fresh order snapshot
         order = Order.objects.create(
             user=request.user,
@@ -134,7 +195,9 @@ class OrderCheckoutView(APIView):
         sgst_total = Decimal("0.00")
         payable_total = Decimal("0.00")
 
-        for item in cart.items.select_related("product").all():
+        # One insert for all lines; the cart's items and products are prefetched
+        order_items = []
+        for item in cart.items.all():
             p = item.product
             qty = Decimal(item.quantity)
 
@@ -159,12 +222,13 @@ class OrderCheckoutView(APIView):
             sgst_total += line_sgst
             payable_total += line_total_inclusive
 
-            OrderItem.objects.create(
+            order_items.append(OrderItem(
                 order=order,
                 product=p,
                 product_name=p.name,
                 product_price=money(unit_price_inclusive),
                 product_barcode=p.barcode,
+                hsn_code=p.hsn_code or "",
                 quantity=item.quantity,
                 gst_rate=money(gst_rate),
                 taxable_value=money(line_taxable),
@@ -172,7 +236,9 @@ class OrderCheckoutView(APIView):
                 cgst_amount=money(line_cgst),
                 sgst_amount=money(line_sgst),
                 total_price=money(line_total_inclusive),
-            )
+            ))
+
+        OrderItem.objects.bulk_create(order_items)
 
         order.subtotal = money(taxable_total)
         order.tax = money(gst_total)
@@ -181,6 +247,9 @@ class OrderCheckoutView(APIView):
         order.total = money(payable_total)
         order.save()
 
+        # ✅ Hold the stock until the order is paid, cancelled or expires
+        reserve_stock(order, quantities)
+
         return success_response(
             message="Order created",
             data=OrderDetailSerializer(order).data,
@@ -190,17 +259,20 @@ class OrderCheckoutView(APIView):
 class OrderCancelView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @transaction.atomic
     def post(self, request, pk):
         order = get_object_or_404(
-            Order,
+            Order.objects.select_for_update(),
             id=pk,
             user=request.user,
             status="PAYMENT_PENDING",
         )
 
         order.status = "CANCELLED"
-        order.payment_status = "FAILED"
-        order.save(update_fields=["status", "payment_status"])
+        order.save(update_fields=["status"])
+
+        # ✅ The held stock is free for other shoppers again
+        release_stock(order)
 
         return success_response(
             message="Order cancelled successfully",
@@ -213,11 +285,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from malls.models import Mall
 
 
 def safe_str(x, fallback=""):
@@ -225,301 +296,201 @@ def safe_str(x, fallback=""):
     return str(x) if x is not None else fallback
 
 
+MALL_INVOICE_FIELDS = ("name", "address", "gstin", "fssai", "state_code", "state_name")
+
+# Order fields the invoice shows if the model has them, with their fallback
+ORDER_INVOICE_OPTIONAL_FIELDS = {"payment_method": "UPI", "gateway_payment_id": ""}
+
+
+def _concrete_fields(model, names):
+    present = {f.name for f in model._meta.concrete_fields}
+    return [name for name in names if name in present]
+
+
+def build_invoice_data(pk, user):
+    """
+    Invoice JSON built only from the Order/OrderItem snapshot columns with
+    values() queries (order + mall in one join, then items). No model
+    instances and no product lookups.
+
+    Returns: invoice data
+    """
+    mall_fields = _concrete_fields(Mall, MALL_INVOICE_FIELDS)
+    order_optional = _concrete_fields(Order, ORDER_INVOICE_OPTIONAL_FIELDS)
+
+    order = (
+        Order.objects.filter(pk=pk, user=user)
+        .values(
+            "id",
+            "order_number",
+            "status",
+            "created_at",
+            "mall_id",
+            "subtotal",
+            "cgst",
+            "sgst",
+            "total",
+            *order_optional,
+            *[f"mall__{name}" for name in mall_fields],
+        )
+        .first()
+    )
+
+    if not order:
+        raise Http404
+
+    mall_data = None
+    if order["mall_id"]:
+        mall_data = {
+            name: safe_str(order.get(f"mall__{name}", ""))
+            for name in MALL_INVOICE_FIELDS
+        }
+
+    user_data = {
+        "full_name": safe_str(getattr(user, "full_name", "")),
+        "email": safe_str(getattr(user, "email", "")),
+        "phone_number": safe_str(getattr(user, "phone_number", "")),
+    }
+
+    items_data = []
+    for (
+        product_id,
+        product_name,
+        quantity,
+        product_price,
+        cgst_amount,
+        sgst_amount,
+        total_price,
+        hsn_code,
+    ) in (
+        OrderItem.objects.filter(order_id=order["id"])
+        .order_by("id")
+        .values_list(
+            "product_id",
+            "product_name",
+            "quantity",
+            "product_price",
+            "cgst_amount",
+            "sgst_amount",
+            "total_price",
+            "hsn_code",
+        )
+    ):
+        items_data.append({
+            "product_name": safe_str(product_name, ""),
+            "quantity": quantity,
+            "product_price": safe_str(product_price),
+            "cgst_amount": safe_str(cgst_amount),
+            "sgst_amount": safe_str(sgst_amount),
+            "total_price": safe_str(total_price),
+            "hsn_code": safe_str(hsn_code, ""),
+            "product": {
+                "hsn_code": safe_str(hsn_code, "")
+            } if product_id else None
+        })
+
+    data = {
+        "id": order["id"],
+        "order_number": order["order_number"],
+        "created_at": order["created_at"].isoformat(),
+        "mall": mall_data,
+        "user": user_data,
+        "items": items_data,
+        "subtotal": safe_str(order["subtotal"]),
+        "cgst": safe_str(order["cgst"]),
+        "sgst": safe_str(order["sgst"]),
+        "total": safe_str(order["total"]),
+        **{
+            name: safe_str(order.get(name, fallback), fallback)
+            for name, fallback in ORDER_INVOICE_OPTIONAL_FIELDS.items()
+        },
+    }
+
+    return data
+
+
+def _microseconds(at):
+    return int(at.timestamp() * 1000000) if at else 0
+
+
 class OrderInvoiceDataView(APIView):
     """
     API endpoint to get order data as JSON for mobile app
     GET /api/orders/{pk}/invoice-data/
+
+    The invoice shows the mall's current details, so its version is the
+    order's status and updated_at plus the mall's updated_at. That is the
+    ETag (If-None-Match gets a 304) and the cache key, so a cached entry
+    is never served after any of them changes.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
-        order = get_object_or_404(
-            Order.objects.select_related("mall", "user").prefetch_related("items__product"),
-            pk=pk,
-            user=request.user
+        row = (
+            Order.objects.filter(pk=pk, user=request.user)
+            .values_list("status", "updated_at", "mall__updated_at")
+            .first()
         )
-        
-        # Serialize mall data
-        mall_data = None
-        if order.mall:
-            mall_data = {
-                "name": safe_str(getattr(order.mall, "name", "")),
-                "address": safe_str(getattr(order.mall, "address", "")),
-                "gstin": safe_str(getattr(order.mall, "gstin", "")),
-                "fssai": safe_str(getattr(order.mall, "fssai", "")),
-                "state_code": safe_str(getattr(order.mall, "state_code", "")),
-                "state_name": safe_str(getattr(order.mall, "state_name", "")),
-            }
-        
-        # Serialize user data
-        user_data = {
-            "full_name": safe_str(getattr(order.user, "full_name", "")),
-            "email": safe_str(getattr(order.user, "email", "")),
-            "phone_number": safe_str(getattr(order.user, "phone_number", "")),
-        }
-        
-        # Serialize items
-        items_data = []
-        for item in order.items.all():
-            product = getattr(item, "product", None)
-            hsn_code = ""
-            if product and hasattr(product, "hsn_code"):
-                hsn_code = safe_str(product.hsn_code, "")
-            elif hasattr(item, "hsn_code"):
-                hsn_code = safe_str(item.hsn_code, "")
-            
-            items_data.append({
-                "product_name": safe_str(item.product_name, ""),
-                "quantity": item.quantity,
-                "product_price": safe_str(getattr(item, "product_price", "0.00")),
-                "cgst_amount": safe_str(getattr(item, "cgst_amount", "0.00")),
-                "sgst_amount": safe_str(getattr(item, "sgst_amount", "0.00")),
-                "total_price": safe_str(getattr(item, "total_price", "0.00")),
-                "hsn_code": hsn_code,
-                "product": {
-                    "hsn_code": hsn_code
-                } if product else None
-            })
-        
-        # Build response
-        response_data = {
-            "id": order.id,
-            "order_number": order.order_number,
-            "created_at": order.created_at.isoformat(),
-            "mall": mall_data,
-            "user": user_data,
-            "items": items_data,
-            "subtotal": safe_str(getattr(order, "subtotal", "0.00")),
-            "cgst": safe_str(getattr(order, "cgst", "0.00")),
-            "sgst": safe_str(getattr(order, "sgst", "0.00")),
-            "total": safe_str(getattr(order, "total", "0.00")),
-            "payment_method": safe_str(getattr(order, "payment_method", "UPI")),
-            "gateway_payment_id": safe_str(getattr(order, "gateway_payment_id", "")),
-        }
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+        if not row:
+            raise Http404
+
+        # Status too: status-only saves (update_fields) leave updated_at alone
+        order_status, updated_at, mall_updated_at = row
+        version = f"{order_status}-{_microseconds(updated_at)}-{_microseconds(mall_updated_at)}"
+        etag = f'W/"{pk}-{version}"'
+
+        if request.headers.get("If-None-Match") == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = f"orders:invoice-data:{pk}:{version}"
+            data = cache.get(cache_key)
+            if data is None:
+                data = build_invoice_data(pk, request.user)
+                cache.set(cache_key, data, timeout=settings.INVOICE_DATA_CACHE_TIMEOUT)
+
+            response = Response(data, status=status.HTTP_200_OK)
+
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
 
-class OrderInvoiceView(APIView):
+class OrderInvoiceView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    def get(self, request, pk):
-        order = get_object_or_404(
-            Order.objects.select_related("mall", "user")
-            .prefetch_related("items__product", "payments"),
+    async def get(self, request, pk):
+        order = await aget_object_or_404(
+            Order.objects.select_related("mall", "user"),
             pk=pk,
             user=request.user,
         )
 
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = (
-            f'attachment; filename="invoice_{order.order_number}.pdf"'
-        )
-
-        width, height = A4
-        pdf = canvas.Canvas(response, pagesize=A4)
+        filename = f"invoice_{order.order_number}.pdf"
 
-        # -----------------------------------
-        # REGISTER FONT (₹ support)
-        # -----------------------------------
-        fonts_dir = os.path.join(settings.BASE_DIR, "static", "fonts")
+        # ✅ Final orders: stream the stored artifact (rendered at most once)
+        if order.status in INVOICE_FINAL_STATUSES:
+            artifact = await sync_to_async(get_or_create_invoice_artifact)(order)
+            etag = f'"{artifact.content_hash}"'
 
-        # Define the fallback-safe variables
-        FONT_NORMAL = "Helvetica"
-        FONT_BOLD = "Helvetica-Bold"
-
-        # Try to register Normal Font
-        try:
-            normal_font_path = os.path.join(fonts_dir, "DejaVuSans.ttf")
-            pdfmetrics.registerFont(TTFont("DejaVu", normal_font_path))
-            FONT_NORMAL = "DejaVu"
-        except Exception as e:
-            print(f"Error loading DejaVuSans: {e}")
+            if request.headers.get("If-None-Match") == etag:
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                response["ETag"] = etag
+                return response
 
-        # Try to register Bold Font
-        try:
-            bold_font_path = os.path.join(fonts_dir, "DejaVuSans-Bold.ttf")
-            pdfmetrics.registerFont(TTFont("DejaVu-Bold", bold_font_path))
-            FONT_BOLD = "DejaVu-Bold"
-        except Exception as e:
-            print(f"Error loading DejaVuSans-Bold: {e}")
-
-        pdf.setFont(FONT_NORMAL, 10)
-
-        mall = order.mall
-
-        # -----------------------------------
-        # HEADER LEFT
-        # -----------------------------------
-        y = height - 50
-
-        pdf.setFont(FONT_BOLD, 14)
-        pdf.drawString(40, y, mall.name)
-
-        pdf.setFont(FONT_NORMAL, 10)
-        pdf.drawString(40, y - 18, mall.address or "")
-
-        pdf.drawString(40, y - 36, f"GSTIN: {getattr(mall, 'gstin', '')}")
-        pdf.drawString(40, y - 52, f"FSSAI: {getattr(mall, 'fssai', '')}")
-
-        # -----------------------------------
-        # LOGO RIGHT (Proper Placement)
-        # -----------------------------------
-        logo_path = os.path.join(settings.BASE_DIR, "static/images/logo.png")
-        if os.path.exists(logo_path):
-            pdf.drawImage(
-                logo_path,
-                width - 170,
-                height - 80,
-                width=130,
-                height=45,
-                preserveAspectRatio=True,
-                mask="auto",
+            response = file_attachment(
+                request,
+                await sync_to_async(artifact.file.open)("rb"),
+                filename=filename,
+                content_type="application/pdf",
             )
-
-        # LINE
-        pdf.setStrokeColor(colors.grey)
-        pdf.line(40, height - 110, width - 40, height - 110)
-
-        # -----------------------------------
-        # TITLE
-        # -----------------------------------
-        pdf.setFont(FONT_BOLD, 12)
-        
-        pdf.drawCentredString(width / 2, height - 130, "TAX INVOICE (IN-STORE PURCHASE)")
-        pdf.line(40, height - 140, width - 40, height - 140)
-
-        # -----------------------------------
-        # META
-        # -----------------------------------
-        pdf.setFont(FONT_NORMAL, 12)
-
-        invoice_no = f"PM-{order.created_at.strftime('%Y%m%d')}{order.id}"
-        invoice_date = order.created_at.strftime("%d-%b-%Y")
-
-        meta_y = height - 160
-        pdf.drawString(40, meta_y, f"Invoice No: {invoice_no}")
-        pdf.drawString(40, meta_y - 18, f"Order ID: {order.order_number}")
-        pdf.drawString(40, meta_y - 36, f"Invoice Date: {invoice_date}")
-        pdf.drawString(
-            40,
-            meta_y - 54,
-            f"Place of Supply: {getattr(mall, 'state_name', '')} ({getattr(mall, 'state_code', '')})",
+            response["ETag"] = etag
+            return response
+
+        # ✅ Pending orders: drawn a page at a time into a spooled temp file,
+        # then streamed in chunks like a stored artifact
+        return file_attachment(
+            request,
+            await sync_to_async(render_invoice_file)(order),
+            filename=filename,
+            content_type="application/pdf",
         )
-
-        pdf.line(40, meta_y - 70, width - 40, meta_y - 70)
-
-        # -----------------------------------
-        # BILL TO
-        # -----------------------------------
-        bill_y = meta_y - 100
-
-        pdf.setFillColor(colors.HexColor("#1E3A8A"))
-        pdf.drawString(40, bill_y, "BILL TO")
-        pdf.setFillColor(colors.black)
-
-        pdf.drawString(
-            40,
-            bill_y - 20,
-            f"Customer Name: {order.user.email}",
-        )
-
-        if getattr(order.user, "phone_number", None):
-            pdf.drawString(
-                40,
-                bill_y - 38,
-                f"Mobile: +91 {order.user.phone_number}",
-            )
-
-        # -----------------------------------
-        # ITEMS TABLE
-        # -----------------------------------
-        table_y = bill_y - 70
-
-        data = [["#", "Item", "HSN", "Qty", "Rate", "CGST", "SGST", "Total"]]
-
-        for i, item in enumerate(order.items.all(), start=1):
-            data.append([
-                str(i),
-                item.product_name,
-                getattr(item.product, "hsn_code", ""),
-                str(item.quantity),
-                f"{item.product_price:.2f}",
-                f"{item.cgst_amount:.2f}",
-                f"{item.sgst_amount:.2f}",
-                f"{item.total_price:.2f}",
-            ])
-
-        table = Table(data, colWidths=[25, 170, 50, 35, 55, 55, 55, 60])
-        table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1E3A8A")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#CBD5E1")),
-            ("ALIGN", (3, 1), (-1, -1), "RIGHT"),
-        ]))
-
-        table.wrapOn(pdf, width, height)
-        table_height = 18 * len(data)
-        table.drawOn(pdf, 40, table_y - table_height)
-
-        # -----------------------------------
-        # TOTALS RIGHT SIDE
-        # -----------------------------------
-        summary_y = table_y - table_height - 30
-
-        pdf.setFont(FONT_NORMAL, 10)
-
-        pdf.drawRightString(width - 40, summary_y, f"Item Total: ₹{order.subtotal:.2f}")
-        pdf.drawRightString(width - 40, summary_y - 18, f"CGST: ₹{order.cgst:.2f}")
-        pdf.line(width - 200, summary_y - 22, width - 40, summary_y - 22)
-
-        pdf.drawRightString(width - 40, summary_y - 36, f"SGST: ₹{order.sgst:.2f}")
-        pdf.line(width - 200, summary_y - 40, width - 40, summary_y - 40)
-
-        pdf.setFont(FONT_NORMAL, 11)
-        pdf.drawRightString(width - 40, summary_y - 60, f"Invoice Value: ₹{order.total:.2f}")
-
-        pdf.line(40, summary_y - 80, width - 40, summary_y - 80)
-
-        # -----------------------------------
-        # PAYMENT (FROM Payment MODEL)
-        # -----------------------------------
-        payment = order.payments.filter(status="PAID").first()
-
-        pay_y = summary_y - 100
-
-        pdf.setFillColor(colors.HexColor("#1E3A8A"))
-        pdf.drawString(40, pay_y, f"Payment Mode: {payment.provider if payment else 'Cash'}")
-        pdf.setFillColor(colors.black)
-
-        if payment and payment.gateway_payment_id:
-            pdf.setFillColor(colors.HexColor("#1E3A8A"))
-            pdf.drawString(40, pay_y - 18, f"Transaction ID: {payment.gateway_payment_id}")
-            pdf.setFillColor(colors.black)
-
-        pdf.line(40, pay_y - 35, width - 40, pay_y - 35)
-
-        # -----------------------------------
-        # BARCODE
-        # -----------------------------------
-        barcode = code128.Code128(order.order_number, barHeight=40, barWidth=1)
-        barcode.drawOn(pdf, 40, pay_y - 90)
-
-        # -----------------------------------
-        # FOOTER
-        # -----------------------------------
-        pdf.drawString(40, pay_y - 120, "This is a system-generated invoice for an in-store purchase.")
-
-        pdf.setFont(FONT_NORMAL, 10)
-        pdf.drawString(40, pay_y - 150, "Seller")
-        pdf.drawString(40, pay_y - 165, mall.name)
-        pdf.drawString(40, pay_y - 180, mall.address or "")
-
-        pdf.drawString(40, pay_y - 210, "Platform:")
-        pdf.drawString(40, pay_y - 225, "PayMall Technologies Pvt. Ltd.")
-        pdf.drawString(40, pay_y - 240, "Made in India 🇮🇳")
-
-        pdf.showPage()
-        pdf.save()
-
-        return response
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_pending_lookup_idx'),
+        ('payments', '0003_rename_created_at_payment_paid_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='paymentattempt',
+            name='payments_pa_order_i_d0489d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='paymentattempt',
+            index=models.Index(fields=['order', 'status', 'attempt_no'], name='payment_attempt_order_idx'),
+        ),
+    ]
@@ -59,7 +59,8 @@ class PaymentAttempt(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["order", "status"]),
+            # Latest pending attempt of an order, without a sort
+            models.Index(fields=["order", "status", "attempt_no"], name="payment_attempt_order_idx"),
             models.Index(fields=["provider", "status"]),
         ]
 
@@ -1,3 +1,151 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.testing import ShopFixture
+from orders.models import Order
+from .models import Payment, PaymentAttempt
+
+
+def bearer(user):
+    return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+
+@override_settings(PAYMENT_STATUS_POLL_INTERVAL=0.01)
+class PaymentStatusViewTests(TestCase):
+    """The async status view, served through the ASGI test client"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+        cls.attempt = cls.fixture.pending_attempt
+
+    async def status(self, user=None, **params):
+        return await self.async_client.get(
+            "/api/payments/status/",
+            {"attempt_id": self.attempt.id, **params},
+            headers=bearer(user or self.fixture.customer),
+        )
+
+    async def test_status(self):
+        response = await self.status()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"], {
+            "attempt_id": self.attempt.id,
+            "attempt_status": "PENDING",
+            "order_id": self.fixture.pending_order.id,
+            "order_status": "PAYMENT_PENDING",
+        })
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get("/api/payments/status/", {"attempt_id": self.attempt.id})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_invalid_attempt_id(self):
+        response = await self.status(attempt_id="abc")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], {"attempt_id": ["Must be an integer"]})
+
+    async def test_unknown_or_foreign_attempt(self):
+        for user, attempt_id in (
+            (self.fixture.customer, self.attempt.id + 1000),
+            (self.fixture.mall_admin, self.attempt.id),
+        ):
+            with self.subTest(user=user.email, attempt_id=attempt_id):
+                response = await self.status(user=user, attempt_id=attempt_id)
+
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()["message"], "Payment attempt not found")
+
+    async def test_expiry_is_reported_without_writing_it(self):
+        await Order.objects.filter(pk=self.fixture.pending_order.pk).aupdate(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        response = await self.status()
+
+        self.assertEqual(response.json()["data"]["order_status"], "EXPIRED")
+        order = await Order.objects.aget(pk=self.fixture.pending_order.pk)
+        self.assertEqual(order.status, "PAYMENT_PENDING")
+
+    async def test_wait_returns_once_the_attempt_settles(self):
+        polls = 0
+        sleep = asyncio.sleep
+
+        async def confirm_on_second_poll(seconds):
+            nonlocal polls
+            polls += 1
+            if polls == 2:
+                await PaymentAttempt.objects.filter(pk=self.attempt.pk).aupdate(status="SUCCESS")
+            await sleep(0)
+
+        with mock.patch("payments.views.asyncio.sleep", side_effect=confirm_on_second_poll):
+            response = await self.status(wait=5)
+
+        self.assertEqual(response.json()["data"]["attempt_status"], "SUCCESS")
+        self.assertEqual(polls, 2)
+
+    @override_settings(PAYMENT_STATUS_MAX_WAIT=0.05)
+    async def test_wait_is_capped(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        response = await self.status(wait=60)
+
+        self.assertLess(loop.time() - started, 5)
+        self.assertEqual(response.json()["data"]["attempt_status"], "PENDING")
+
+    async def test_wsgi_matches_asgi(self):
+        asgi = (await self.status()).json()
+        wsgi = await sync_to_async(self.client.get)(
+            "/api/payments/status/",
+            {"attempt_id": self.attempt.id},
+            headers=bearer(self.fixture.customer),
+        )
+
+        self.assertEqual(wsgi.json(), asgi)
+
+
+class InitiatePaymentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+        cls.order = cls.fixture.pending_order
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.customer)
+
+    def initiate(self):
+        return self.client.post(
+            "/api/payments/initiate/",
+            {"order_id": self.order.id, "provider": "UPI"},
+            format="json",
+        )
+
+    def test_pending_payment_is_reused(self):
+        response = self.initiate()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["message"], "Payment already initiated")
+        self.assertEqual(response.json()["data"]["payment_id"], self.fixture.pending_payment.id)
+
+    def test_retry_starts_a_new_attempt(self):
+        Payment.objects.filter(pk=self.fixture.pending_payment.pk).update(status="FAILED")
+
+        response = self.initiate()
+
+        self.assertEqual(response.status_code, 200)
+        payment = Payment.objects.get(pk=response.json()["data"]["payment_id"])
+        self.assertEqual(payment.status, "PENDING")
+        self.assertEqual(payment.attempt.order, self.order)
+        self.assertEqual(payment.attempt.attempt_no, self.fixture.pending_attempt.attempt_no + 1)
+        self.assertEqual(self.initiate().json()["data"]["payment_id"], payment.id)
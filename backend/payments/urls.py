@@ -6,7 +6,8 @@ from .views import (
     PaymentMethodListView,
     PaymentMethodDetailView,
     CreatePaymentAttemptView,
-    VerifyPaymentView
+    VerifyPaymentView,
+    PaymentStatusView,
 )
 
 urlpatterns = [
@@ -20,4 +21,5 @@ urlpatterns = [
 
     path("create-attempt/", CreatePaymentAttemptView.as_view(), name="payment-attempt"),
     path("verify/", VerifyPaymentView.as_view(), name="payment-verify"),
+    path("status/", PaymentStatusView.as_view(), name="payment-status"),
 ]
\ No newline at end of file
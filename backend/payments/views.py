@@ -1,3 +1,5 @@
+import asyncio
+
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
@@ -9,21 +11,31 @@ from datetime import timedelta
 from rest_framework import generics, permissions
 import random
 from django.db import transaction
-from django.db.models import F
 from products.models import Product
 from orders.models import ExitOTP
 from .models import PaymentMethod, PaymentAttempt
 from cart.models import Cart, CartItem
 from .serializers import PaymentMethodSerializer
+from django.conf import settings
+from common.async_views import AsyncAPIView
 from common.responses import success_response, error_response
-from products.services import check_inventory_alert
+from common.locking import RowLocked, first_for_update_nowait
+from products.services import (
+    OutOfStock,
+    check_inventory_alert,
+    deduct_order_stock,
+    release_stock,
+)
 from decimal import Decimal
 from orders.utils import is_expired
+from orders.invoice import precompute_invoice_on_commit
+from orders.idempotency import idempotent
 
 
 class InitiatePaymentView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent("payments.initiate")
     @transaction.atomic
     def post(self, request):
         order_id = request.data.get("order_id")
@@ -59,7 +71,7 @@ class InitiatePaymentView(APIView):
         pending = (
             Payment.objects.select_for_update()
             .filter(order=order, status="PENDING")
-            .order_by("-created_at")
+            .order_by("-paid_at")
             .first()
         )
 
@@ -74,9 +86,19 @@ class InitiatePaymentView(APIView):
                 status=status.HTTP_200_OK,
             )
 
-        # ✅ Create a new attempt (retry)
+        # ✅ Create a new attempt (retry); the payment is its final record
+        last_attempt = PaymentAttempt.objects.filter(order=order).order_by("-attempt_no").first()
+        attempt = PaymentAttempt.objects.create(
+            order=order,
+            provider=provider,
+            attempt_no=1 if not last_attempt else last_attempt.attempt_no + 1,
+            amount=order.total,
+            status="PENDING",
+        )
+
         payment = Payment.objects.create(
             order=order,
+            attempt=attempt,
             provider=provider,
             amount=order.total,
             status="PENDING",
@@ -122,7 +144,7 @@ class PaymentSuccessView(APIView):
             )
 
         # ✅ If order already paid -> safe return (prevents double stock deduction)
-        if order.status == "PAID" and order.payment_status == "PAID":
+        if order.status == "PAID":
             otp_obj = ExitOTP.objects.filter(order=order).first()
             return success_response(
                 message="Payment already processed",
@@ -136,10 +158,8 @@ class PaymentSuccessView(APIView):
         # ✅ If payment already marked success, finalize order anyway
         if payment.status == "SUCCESS":
             order.status = "PAID"
-            order.payment_status = "PAID"
-            order.is_paid = True
-            order.payment_reference = payment.gateway_payment_id
-            order.save(update_fields=["status", "payment_status", "is_paid", "payment_reference"])
+            order.save(update_fields=["status"])
+            release_stock(order)
         else:
             # ✅ Only pending payments can be completed
             if payment.status != "PENDING":
@@ -148,21 +168,15 @@ class PaymentSuccessView(APIView):
                     status=status.HTTP_409_CONFLICT,
                 )
 
-            # ✅ Deduct stock safely once
-            for item in order.items.select_related("product").all():
-                product = Product.objects.select_for_update().get(id=item.product.id)
-
-                if product.stock_quantity < item.quantity:
-                    payment.status = "FAILED"
-                    payment.save(update_fields=["status"])
+            # ✅ Deduct stock safely once (sharded products from their shards),
+            # then release the checkout holds
+            try:
+                deduct_order_stock(order)
+            except OutOfStock as e:
+                payment.status = "FAILED"
+                payment.save(update_fields=["status"])
 
-                    return error_response(
-                        message=f"Stock not available for {product.name}",
-                        status=status.HTTP_409_CONFLICT,
-                    )
-
-                product.stock_quantity = F("stock_quantity") - item.quantity
-                product.save(update_fields=["stock_quantity"])
+                return error_response(message=str(e), status=status.HTTP_409_CONFLICT)
 
             # ✅ Mark payment success
             payment.status = "SUCCESS"
@@ -171,10 +185,10 @@ class PaymentSuccessView(APIView):
 
             # ✅ Mark order success
             order.status = "PAID"
-            order.payment_status = "PAID"
-            order.is_paid = True
-            order.payment_reference = gateway_payment_id
-            order.save(update_fields=["status", "payment_status", "is_paid", "payment_reference"])
+            order.save(update_fields=["status"])
+
+        # ✅ Render the invoice once the PAID state is committed
+        precompute_invoice_on_commit(order.id)
 
         # ✅ Clear ACTIVE cart after payment success (POS correct)
         cart = Cart.objects.filter(
@@ -320,31 +334,36 @@ class PaymentMethodDetailView(generics.RetrieveUpdateDestroyAPIView):
 class CreatePaymentAttemptView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent("payments.create-attempt")
     @transaction.atomic
     def post(self, request):
         order_id = request.data.get("order_id")
         provider = request.data.get("provider", "MOCK")
 
         if not order_id:
-            return error_response("order_id is required", status=status.HTTP_400_BAD_REQUEST)
+            return error_response(message="order_id is required", status=status.HTTP_400_BAD_REQUEST)
 
-        order = (
-            Order.objects.select_for_update()
-            .filter(id=order_id, user=request.user)
-            .first()
-        )
+        try:
+            order = first_for_update_nowait(
+                Order.objects.filter(id=order_id, user=request.user)
+            )
+        except RowLocked:
+            return error_response(
+                message="A payment attempt for this order is already being created",
+                status=status.HTTP_409_CONFLICT,
+            )
 
         if not order:
-            return error_response("Order not found", status=status.HTTP_404_NOT_FOUND)
+            return error_response(message="Order not found", status=status.HTTP_404_NOT_FOUND)
 
         # ✅ Lazy expire (no job needed)
         if order.status == "PAYMENT_PENDING" and order.expires_at and order.expires_at <= timezone.now():
             order.status = "EXPIRED"
             order.save(update_fields=["status"])
-            return error_response("Order expired", status=status.HTTP_400_BAD_REQUEST)
+            return error_response(message="Order expired", status=status.HTTP_400_BAD_REQUEST)
 
         if order.status != "PAYMENT_PENDING":
-            return error_response("Order is not payable now", status=status.HTTP_400_BAD_REQUEST)
+            return error_response(message="Order is not payable now", status=status.HTTP_400_BAD_REQUEST)
 
         # ✅ If there is an existing PENDING attempt, return it (optional, prevents spam)
         existing_attempt = (
@@ -400,6 +419,7 @@ class CreatePaymentAttemptView(APIView):
 class VerifyPaymentView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent("payments.verify")
     @transaction.atomic
     def post(self, request):
         attempt_id = request.data.get("attempt_id")
@@ -408,17 +428,21 @@ class VerifyPaymentView(APIView):
         error_message = request.data.get("error_message", "Payment failed")
 
         if not attempt_id:
-            return error_response("attempt_id is required", status=status.HTTP_400_BAD_REQUEST)
+            return error_response(message="attempt_id is required", status=status.HTTP_400_BAD_REQUEST)
 
-        attempt = (
-            PaymentAttempt.objects.select_for_update()
-            .select_related("order")
-            .filter(id=attempt_id, order__user=request.user)
-            .first()
-        )
+        try:
+            attempt = first_for_update_nowait(
+                PaymentAttempt.objects.select_related("order")
+                .filter(id=attempt_id, order__user=request.user)
+            )
+        except RowLocked:
+            return error_response(
+                message="This payment attempt is already being verified",
+                status=status.HTTP_409_CONFLICT,
+            )
 
         if not attempt:
-            return error_response("Payment attempt not found", status=status.HTTP_404_NOT_FOUND)
+            return error_response(message="Payment attempt not found", status=status.HTTP_404_NOT_FOUND)
 
         order = attempt.order
 
@@ -430,10 +454,10 @@ class VerifyPaymentView(APIView):
             attempt.status = "EXPIRED"
             attempt.save(update_fields=["status"])
 
-            return error_response("Order expired", status=status.HTTP_400_BAD_REQUEST)
+            return error_response(message="Order expired", status=status.HTTP_400_BAD_REQUEST)
 
         if order.status != "PAYMENT_PENDING":
-            return error_response("Order is not payable now", status=status.HTTP_400_BAD_REQUEST)
+            return error_response(message="Order is not payable now", status=status.HTTP_400_BAD_REQUEST)
 
         if attempt.status == "SUCCESS":
             # ✅ already paid
@@ -444,12 +468,24 @@ class VerifyPaymentView(APIView):
             )
 
         if success:
+            # ✅ The held units leave the stock now, or the holds would lapse
+            # and the same units be sold again
+            try:
+                deduct_order_stock(order)
+            except OutOfStock as e:
+                attempt.status = "FAILED"
+                attempt.failure_reason = str(e)
+                attempt.save(update_fields=["status", "failure_reason"])
+
+                return error_response(message=str(e), status=status.HTTP_409_CONFLICT)
+
             attempt.status = "SUCCESS"
             attempt.provider_payment_id = provider_payment_id
             attempt.save(update_fields=["status", "provider_payment_id"])
 
             order.status = "PAID"
             order.save(update_fields=["status"])
+            precompute_invoice_on_commit(order.id)
 
             # ✅ Clear cart items only on successful payment
             CartItem.objects.filter(
@@ -466,11 +502,72 @@ class VerifyPaymentView(APIView):
 
         # ✅ failure (keep order PAYMENT_PENDING so user can retry within expiry)
         attempt.status = "FAILED"
-        attempt.error_message = error_message
-        attempt.save(update_fields=["status", "error_message"])
+        attempt.failure_reason = error_message
+        attempt.save(update_fields=["status", "failure_reason"])
 
         return success_response(
             message="Payment failed (you can retry)",
             data={"order_id": order.id, "status": order.status},
             status=status.HTTP_200_OK,
-        )
\ No newline at end of file
+        )
+
+
+class PaymentStatusView(AsyncAPIView):
+    """
+    GET /api/payments/status/?attempt_id=<id>[&wait=<seconds>]
+
+    Status of a payment attempt and its order, for the app to poll while the
+    provider confirms. With `wait` the request is held (at most
+    PAYMENT_STATUS_MAX_WAIT seconds) until the attempt leaves PENDING, so one
+    long-poll replaces a series of short ones.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        try:
+            attempt_id = int(request.query_params.get("attempt_id", ""))
+        except ValueError:
+            return error_response(
+                message="attempt_id is required",
+                errors={"attempt_id": ["Must be an integer"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            wait = float(request.query_params.get("wait", 0))
+        except ValueError:
+            wait = 0
+        wait = max(0.0, min(wait, settings.PAYMENT_STATUS_MAX_WAIT))
+
+        attempts = PaymentAttempt.objects.filter(id=attempt_id, order__user=request.user).values(
+            "id", "status", "order_id", "order__status", "order__expires_at"
+        )
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while True:
+            attempt = await attempts.afirst()
+            if not attempt:
+                return error_response(message="Payment attempt not found", status=status.HTTP_404_NOT_FOUND)
+
+            remaining = deadline - loop.time()
+            if attempt["status"] != "PENDING" or remaining <= 0:
+                break
+            await asyncio.sleep(min(settings.PAYMENT_STATUS_POLL_INTERVAL, remaining))
+
+        # ✅ Report lazy expiry without writing it (create-attempt / verify do that)
+        order_status = attempt["order__status"]
+        expires_at = attempt["order__expires_at"]
+        if order_status == "PAYMENT_PENDING" and expires_at and expires_at <= timezone.now():
+            order_status = "EXPIRED"
+
+        return success_response(
+            message="Payment status fetched",
+            data={
+                "attempt_id": attempt["id"],
+                "attempt_status": attempt["status"],
+                "order_id": attempt["order_id"],
+                "order_status": order_status,
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -43,9 +43,10 @@ class AdminCategorySerializer(serializers.ModelSerializer):
             "slug",
             "description",
             "image",
+            "is_active",
             "created_at",
         )
-        read_only_fields = ("id", "slug", "created_at")
+        read_only_fields = ("id", "slug", "is_active", "created_at")
 
     def validate_name(self, value):
         if Category.objects.filter(name__iexact=value).exists():
@@ -7,7 +7,7 @@ from rest_framework import status, generics
 from django.shortcuts import get_object_or_404
 from malls.models import MallStaff
 from products.models import Product, Category, InventoryAlert
-from products.services import create_or_update_product
+from products.services import create_or_update_product, restock_product
 from .admin_serializers import AdminProductCreateUpdateSerializer, BulkProductApprovalSerializer, AdminCategorySerializer, ProductApprovalSerializer
 from common.responses import success_response, error_response
 from rest_framework.permissions import IsAuthenticated
@@ -59,15 +59,17 @@ class AdminProductListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
+        # category_name / mall_name are read for every row
+        products = Product.objects.select_related("category", "mall")
 
         if is_master_admin(user):
-            return Product.objects.all()
+            return products.all()
 
         staff = MallStaff.objects.filter(user=user).first()
         if not staff:
             raise PermissionDenied("Mall not assigned")
 
-        return Product.objects.filter(mall=staff.mall)
+        return products.filter(mall=staff.mall)
 
     
 class AdminProductUpdateView(APIView):
@@ -125,6 +127,7 @@ class AdminProductUpdateView(APIView):
                     "approved_by",
                     "approved_at",
                     "rejection_reason",
+                    "updated_at",
                 ]
             )
 
@@ -155,7 +158,7 @@ class AdminProductToggleAvailabilityView(APIView):
         product = get_object_or_404(Product, id=product_id, mall=staff.mall)
 
         product.is_available = not product.is_available
-        product.save(update_fields=["is_available"])
+        product.save(update_fields=["is_available", "updated_at"])
 
         return success_response(
             message=f"Product {'activated' if product.is_available else 'deactivated'}",
@@ -171,7 +174,7 @@ class AdminProductBulkUploadView(APIView):
         staff = MallStaff.objects.filter(user=request.user).first()
         if not staff:
             return error_response(
-                "Not authorized",
+                message="Not authorized",
                 status=403
             )
 
@@ -180,7 +183,7 @@ class AdminProductBulkUploadView(APIView):
         mode = request.data.get("mode", "increment")  # increment | replace
 
         if not csv_file:
-            return error_response("CSV file is required", status=400)
+            return error_response(message="CSV file is required", status=400)
 
         # ==========================
         # 1️⃣ ZIP EXTRACTION
@@ -236,11 +239,6 @@ class AdminProductBulkUploadView(APIView):
                         product.price = price
                         product.marked_price = marked_price
 
-                        if mode == "increment":
-                            product.stock_quantity += stock_qty
-                        else:
-                            product.stock_quantity = stock_qty
-
                     # ---- IMAGE MAPPING ----
                     image_name = row.get("image_name")
                     if image_name and image_name in image_map:
@@ -252,6 +250,11 @@ class AdminProductBulkUploadView(APIView):
                             )
 
                     product.save()
+
+                    # Sharded products keep their stock in the shards
+                    if not created:
+                        restock_product(product, stock_qty, replace=mode != "increment")
+
                     success_count += 1
 
             except Exception as e:
@@ -404,7 +407,7 @@ class SubmitProductForApprovalView(APIView):
     def post(self, request, product_id):
         staff = MallStaff.objects.filter(user=request.user).first()
         if not staff:
-            return error_response("Not authorized", status=403)
+            return error_response(message="Not authorized", status=403)
 
         product = get_object_or_404(
             Product,
@@ -415,7 +418,7 @@ class SubmitProductForApprovalView(APIView):
 
         product.status = "PENDING_APPROVAL"
         product.rejection_reason = ""
-        product.save(update_fields=["status", "rejection_reason"])
+        product.save(update_fields=["status", "rejection_reason", "updated_at"])
 
         return success_response(
             message="Product submitted for approval",
@@ -0,0 +1,203 @@
+"""
+Per-mall catalog sync for the mobile app.
+
+The app downloads a full snapshot of a mall's catalog once, then asks for
+the delta since the version token it was given:
+
+    GET /api/products/catalog/?mall=<id>                -> snapshot
+    GET /api/products/catalog/?mall=<id>&since=<version> -> delta
+
+Both carry the new `version`, the product column names (`fields`), the
+mall's categories and the products as arrays in that column order. A delta
+lists products added or changed since the version (by updated_at) and the
+ids under `removed`: products deactivated since (still in the table) or
+deleted (CatalogTombstone). Deltas overlap the previous one by
+CATALOG_SYNC_OVERLAP, so clients must apply them as upserts. Categories
+are few and always sent in full; a category id missing from the list
+means the category is gone.
+
+A version that can't be served as a delta (malformed, from another
+CATALOG_SCHEMA, or older than the tombstones) gets a snapshot, so the
+client just replaces its copy whenever `full` is true.
+
+Snapshots are streamed in batches, so a large mall's catalog is never
+held in memory as one response. Under ASGI the batches come from an async
+iterator over the async ORM, so Django doesn't buffer the stream.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import router
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from common.async_views import is_asgi_request
+from common.renderers import FastJSONRenderer
+from .models import CatalogTombstone, Category, Product
+from .projections import CATALOG_PRODUCT
+
+
+# Bump when CATALOG_PRODUCT's columns change: older versions then get a snapshot
+CATALOG_SCHEMA = 1
+SNAPSHOT_BATCH_SIZE = 1000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+FIELDS = [field.key for field in CATALOG_PRODUCT.fields]
+
+
+def make_version(at):
+    return f"{CATALOG_SCHEMA}.{(at - _EPOCH) // _MICROSECOND}"
+
+
+def parse_version(token, now):
+    """
+    Returns: the time a version token was issued, or None when the token
+    can't be served as a delta
+    """
+    schema, _, micros = (token or "").partition(".")
+    if schema != str(CATALOG_SCHEMA) or not micros.isdigit():
+        return None
+
+    issued = _EPOCH + int(micros) * _MICROSECOND
+    if issued > now or issued < now - settings.CATALOG_SYNC_TOMBSTONE_TTL:
+        return None
+    return issued
+
+
+def catalog_products(mall_id, using):
+    # Same catalog as ProductListView
+    return Product.objects.using(using).filter(mall_id=mall_id, status="ACTIVE", is_available=True)
+
+
+def catalog_categories(mall_id, using):
+    return list(
+        Category.objects.using(using)
+        .filter(id__in=catalog_products(mall_id, using).values("category_id"))
+        .order_by("name")
+        .values("id", "name", "slug")
+    )
+
+
+def delta(mall_id, since, request):
+    now = timezone.now()
+    using = router.db_for_read(Product)
+    cutoff = since - settings.CATALOG_SYNC_OVERLAP
+
+    row = CATALOG_PRODUCT.row
+    changed, removed = [], []
+
+    rows = CATALOG_PRODUCT.values(
+        Product.objects.using(using).filter(mall_id=mall_id, updated_at__gt=cutoff),
+        "status",
+        "is_available",
+    )
+    for r in rows:
+        if r["status"] == "ACTIVE" and r["is_available"]:
+            changed.append(tuple(row(r, request).values()))
+        else:
+            removed.append(r["id"])
+
+    removed.extend(
+        CatalogTombstone.objects.using(using)
+        .filter(mall_id=mall_id, removed_at__gt=cutoff)
+        .values_list("product_id", flat=True)
+    )
+
+    return {
+        "version": make_version(now),
+        "full": False,
+        "fields": FIELDS,
+        "categories": catalog_categories(mall_id, using),
+        "products": changed,
+        "removed": removed,
+    }
+
+
+def snapshot_response(mall_id, request):
+    now = timezone.now()
+    # Resolved now: the stream is read after the view has returned
+    using = router.db_for_read(Product)
+
+    chunks = _asnapshot_chunks if is_asgi_request(request) else _snapshot_chunks
+
+    return StreamingHttpResponse(
+        chunks(mall_id, request, now, using),
+        content_type="application/json",
+    )
+
+
+# The success_response envelope, written out by hand around batches of
+# product rows
+
+def _snapshot_head(renderer, now, categories):
+    head = renderer.render({
+        "version": make_version(now),
+        "full": True,
+        "fields": FIELDS,
+        "categories": categories,
+    })
+    return b'{"success":true,"message":"Catalog snapshot fetched successfully","data":' + head[:-1] + b',"products":['
+
+
+_SNAPSHOT_TAIL = b'],"removed":[]},"errors":null}'
+
+
+def _snapshot_batch(renderer, batch, first):
+    return (b"" if first else b",") + renderer.render(batch)[1:-1]
+
+
+def _snapshot_rows(mall_id, using):
+    return CATALOG_PRODUCT.values(catalog_products(mall_id, using))
+
+
+def _snapshot_chunks(mall_id, request, now, using):
+    renderer = FastJSONRenderer()
+    yield _snapshot_head(renderer, now, catalog_categories(mall_id, using))
+
+    row = CATALOG_PRODUCT.row
+    batch, first = [], True
+
+    for r in _snapshot_rows(mall_id, using).iterator(chunk_size=SNAPSHOT_BATCH_SIZE):
+        batch.append(tuple(row(r, request).values()))
+        if len(batch) == SNAPSHOT_BATCH_SIZE:
+            yield _snapshot_batch(renderer, batch, first)
+            batch, first = [], False
+
+    if batch:
+        yield _snapshot_batch(renderer, batch, first)
+    yield _SNAPSHOT_TAIL
+
+
+async def _asnapshot_chunks(mall_id, request, now, using):
+    """
+    _snapshot_chunks for ASGI: each batch is fetched through the async ORM.
+    """
+    renderer = FastJSONRenderer()
+    yield _snapshot_head(renderer, now, await sync_to_async(catalog_categories)(mall_id, using))
+
+    row = CATALOG_PRODUCT.row
+    batch, first = [], True
+
+    async for r in _snapshot_rows(mall_id, using).aiterator(chunk_size=SNAPSHOT_BATCH_SIZE):
+        batch.append(tuple(row(r, request).values()))
+        if len(batch) == SNAPSHOT_BATCH_SIZE:
+            yield _snapshot_batch(renderer, batch, first)
+            batch, first = [], False
+
+    if batch:
+        yield _snapshot_batch(renderer, batch, first)
+    yield _SNAPSHOT_TAIL
+
+
+def purge_catalog_tombstones():
+    """
+    Delete tombstones older than CATALOG_SYNC_TOMBSTONE_TTL; versions that
+    old already get a snapshot. Returns: number deleted
+    """
+    cutoff = timezone.now() - settings.CATALOG_SYNC_TOMBSTONE_TTL
+    deleted, _ = CatalogTombstone.objects.filter(removed_at__lt=cutoff).delete()
+    return deleted
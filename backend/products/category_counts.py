@@ -0,0 +1,128 @@
+"""
+Precomputed active-product counts per (mall, category).
+
+MallCategoryListView reads MallCategoryCount instead of counting the
+mall's products on every request. The counters move by +1 / -1 when a
+product starts or stops counting (see models.category_count_key): it is
+created or deleted, changes status, availability or category, or its
+stock crosses zero.
+
+Products remember what they counted towards when they were loaded
+(Product.from_db), so a save compares that with the new state without a
+query. Instances that weren't fully loaded fetch their old state in
+pre_save. Writes that bypass save() (queryset.update, bulk_create) don't
+move the counters; run `rebuild_category_counts` after them.
+`check_category_counts` reports drift.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import CATEGORY_COUNT_ATTNAMES, MallCategoryCount, Product, category_count_key
+
+# Sentinel: what the instance counted towards isn't known yet
+UNKNOWN = object()
+
+
+def saves_count_fields(update_fields):
+    if update_fields is None:
+        return True
+    names = set(update_fields)
+    return bool(names & CATEGORY_COUNT_ATTNAMES or names & {"mall", "category"})
+
+
+def loaded_key(product, using):
+    """
+    What a product being saved counted towards before this save.
+    """
+    key = getattr(product, "_category_count_key", UNKNOWN)
+    if key is not UNKNOWN:
+        return key
+    if product._state.adding:
+        return None
+
+    old = Product.objects.using(using).filter(pk=product.pk).only(*CATEGORY_COUNT_ATTNAMES).first()
+    return category_count_key(old) if old else None
+
+
+def _add(key, delta, using):
+    mall_id, category_id = key
+    counts = MallCategoryCount.objects.using(using).filter(mall_id=mall_id, category_id=category_id)
+
+    if counts.update(product_count=F("product_count") + delta):
+        return
+
+    # First product of this category in the mall: create the row, then
+    # count through the same UPDATE in case a concurrent save created it
+    MallCategoryCount.objects.using(using).bulk_create(
+        [MallCategoryCount(mall_id=mall_id, category_id=category_id, product_count=0)],
+        ignore_conflicts=True,
+    )
+    counts.update(product_count=F("product_count") + delta)
+
+
+def move(before, after, using="default"):
+    if before == after:
+        return
+    if before is not None:
+        _add(before, -1, using)
+    if after is not None:
+        _add(after, 1, using)
+
+
+def expected_counts(using="default"):
+    """
+    Returns: {(mall_id, category_id): count} computed from the products
+    """
+    rows = (
+        Product.objects.using(using)
+        .filter(
+            category__isnull=False,
+            status="ACTIVE",
+            is_available=True,
+            stock_quantity__gt=0,
+        )
+        .values("mall_id", "category_id")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    return {(r["mall_id"], r["category_id"]): r["n"] for r in rows}
+
+
+def stored_counts(using="default"):
+    rows = MallCategoryCount.objects.using(using).values_list("mall_id", "category_id", "product_count")
+    return {(mall_id, category_id): n for mall_id, category_id, n in rows}
+
+
+def drift(using="default"):
+    """
+    Returns: [(mall_id, category_id, stored, expected)] for every pair
+    whose stored count is wrong (missing rows count as 0)
+    """
+    expected, stored = expected_counts(using), stored_counts(using)
+
+    wrong = []
+    for key in expected.keys() | stored.keys():
+        have, want = stored.get(key, 0), expected.get(key, 0)
+        if have != want:
+            wrong.append((*key, have, want))
+    return sorted(wrong, key=str)
+
+
+def rebuild(using="default"):
+    """
+    Replace every counter with a fresh count. Returns: number of rows written
+    """
+    with transaction.atomic(using=using):
+        # Run it while product writes are quiet: on PostgreSQL a save that
+        # commits during the rebuild can be missed (check_category_counts shows it)
+        expected = expected_counts(using)
+        MallCategoryCount.objects.using(using).all().delete()
+        MallCategoryCount.objects.using(using).bulk_create(
+            [
+                MallCategoryCount(mall_id=mall_id, category_id=category_id, product_count=n)
+                for (mall_id, category_id), n in expected.items()
+            ],
+            batch_size=500,
+        )
+    return len(expected)
@@ -0,0 +1,116 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import F, Sum
+
+from malls.models import Mall
+from products.models import Product, StockShard
+from products.services import decrement_sharded_stock, enable_sharded_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency benchmark: N threads buy one unit of the same product, "
+        "either through a select_for_update row lock (as deduct_order_stock "
+        "does for unsharded products) or through sharded stock counters. Runs against the configured "
+        "database and deletes its rows afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--ops", type=int, default=50, help="Purchases per thread")
+        parser.add_argument("--shards", type=int, default=8)
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        ops = options["ops"]
+        stock = threads * ops
+
+        mall = Mall.objects.create(
+            name=f"Benchmark Mall {uuid.uuid4().hex[:6]}",
+            address="1 Benchmark Road",
+            latitude=0.0,
+            longitude=0.0,
+        )
+
+        try:
+            self.stdout.write(f"database: {connection.vendor}, threads: {threads}, purchases: {stock}")
+
+            locked = self._make_product(mall, stock)
+            self._report("row lock", locked, self._run(self._buy_locked, locked, threads, ops), stock)
+
+            sharded = enable_sharded_stock(self._make_product(mall, stock), shards=options["shards"])
+            self._report(
+                f"sharded x{options['shards']}",
+                sharded,
+                self._run(self._buy_sharded, sharded, threads, ops),
+                stock,
+            )
+        finally:
+            mall.delete()
+
+    def _make_product(self, mall, stock):
+        return Product.objects.create(
+            name="Benchmark hot SKU",
+            barcode=f"BENCH-{uuid.uuid4().hex[:12]}",
+            price=Decimal("10.00"),
+            marked_price=Decimal("10.00"),
+            mall=mall,
+            stock_quantity=stock,
+            status="ACTIVE",
+        )
+
+    def _buy_locked(self, product):
+        with transaction.atomic():
+            locked = Product.objects.select_for_update().get(id=product.id)
+            if locked.stock_quantity < 1:
+                return False
+            locked.stock_quantity = F("stock_quantity") - 1
+            locked.save(update_fields=["stock_quantity"])
+        return True
+
+    def _buy_sharded(self, product):
+        with transaction.atomic():
+            return decrement_sharded_stock(product, 1)
+
+    def _run(self, buy, product, threads, ops):
+        def worker():
+            done = errors = 0
+            try:
+                for _ in range(ops):
+                    try:
+                        done += bool(buy(product))
+                    except OperationalError:
+                        # e.g. "database is locked" / lock wait timeout
+                        errors += 1
+            finally:
+                connection.close()
+            return done, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = [f.result() for f in [pool.submit(worker) for _ in range(threads)]]
+        elapsed = time.perf_counter() - started
+
+        return {
+            "elapsed": elapsed,
+            "done": sum(r[0] for r in results),
+            "errors": sum(r[1] for r in results),
+        }
+
+    def _report(self, label, product, result, stock):
+        if product.stock_shard_count:
+            remaining = StockShard.objects.filter(product=product).aggregate(total=Sum("quantity"))["total"]
+        else:
+            remaining = Product.objects.get(id=product.id).stock_quantity
+
+        consistent = remaining == stock - result["done"]
+        self.stdout.write(
+            f"{label:>12}: {result['done'] / result['elapsed']:8.1f} purchases/s "
+            f"({result['done']} ok, {result['errors']} lock errors, "
+            f"{result['elapsed']:.2f}s, stock {'consistent' if consistent else 'INCONSISTENT'})"
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.category_counts import drift
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare MallCategoryCount with a fresh count over the products and "
+        "fail if any (mall, category) pair has drifted."
+    )
+
+    def handle(self, *args, **options):
+        wrong = drift()
+
+        for mall_id, category_id, stored, expected in wrong:
+            self.stdout.write(f"mall {mall_id} category {category_id}: stored {stored}, expected {expected}")
+
+        if wrong:
+            raise CommandError(f"{len(wrong)} mall category counts differ; run rebuild_category_counts")
+        self.stdout.write("All mall category counts match")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.catalog import purge_catalog_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete catalog sync tombstones older than CATALOG_SYNC_TOMBSTONE_TTL."
+
+    def handle(self, *args, **options):
+        deleted = purge_catalog_tombstones()
+        self.stdout.write(f"Deleted {deleted} expired catalog tombstones")
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products.services import purge_stock_reservations
+
+
+class Command(BaseCommand):
+    help = "Delete stock reservations that were released or expired more than --hours ago."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        deleted = purge_stock_reservations(cutoff)
+        self.stdout.write(f"Deleted {deleted} stale stock reservations")
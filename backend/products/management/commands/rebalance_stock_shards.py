@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.services import rebalance_sharded_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Consolidate sharded stock counters into Product.stock_quantity and "
+        "spread the total evenly over the shards again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--product", help="Only rebalance this product id")
+
+    def handle(self, *args, **options):
+        products = Product.objects.filter(stock_shard_count__gt=0)
+        if options["product"]:
+            products = products.filter(id=options["product"])
+
+        for product in products.iterator():
+            total = rebalance_sharded_stock(product)
+            self.stdout.write(f"{product.id} {product.name}: {total} across {product.stock_shard_count} shards")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.category_counts import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute MallCategoryCount from the products. Needed after writes "
+        "that bypass Product.save(), such as bulk_create or queryset.update()."
+    )
+
+    def handle(self, *args, **options):
+        written = rebuild()
+        self.stdout.write(f"Rebuilt {written} mall category counts")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import Product
+from products.services import enable_sharded_stock, disable_sharded_stock
+
+
+class Command(BaseCommand):
+    help = "Turn sharded stock counters on (or off with --disable) for a hot product."
+
+    def add_arguments(self, parser):
+        parser.add_argument("product", help="Product id")
+        parser.add_argument("--shards", type=int, default=8)
+        parser.add_argument("--disable", action="store_true")
+
+    def handle(self, *args, **options):
+        product = Product.objects.filter(id=options["product"]).first()
+        if not product:
+            raise CommandError("Product not found")
+
+        if options["disable"]:
+            product = disable_sharded_stock(product)
+            self.stdout.write(f"{product.name}: sharding disabled, stock {product.stock_quantity}")
+            return
+
+        if options["shards"] < 1:
+            raise CommandError("--shards must be at least 1")
+
+        product = enable_sharded_stock(product, shards=options["shards"])
+        self.stdout.write(f"{product.name}: stock {product.stock_quantity} over {product.stock_shard_count} shards")
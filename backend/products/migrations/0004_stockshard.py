@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_shard_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard_no', models.PositiveSmallIntegerField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'shard_no'), name='unique_stock_shard')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_stockshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mall_id', models.UUIDField()),
+                ('product_id', models.UUIDField()),
+                ('removed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['mall_id', 'removed_at'], name='products_ca_mall_id_f6f519_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counts(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    MallCategoryCount = apps.get_model("products", "MallCategoryCount")
+    db = schema_editor.connection.alias
+
+    rows = (
+        Product.objects.using(db)
+        .filter(category__isnull=False, status="ACTIVE", is_available=True, stock_quantity__gt=0)
+        .values("mall_id", "category_id")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    MallCategoryCount.objects.using(db).bulk_create(
+        [MallCategoryCount(mall_id=r["mall_id"], category_id=r["category_id"], product_count=r["n"]) for r in rows],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('malls', '0002_mall_malls_mall_is_acti_ca772f_idx'),
+        ('products', '0005_catalogtombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MallCategoryCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mall_counts', to='products.category')),
+                ('mall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_counts', to='malls.mall')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mall', 'category'), name='unique_mall_category_count')],
+            },
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('malls', '0002_mall_malls_mall_is_acti_ca772f_idx'),
+        ('products', '0006_mallcategorycount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='products_pr_mall_id_75cb8d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='products_pr_barcode_4ceac3_idx',
+        ),
+        migrations.AddIndex(
+            model_name='inventoryalert',
+            index=models.Index(condition=models.Q(('is_triggered', True)), fields=['product'], name='triggered_inventory_alert_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['mall', 'status'], name='product_catalog_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_catalog_and_alert_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -11,6 +11,7 @@ class Category(models.Model):
     slug = models.SlugField(max_length=120, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to='category_images/', blank=True, null=True)
+    is_active = models.BooleanField(default=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -34,6 +35,25 @@ class Category(models.Model):
 
 
 
+# Product fields that decide whether it counts in MallCategoryCount
+CATEGORY_COUNT_ATTNAMES = {"mall_id", "category_id", "status", "is_available", "stock_quantity"}
+
+
+def category_count_key(product):
+    """
+    Returns: the (mall_id, category_id) MallCategoryCount row a product
+    counts towards, or None if MallCategoryListView wouldn't count it
+    """
+    if (
+        product.category_id is None
+        or product.status != "ACTIVE"
+        or not product.is_available
+        or product.stock_quantity <= 0
+    ):
+        return None
+    return (product.mall_id, product.category_id)
+
+
 class Product(models.Model):
     """Model to store product information"""
 
@@ -60,6 +80,10 @@ class Product(models.Model):
     
     stock_quantity = models.PositiveIntegerField(default=0)
     is_available = models.BooleanField(default=True)
+
+    # Hot SKUs: > 0 means stock lives in this many StockShard rows and
+    # stock_quantity is the total as of the last rebalance_stock_shards run
+    stock_shard_count = models.PositiveSmallIntegerField(default=0)
     
     gst_rate = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal("0.00"))
     hsn_code = models.CharField(max_length=20, null=True, blank=True)
@@ -86,11 +110,32 @@ class Product(models.Model):
     class Meta:
         unique_together = ("barcode", "mall")
         indexes = [
-            models.Index(fields=["mall", "is_available"]),
-            models.Index(fields=["barcode", "mall"]),
+            # Catalog reads (list, scan, catalog sync) filter on mall, status
+            # and is_available=True. Django writes the last one as a bare
+            # column test, which both SQLite and PostgreSQL match against
+            # the partial condition. (barcode, mall) lookups are already
+            # served by the unique indexes on barcode and unique_together.
+            models.Index(
+                fields=["mall", "status"],
+                condition=models.Q(is_available=True),
+                name="product_catalog_idx",
+            ),
             models.Index(fields=["created_at"]),
         ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 🔹 What this row counted towards when loaded (products/category_counts.py)
+        if CATEGORY_COUNT_ATTNAMES.issubset(field_names):
+            instance._category_count_key = category_count_key(instance)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None and not self.get_deferred_fields() & CATEGORY_COUNT_ATTNAMES:
+            self._category_count_key = category_count_key(self)
+
     def save(self, *args, **kwargs):
         # Calculate discount percentage if not provided
         if self.marked_price > 0 and self.discount_percentage == 0:
@@ -116,3 +161,101 @@ class InventoryAlert(models.Model):
     triggered_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Low-stock list: only the triggered alerts
+            models.Index(
+                fields=["product"],
+                condition=models.Q(is_triggered=True),
+                name="triggered_inventory_alert_idx",
+            ),
+        ]
+
+
+class StockShard(models.Model):
+    """
+    One slice of a hot product's stock. Buyers decrement a random shard
+    with a conditional UPDATE, so concurrent payments rarely touch the
+    same row.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_shards")
+    shard_no = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "shard_no"], name="unique_stock_shard")
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} shard {self.shard_no}: {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for a pending order. A hold stops counting once it is
+    released (paid/cancelled) or its expires_at (the order's) has passed.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations")
+    order = models.ForeignKey("orders.Order", on_delete=models.CASCADE, related_name="stock_reservations")
+    quantity = models.PositiveIntegerField()
+
+    expires_at = models.DateTimeField()
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Active holds per product: SUM(quantity) WHERE expires_at > now
+            models.Index(
+                fields=["product", "expires_at"],
+                condition=models.Q(released_at__isnull=True),
+                name="active_stock_reservation_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for order {self.order_id}"
+
+
+class CatalogTombstone(models.Model):
+    """
+    A product deleted from a mall's catalog, kept so catalog sync deltas
+    can tell clients to drop it. Products that are only deactivated keep
+    their row and show up in deltas through updated_at instead. Plain ids,
+    not foreign keys: the product (and possibly the mall) is gone.
+    """
+    mall_id = models.UUIDField()
+    product_id = models.UUIDField()
+    removed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["mall_id", "removed_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} removed from {self.mall_id}"
+
+
+class MallCategoryCount(models.Model):
+    """
+    Number of products per (mall, category) that MallCategoryListView
+    lists: ACTIVE, available and in stock. Maintained by products.signals
+    as products change; rebuild_category_counts recomputes it from the
+    products and check_category_counts reports drift.
+    """
+    mall = models.ForeignKey(Mall, on_delete=models.CASCADE, related_name="category_counts")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="mall_counts")
+    # Not Positive: a drifted counter must not fail the product write that moves it
+    product_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["mall", "category"], name="unique_mall_category_count")
+        ]
+
+    def __str__(self):
+        return f"{self.mall_id} / {self.category_id}: {self.product_count}"
@@ -0,0 +1,46 @@
+from common.projections import Field, Projection
+
+from .models import Category, Product
+
+
+# Same JSON as ProductSerializer
+PRODUCT_LIST = Projection(Product, [
+    "id",
+    "name",
+    "barcode",
+    "description",
+    "price",
+    "marked_price",
+    "discount_percentage",
+    "image",
+    "category",
+    Field("category_name", "category__name"),
+    "mall",
+    Field("mall_name", "mall__name"),
+    "stock_quantity",
+    "is_available",
+])
+
+# Same JSON as CategorySerializer; product_count is annotated by the view
+CATEGORY_LIST = Projection(Category, [
+    "id",
+    "name",
+    "slug",
+    "image",
+    "product_count",
+])
+
+# Catalog sync rows (products/catalog.py), sent as arrays in this column
+# order. Stock is left out: it changes on every sale and is checked live
+# at add-to-cart and checkout
+CATALOG_PRODUCT = Projection(Product, [
+    "id",
+    "name",
+    "barcode",
+    "description",
+    "price",
+    "marked_price",
+    "discount_percentage",
+    "image",
+    "category",
+])
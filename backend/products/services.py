@@ -1,16 +1,33 @@
+import random
 from products.models import Product
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from products.models import InventoryAlert
+from products import category_counts
+from products.models import (
+    CATEGORY_COUNT_ATTNAMES,
+    InventoryAlert,
+    StockReservation,
+    StockShard,
+    category_count_key,
+)
 
 
 @transaction.atomic
 def create_or_update_product(*, mall, data, instance=None):
     if instance:
+        # Stock goes through restock_product: a sharded product keeps it in its shards
+        data = dict(data)
+        stock_quantity = data.pop("stock_quantity", None)
+
         for field, value in data.items():
             setattr(instance, field, value)
         instance.mall = mall
         instance.save()
+
+        if stock_quantity is not None:
+            restock_product(instance, stock_quantity, replace=True)
         return instance
 
     return Product.objects.create(mall=mall, **data)
@@ -35,3 +52,338 @@ def check_inventory_alert(product):
         alert.save()
 
     return False
+
+
+def available_stock(product_ids, *, exclude_user=None):
+    """
+    On-hand stock minus active reservations, for many products in one
+    query (the holds are summed through the active_stock_reservation_idx).
+    On-hand stock of sharded products is the sum of their shards.
+
+    exclude_user: ignore holds from this user's own pending orders, so a
+    shopper is never blocked by their own checkout.
+
+    Returns: {product_id: available_quantity}
+    """
+    holds = StockReservation.objects.filter(
+        product=OuterRef("pk"),
+        released_at__isnull=True,
+        expires_at__gt=timezone.now(),
+    )
+    if exclude_user is not None:
+        holds = holds.exclude(order__user=exclude_user)
+
+    held = (
+        holds.order_by()
+        .values("product")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+
+    sharded = (
+        StockShard.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+
+    rows = (
+        Product.objects.filter(id__in=product_ids)
+        .annotate(
+            on_hand=Case(
+                When(stock_shard_count__gt=0, then=Coalesce(Subquery(sharded), 0)),
+                default=F("stock_quantity"),
+            ),
+            held=Coalesce(Subquery(held), 0),
+        )
+        .values_list("id", "on_hand", "held")
+    )
+
+    return {pid: max(on_hand - held, 0) for pid, on_hand, held in rows}
+
+
+def reserve_stock(order, quantities):
+    """
+    Append holds for a pending order in one bulk insert.
+
+    quantities: {product_id: quantity}
+    """
+    StockReservation.objects.bulk_create([
+        StockReservation(
+            product_id=product_id,
+            order=order,
+            quantity=quantity,
+            expires_at=order.expires_at,
+        )
+        for product_id, quantity in quantities.items()
+    ])
+
+
+class OutOfStock(Exception):
+    """
+    Not enough on-hand stock of `product` to fill a paid order.
+    """
+
+    def __init__(self, product):
+        super().__init__(f"Stock not available for {product.name}")
+        self.product = product
+
+
+def deduct_order_stock(order):
+    """
+    Take a paid order's lines off the on-hand stock and release its holds.
+
+    The products are locked and checked in one query, then decremented in
+    one conditional UPDATE, so the cost doesn't grow with the order's
+    lines. Sharded products (hot SKUs) are taken from their shards through
+    decrement_sharded_stock instead; their product row is neither locked
+    nor written. Runs in a savepoint: if any product is short, OutOfStock
+    is raised and nothing is deducted or released.
+    """
+    quantities = {}
+    for product_id, quantity in order.items.values_list("product_id", "quantity"):
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    with transaction.atomic():
+        sharded = list(
+            Product.objects.filter(id__in=quantities, stock_shard_count__gt=0)
+            .order_by("id")
+            .only("name", "stock_shard_count")
+        )
+
+        # Locked in id order, so two payments sharing products can't deadlock
+        products = list(
+            Product.objects.filter(id__in=quantities, stock_shard_count=0)
+            .order_by("id")
+            .select_for_update()
+            .only("name", *CATEGORY_COUNT_ATTNAMES)
+        )
+
+        for product in products:
+            if product.stock_quantity < quantities[product.id]:
+                raise OutOfStock(product)
+
+        for product in sharded:
+            if not decrement_sharded_stock(product, quantities[product.id]):
+                raise OutOfStock(product)
+
+        if products:
+            Product.objects.filter(
+                id__in=[product.id for product in products],
+            ).update(
+                stock_quantity=F("stock_quantity") - Case(
+                    *[When(id=product.id, then=Value(quantities[product.id])) for product in products],
+                    output_field=IntegerField(),
+                ),
+            )
+
+        # update() skips the signals that keep the category counts: move
+        # the products whose stock just ran out
+        for product in products:
+            before = category_count_key(product)
+            product.stock_quantity -= quantities[product.id]
+            category_counts.move(before, category_count_key(product))
+
+        release_stock(order)
+
+
+def release_stock(order):
+    """
+    Release an order's holds once it is paid (see deduct_order_stock) or
+    cancelled.
+    """
+    StockReservation.objects.filter(
+        order=order,
+        released_at__isnull=True,
+    ).update(released_at=timezone.now())
+
+
+def purge_stock_reservations(older_than):
+    """
+    Delete holds that were released or expired before `older_than`.
+
+    Returns: number of rows deleted
+    """
+    deleted, _ = StockReservation.objects.filter(
+        Q(released_at__lte=older_than) | Q(expires_at__lte=older_than)
+    ).delete()
+    return deleted
+
+
+def enable_sharded_stock(product, shards=8):
+    """
+    Spread a hot product's current stock_quantity evenly over `shards`
+    StockShard rows.
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+
+        if product.stock_shard_count:
+            rebalance_sharded_stock(product)
+            StockShard.objects.filter(product=product).delete()
+
+        base, extra = divmod(product.stock_quantity, shards)
+        StockShard.objects.bulk_create([
+            StockShard(
+                product=product,
+                shard_no=shard_no,
+                quantity=base + (1 if shard_no < extra else 0),
+            )
+            for shard_no in range(shards)
+        ])
+
+        product.stock_shard_count = shards
+        product.save(update_fields=["stock_shard_count"])
+
+    return product
+
+
+def disable_sharded_stock(product):
+    """
+    Fold the shards back into stock_quantity and drop them.
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        rebalance_sharded_stock(product)
+
+        StockShard.objects.filter(product=product).delete()
+        product.stock_shard_count = 0
+        product.save(update_fields=["stock_shard_count"])
+
+    return product
+
+
+def decrement_sharded_stock(product, quantity):
+    """
+    Take `quantity` units from a sharded product.
+
+    Where the database has row locks, first grabs any shard that can cover
+    the quantity and is not locked by another checkout (SKIP LOCKED), so
+    concurrent payments never queue behind each other's uncommitted shard.
+    Otherwise starts at a random shard and tries each shard's conditional
+    UPDATE in turn; only if no single shard can cover the quantity are all
+    shards locked and drained together.
+
+    Returns: True if the stock was taken, False if there is not enough
+    """
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            shard_id = (
+                StockShard.objects.select_for_update(skip_locked=True)
+                .filter(product_id=product.pk, quantity__gte=quantity)
+                .order_by("?")
+                .values_list("id", flat=True)
+                .first()
+            )
+            if shard_id and StockShard.objects.filter(id=shard_id).update(
+                quantity=F("quantity") - quantity
+            ):
+                return True
+
+    shard_count = product.stock_shard_count
+    start = random.randrange(shard_count)
+
+    for offset in range(shard_count):
+        updated = StockShard.objects.filter(
+            product_id=product.pk,
+            shard_no=(start + offset) % shard_count,
+            quantity__gte=quantity,
+        ).update(quantity=F("quantity") - quantity)
+
+        if updated:
+            return True
+
+    with transaction.atomic():
+        shards = list(
+            StockShard.objects.select_for_update()
+            .filter(product_id=product.pk)
+            .order_by("shard_no")
+        )
+
+        if sum(shard.quantity for shard in shards) < quantity:
+            return False
+
+        remaining = quantity
+        for shard in shards:
+            take = min(shard.quantity, remaining)
+            if not take:
+                continue
+
+            shard.quantity -= take
+            shard.save(update_fields=["quantity"])
+            remaining -= take
+
+            if not remaining:
+                break
+
+    return True
+
+
+def rebalance_sharded_stock(product):
+    """
+    Consolidate a product's shards into stock_quantity and spread the
+    total evenly again, so no shard runs dry while others still hold stock.
+    """
+    with transaction.atomic():
+        shards = list(
+            StockShard.objects.select_for_update()
+            .filter(product_id=product.pk)
+            .order_by("shard_no")
+        )
+        if not shards:
+            return product.stock_quantity
+
+        total = sum(shard.quantity for shard in shards)
+        base, extra = divmod(total, len(shards))
+
+        for i, shard in enumerate(shards):
+            shard.quantity = base + (1 if i < extra else 0)
+        StockShard.objects.bulk_update(shards, ["quantity"])
+
+        # save() rather than update(): the category counts follow stock_quantity
+        locked = Product.objects.select_for_update().get(pk=product.pk)
+        locked.stock_quantity = total
+        locked.save(update_fields=["stock_quantity"])
+        product.stock_quantity = total
+
+    return total
+
+
+def restock_product(product, quantity, *, replace=False):
+    """
+    Admin stock change: add `quantity` units, or with replace=True make
+    `quantity` the new total.
+
+    A sharded product's stock lives in its shards, and rebalancing
+    overwrites stock_quantity with their sum, so the change is spread over
+    the shards and stock_quantity set to the new total. Other products are
+    updated on the locked row.
+
+    Returns: the new on-hand total
+    """
+    with transaction.atomic():
+        # Shards before the product row, in the order rebalance_sharded_stock locks them
+        shards = list(
+            StockShard.objects.select_for_update()
+            .filter(product_id=product.pk)
+            .order_by("shard_no")
+        )
+        locked = Product.objects.select_for_update().get(pk=product.pk)
+
+        if shards:
+            total = quantity if replace else sum(shard.quantity for shard in shards) + quantity
+            base, extra = divmod(total, len(shards))
+
+            for i, shard in enumerate(shards):
+                shard.quantity = base + (1 if i < extra else 0)
+            StockShard.objects.bulk_update(shards, ["quantity"])
+        else:
+            total = quantity if replace else locked.stock_quantity + quantity
+
+        # save() rather than update(): the category counts follow stock_quantity
+        locked.stock_quantity = total
+        locked.save(update_fields=["stock_quantity"])
+        product.stock_quantity = total
+
+    return total
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import category_counts
+from .models import CatalogTombstone, Product, category_count_key
+
+
+@receiver(post_delete, sender=Product)
+def record_catalog_tombstone(sender, instance, **kwargs):
+    # 🔹 Catalog sync: deltas report deleted products from these rows
+    CatalogTombstone.objects.create(mall_id=instance.mall_id, product_id=instance.pk)
+
+
+@receiver(pre_save, sender=Product)
+def remember_category_count(sender, instance, using, update_fields, **kwargs):
+    if category_counts.saves_count_fields(update_fields):
+        instance._category_count_before = category_counts.loaded_key(instance, using)
+
+
+@receiver(post_save, sender=Product)
+def update_category_counts(sender, instance, using, update_fields, **kwargs):
+    if not category_counts.saves_count_fields(update_fields):
+        return
+
+    # 🔹 stock_quantity=F(...) saves: read back the value that was written
+    if hasattr(instance.stock_quantity, "resolve_expression"):
+        instance.refresh_from_db(using=using, fields=["stock_quantity"])
+
+    after = category_count_key(instance)
+    category_counts.move(instance._category_count_before, after, using)
+    instance._category_count_key = after
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_category_counts(sender, instance, using, **kwargs):
+    before = getattr(instance, "_category_count_key", category_counts.UNKNOWN)
+    if before is category_counts.UNKNOWN:
+        before = category_count_key(instance)
+    category_counts.move(before, None, using)
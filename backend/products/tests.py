@@ -1,3 +1,571 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from common.testing import ShopFixture
+from cart.models import Cart, CartItem
+from orders.models import Order
+from payments.models import Payment, PaymentAttempt
+from products import category_counts
+from products.catalog import FIELDS, make_version, purge_catalog_tombstones
+from products.models import CatalogTombstone, Category, MallCategoryCount, Product, StockReservation, StockShard
+from products.services import (
+    available_stock,
+    decrement_sharded_stock,
+    enable_sharded_stock,
+    purge_stock_reservations,
+    rebalance_sharded_stock,
+    release_stock,
+    reserve_stock,
+    restock_product,
+)
+
+
+def shard_total(product):
+    return sum(StockShard.objects.filter(product=product).values_list("quantity", flat=True))
+
+
+class StockReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+        # products[0] has 5 in stock; the customer's cart holds one of it
+        cls.product = cls.fixture.products[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.customer)
+
+    def other_shoppers_order(self, expires_in=timedelta(minutes=15)):
+        return Order.objects.create(
+            user=self.fixture.master,
+            mall=self.fixture.mall,
+            order_number=f"HOLD-{Order.objects.count()}",
+            status="PAYMENT_PENDING",
+            expires_at=timezone.now() + expires_in,
+            subtotal=Decimal("0.00"),
+            tax=Decimal("0.00"),
+            total=Decimal("0.00"),
+        )
+
+    def available(self, **kwargs):
+        return available_stock([self.product.id], **kwargs)[self.product.id]
+
+    def test_holds_reduce_available_stock(self):
+        order = self.other_shoppers_order()
+        reserve_stock(order, {self.product.id: 3})
+
+        self.assertEqual(self.available(), 2)
+        # A shopper is never blocked by their own holds
+        self.assertEqual(self.available(exclude_user=self.fixture.master), 5)
+
+        release_stock(order)
+        self.assertEqual(self.available(), 5)
+
+    def test_expired_holds_stop_counting(self):
+        reserve_stock(self.other_shoppers_order(expires_in=timedelta(seconds=-1)), {self.product.id: 5})
+        self.assertEqual(self.available(), 5)
+
+    def test_purge(self):
+        released = self.other_shoppers_order()
+        reserve_stock(released, {self.product.id: 1})
+        release_stock(released)
+        reserve_stock(self.other_shoppers_order(), {self.product.id: 1})
+
+        self.assertEqual(purge_stock_reservations(timezone.now()), 1)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_checkout_is_refused_stock_held_by_others(self):
+        order = self.other_shoppers_order()
+        reserve_stock(order, {self.product.id: 5})
+
+        response = self.client.post("/api/orders/checkout/", {}, format="json")
+        self.assertEqual(response.status_code, 409)
+
+        release_stock(order)
+        response = self.client.post("/api/orders/checkout/", {}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def checkout_and_pay(self):
+        order_id = self.client.post("/api/orders/checkout/", {}, format="json").data["data"]["id"]
+        attempt = self.client.post("/api/payments/create-attempt/", {"order_id": order_id}, format="json")
+        response = self.client.post(
+            "/api/payments/verify/",
+            {"attempt_id": attempt.data["data"]["attempt_id"], "success": True},
+            format="json",
+        )
+        return order_id, attempt.data["data"]["attempt_id"], response
+
+    def test_payment_turns_the_holds_into_a_deduction(self):
+        order_id, _, response = self.checkout_and_pay()
+        self.assertEqual(response.status_code, 200)
+
+        self.assertFalse(StockReservation.objects.filter(order_id=order_id, released_at__isnull=True).exists())
+        # The paid unit is gone from the stock, not back on sale
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 4)
+        self.assertEqual(self.available(), 4)
+
+    def test_payment_is_refused_when_the_stock_is_gone(self):
+        order_id = self.client.post("/api/orders/checkout/", {}, format="json").data["data"]["id"]
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=0)
+
+        attempt_id = self.client.post(
+            "/api/payments/create-attempt/", {"order_id": order_id}, format="json"
+        ).data["data"]["attempt_id"]
+        response = self.client.post("/api/payments/verify/", {"attempt_id": attempt_id, "success": True}, format="json")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.get(pk=order_id).status, "PAYMENT_PENDING")
+        self.assertEqual(PaymentAttempt.objects.get(pk=attempt_id).status, "FAILED")
+        self.assertTrue(StockReservation.objects.filter(order_id=order_id, released_at__isnull=True).exists())
+
+    def fill_cart(self, user, quantity):
+        self.client.force_authenticate(user)
+        CartItem.objects.create(
+            cart=Cart.objects.create(user=user, mall=self.fixture.mall, status="ACTIVE"),
+            product=self.product,
+            quantity=quantity,
+        )
+
+    def test_selling_out_moves_the_category_count(self):
+        self.fill_cart(self.fixture.master, 5)
+        self.assertEqual(self.checkout_and_pay()[2].status_code, 200)
+
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock_quantity, 0)
+        self.assertEqual(category_counts.drift(), [])
+
+    def test_cancel_releases_the_holds(self):
+        self.fill_cart(self.fixture.master, 5)
+        order_id = self.client.post("/api/orders/checkout/", {}, format="json").data["data"]["id"]
+        self.assertEqual(self.available(), 0)
+
+        response = self.client.post(f"/api/orders/{order_id}/cancel/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(pk=order_id).status, "CANCELLED")
+        self.assertEqual(self.available(), 5)
+
+
+class ShardedStockTests(TestCase):
+    def setUp(self):
+        self.fixture = ShopFixture()
+        self.product = self.fixture.spare_product
+        self.product.stock_quantity = 100
+        self.product.save(update_fields=["stock_quantity"])
+
+    def test_enable_spreads_stock_evenly(self):
+        enable_sharded_stock(self.product, shards=8)
+
+        quantities = sorted(StockShard.objects.filter(product=self.product).values_list("quantity", flat=True))
+        self.assertEqual(quantities, [12, 12, 12, 12, 13, 13, 13, 13])
+
+    def test_decrement_then_rebalance(self):
+        product = enable_sharded_stock(self.product, shards=4)
+
+        self.assertTrue(decrement_sharded_stock(product, 10))
+        self.assertEqual(shard_total(product), 90)
+
+        # Drains several shards when no single one can cover the quantity
+        self.assertTrue(decrement_sharded_stock(product, 80))
+        self.assertFalse(decrement_sharded_stock(product, 11))
+        self.assertEqual(shard_total(product), 10)
+
+        self.assertEqual(rebalance_sharded_stock(product), 10)
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 10)
+        self.assertEqual(
+            sorted(StockShard.objects.filter(product=product).values_list("quantity", flat=True)),
+            [2, 2, 3, 3],
+        )
+
+    def test_restock_unsharded(self):
+        self.assertEqual(restock_product(self.product, 5), 105)
+        self.assertEqual(restock_product(self.product, 7, replace=True), 7)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 7)
+
+    def test_restock_sharded_survives_rebalance(self):
+        product = enable_sharded_stock(self.product, shards=4)
+        decrement_sharded_stock(product, 10)
+
+        self.assertEqual(restock_product(product, 50), 140)
+        self.assertEqual(shard_total(product), 140)
+        self.assertEqual(rebalance_sharded_stock(product), 140)
+
+        restock_product(product, 20, replace=True)
+        self.assertEqual(rebalance_sharded_stock(product), 20)
+
+
+class ShardedPaymentTests(TestCase):
+    """Paying for a sharded product takes the units from its shards"""
+
+    def setUp(self):
+        self.fixture = ShopFixture()
+        self.product = self.fixture.spare_product
+        self.product.stock_quantity = 40
+        self.product.save(update_fields=["stock_quantity"])
+        enable_sharded_stock(self.product, shards=4)
+
+        cart = self.fixture.cart_item.cart
+        cart.items.all().delete()
+        CartItem.objects.create(cart=cart, product=self.product, quantity=3)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.customer)
+        self.order_id = self.client.post("/api/orders/checkout/", {}, format="json").data["data"]["id"]
+
+    def assertDeducted(self):
+        self.assertEqual(shard_total(self.product), 37)
+        self.assertEqual(available_stock([self.product.id])[self.product.id], 37)
+        self.assertFalse(StockReservation.objects.filter(order_id=self.order_id, released_at__isnull=True).exists())
+        self.assertEqual(Order.objects.get(pk=self.order_id).status, "PAID")
+
+        # The product row is only written by rebalancing
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock_quantity, 40)
+        self.assertEqual(rebalance_sharded_stock(self.product), 37)
+
+    def test_verify(self):
+        attempt_id = self.client.post(
+            "/api/payments/create-attempt/", {"order_id": self.order_id}, format="json"
+        ).data["data"]["attempt_id"]
+        response = self.client.post("/api/payments/verify/", {"attempt_id": attempt_id, "success": True}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertDeducted()
+
+    def test_payment_success(self):
+        order = Order.objects.get(pk=self.order_id)
+        attempt = PaymentAttempt.objects.create(order=order, provider="UPI", amount=order.total)
+        payment = Payment.objects.create(
+            order=order, attempt=attempt, provider="UPI", amount=order.total, status="PENDING"
+        )
+
+        response = self.client.post(
+            "/api/payments/success/",
+            {"payment_id": payment.id, "gateway_payment_id": "pay_1"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertDeducted()
+
+        # A repeat doesn't deduct again
+        response = self.client.post(
+            "/api/payments/success/",
+            {"payment_id": payment.id, "gateway_payment_id": "pay_1"},
+            format="json",
+        )
+        self.assertEqual(response.data["message"], "Payment already processed")
+        self.assertEqual(shard_total(self.product), 37)
+
+    def test_short_shards_refuse_the_payment(self):
+        StockShard.objects.filter(product=self.product).update(quantity=0)
+        attempt_id = self.client.post(
+            "/api/payments/create-attempt/", {"order_id": self.order_id}, format="json"
+        ).data["data"]["attempt_id"]
+
+        response = self.client.post("/api/payments/verify/", {"attempt_id": attempt_id, "success": True}, format="json")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.get(pk=self.order_id).status, "PAYMENT_PENDING")
+
+
+class AdminStockUpdateTests(TestCase):
+    """Admin stock edits of a sharded product land in its shards"""
+
+    def setUp(self):
+        self.fixture = ShopFixture()
+        self.product = self.fixture.spare_product
+        self.product.stock_quantity = 40
+        self.product.save(update_fields=["stock_quantity"])
+        enable_sharded_stock(self.product, shards=4)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.fixture.mall_admin)
+
+    def upload(self, stock_quantity, mode):
+        p = self.product
+        csv_file = BytesIO(
+            (
+                "barcode,name,price,marked_price,stock_quantity\n"
+                f"{p.barcode},{p.name},{p.price},{p.marked_price},{stock_quantity}\n"
+            ).encode()
+        )
+        csv_file.name = "products.csv"
+
+        response = self.client.post(
+            "/api/admin/products/bulk-upload/",
+            {"csv": csv_file, "mode": mode},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"]["success_count"], 1, response.data)
+
+    def test_bulk_upload_increment(self):
+        self.upload(25, "increment")
+
+        self.assertEqual(shard_total(self.product), 65)
+        self.assertEqual(rebalance_sharded_stock(self.product), 65)
+
+    def test_bulk_upload_replace(self):
+        self.upload(12, "replace")
+
+        self.assertEqual(shard_total(self.product), 12)
+        self.assertEqual(rebalance_sharded_stock(self.product), 12)
+
+    def test_product_update(self):
+        response = self.client.put(
+            f"/api/admin/products/{self.product.id}/update/",
+            {"stock_quantity": 30},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"]["stock_quantity"], 30)
+
+        self.assertEqual(shard_total(self.product), 30)
+        self.assertEqual(rebalance_sharded_stock(self.product), 30)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock_quantity, 30)
+
+
+class CatalogSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture(products=5)
+
+    def url(self):
+        return f"/api/products/catalog/?mall={self.fixture.mall.id}"
+
+    async def asgi_body(self):
+        response = await self.async_client.get(self.url())
+        self.assertTrue(response.is_async)
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    @mock.patch("products.catalog.SNAPSHOT_BATCH_SIZE", 2)
+    def test_asgi_snapshot_streams_async_and_matches_wsgi(self):
+        asgi = json.loads(async_to_sync(self.asgi_body)())
+
+        response = self.client.get(self.url())
+        self.assertFalse(response.is_async)
+        wsgi = json.loads(b"".join(response.streaming_content))
+
+        # Versions are the time of each request
+        asgi["data"].pop("version")
+        wsgi["data"].pop("version")
+
+        self.assertEqual(asgi, wsgi)
+        self.assertTrue(asgi["data"]["full"])
+        self.assertEqual(len(asgi["data"]["products"]), 5)
+
+
+@override_settings(CATALOG_SYNC_OVERLAP=timedelta(0))
+class CatalogDeltaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+        cls.mall = cls.fixture.mall
+
+    def setUp(self):
+        # Every row predates the version the client holds
+        self.version = make_version(timezone.now())
+        Product.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def sync(self, since):
+        return self.client.get("/api/products/catalog/", {"mall": str(self.mall.id), "since": since})
+
+    def delta(self):
+        response = self.sync(self.version)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertFalse(data["full"])
+        return data
+
+    def product(self, **fields):
+        return Product.objects.create(
+            name="Catalog product",
+            barcode=f"CATALOG-{Product.objects.count()}",
+            price=Decimal("10.00"),
+            marked_price=Decimal("12.00"),
+            mall=self.mall,
+            category=self.fixture.category,
+            stock_quantity=10,
+            status="ACTIVE",
+            **fields,
+        )
+
+    def test_nothing_changed(self):
+        data = self.delta()
+
+        self.assertEqual(data["products"], [])
+        self.assertEqual(data["removed"], [])
+        self.assertEqual(data["fields"], FIELDS)
+        self.assertEqual(len(data["categories"]), 1)
+
+    def test_changed_products(self):
+        product = self.fixture.products[1]
+        product.price = Decimal("99.00")
+        product.save()
+        added = self.product()
+
+        rows = {row[0]: dict(zip(FIELDS, row)) for row in self.delta()["products"]}
+
+        self.assertEqual(set(rows), {str(product.id), str(added.id)})
+        self.assertEqual(rows[str(product.id)]["price"], "99.00")
+
+    def test_deactivated_and_deleted_products_are_removed(self):
+        inactive = self.fixture.products[1]
+        inactive.status = "INACTIVE"
+        inactive.save()
+        deleted = self.product()
+        deleted_id = deleted.id
+        deleted.delete()
+
+        data = self.delta()
+
+        self.assertEqual(data["products"], [])
+        self.assertCountEqual(data["removed"], [str(inactive.id), str(deleted_id)])
+        self.assertTrue(CatalogTombstone.objects.filter(mall_id=self.mall.id, product_id=deleted_id).exists())
+
+    def test_other_malls_tombstones_are_ignored(self):
+        CatalogTombstone.objects.create(mall_id=uuid.uuid4(), product_id=uuid.uuid4())
+        self.assertEqual(self.delta()["removed"], [])
+
+    def test_unusable_versions_get_a_snapshot(self):
+        now = timezone.now()
+        expired = make_version(now - settings.CATALOG_SYNC_TOMBSTONE_TTL - timedelta(minutes=1))
+        future = make_version(now + timedelta(hours=1))
+        other_schema = "9" + self.version[self.version.index("."):]
+
+        for since in ("garbage", "1.", other_schema, expired, future):
+            with self.subTest(since=since):
+                response = self.sync(since)
+                self.assertTrue(response.streaming)
+                data = json.loads(b"".join(response.streaming_content))["data"]
+                self.assertTrue(data["full"])
+                self.assertEqual(len(data["products"]), 3)
+
+    def test_purge_tombstones(self):
+        old = CatalogTombstone.objects.create(mall_id=self.mall.id, product_id=uuid.uuid4())
+        CatalogTombstone.objects.filter(pk=old.pk).update(
+            removed_at=timezone.now() - settings.CATALOG_SYNC_TOMBSTONE_TTL - timedelta(minutes=1)
+        )
+        recent = CatalogTombstone.objects.create(mall_id=self.mall.id, product_id=uuid.uuid4())
+
+        self.assertEqual(purge_catalog_tombstones(), 1)
+        self.assertEqual(list(CatalogTombstone.objects.values_list("pk", flat=True)), [recent.pk])
+
+
+class CategoryCountTests(TestCase):
+    """MallCategoryCount follows product saves and deletes through signals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = ShopFixture()
+        cls.mall, cls.category = cls.fixture.mall, cls.fixture.category
+        cls.other_category = Category.objects.create(name="Other", slug="other")
+
+    def setUp(self):
+        self.product = Product.objects.get(pk=self.fixture.spare_product.pk)
+
+    def count(self, category=None):
+        row = MallCategoryCount.objects.filter(mall=self.mall, category=category or self.category).first()
+        return row.product_count if row else 0
+
+    def assertCounts(self, count, other=0):
+        self.assertEqual(self.count(), count)
+        self.assertEqual(self.count(self.other_category), other)
+        self.assertEqual(category_counts.drift(), [])
+
+    def test_create_and_delete(self):
+        product = Product.objects.create(
+            name="Counted",
+            barcode="COUNTED-1",
+            price=Decimal("10.00"),
+            marked_price=Decimal("10.00"),
+            mall=self.mall,
+            category=self.other_category,
+            stock_quantity=3,
+            status="ACTIVE",
+        )
+        self.assertCounts(3, other=1)
+
+        product.delete()
+        self.assertCounts(3, other=0)
+
+    def test_status_and_availability(self):
+        self.product.status = "INACTIVE"
+        self.product.save()
+        self.assertCounts(2)
+
+        self.product.status = "ACTIVE"
+        self.product.is_available = False
+        self.product.save()
+        self.assertCounts(2)
+
+        self.product.is_available = True
+        self.product.save(update_fields=["is_available"])
+        self.assertCounts(3)
+
+    def test_stock_crossing_zero(self):
+        self.product.stock_quantity = 0
+        self.product.save(update_fields=["stock_quantity"])
+        self.assertCounts(2)
+
+        # An F() save is read back to see where it landed
+        self.product.stock_quantity = F("stock_quantity") + 4
+        self.product.save(update_fields=["stock_quantity"])
+        self.assertEqual(self.product.stock_quantity, 4)
+        self.assertCounts(3)
+
+    def test_category_move(self):
+        self.product.category = self.other_category
+        self.product.save()
+        self.assertCounts(2, other=1)
+
+    def test_partly_loaded_instance(self):
+        product = Product.objects.only("id", "name").get(pk=self.product.pk)
+        product.status = "INACTIVE"
+        product.save(update_fields=["status"])
+        self.assertCounts(2)
+
+    def test_unrelated_save_does_not_touch_counts(self):
+        self.product.name = "Renamed"
+        with self.assertNumQueries(1):
+            self.product.save(update_fields=["name"])
+        self.assertCounts(3)
+
+    def test_category_list_reads_the_counts(self):
+        self.product.status = "INACTIVE"
+        self.product.save()
+
+        response = self.client.get("/api/products/categories/", {"mall": str(self.mall.id)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(c["name"], c["product_count"]) for c in response.json()["data"]],
+            [(self.category.name, 2)],
+        )
+
+    def test_drift_check_and_rebuild(self):
+        # Bypasses save(), so the counters don't move
+        Product.objects.filter(pk=self.product.pk).update(status="INACTIVE")
+
+        with self.assertRaises(CommandError):
+            call_command("check_category_counts", stdout=StringIO())
+        self.assertEqual(category_counts.drift(), [(self.mall.id, self.category.id, 3, 2)])
+
+        call_command("rebuild_category_counts", stdout=StringIO())
+        self.assertCounts(2)
+        call_command("check_category_counts", stdout=StringIO())
@@ -3,7 +3,8 @@ from .views import (
     ProductListView,
     ProductDetailView,
     ProductBarcodeView,
-    MallCategoryListView
+    MallCategoryListView,
+    CatalogSyncView,
 )
 
 urlpatterns = [
@@ -11,4 +12,5 @@ urlpatterns = [
     path('list/', ProductListView.as_view(), name='product_list'),
     path('<uuid:pk>/', ProductDetailView.as_view(), name='product_detail'),
     path('scan/', ProductBarcodeView.as_view(), name='product_barcode'),
+    path('catalog/', CatalogSyncView.as_view(), name='product_catalog'),
 ]
\ No newline at end of file
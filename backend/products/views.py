@@ -1,19 +1,22 @@
-from django.db.models import Q, Count
+import uuid
+
+from django.db.models import F, Q
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.exceptions import ValidationError
 
+from common.async_views import AsyncAPIView
 from common.responses import success_response, error_response
+from common.replicas import ReplicaReadMixin
+from . import catalog
 from .models import Product, Category
-from .serializers import (
-    ProductSerializer,
-    ProductDetailSerializer,
-    CategorySerializer,
-)
+from .projections import CATEGORY_LIST, PRODUCT_LIST
+from .serializers import ProductDetailSerializer
 
 
-class MallCategoryListView(APIView):
+class MallCategoryListView(ReplicaReadMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
@@ -25,26 +28,24 @@ class MallCategoryListView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        # 🔹 Counts are kept per (mall, category) in MallCategoryCount
         qs = (
             Category.objects.filter(
-                products__mall_id=mall_id,
-                products__is_available=True,
-                products__stock_quantity__gt=0,
-                products__status="ACTIVE",
+                mall_counts__mall_id=mall_id,
+                mall_counts__product_count__gt=0,
             )
-            .annotate(product_count=Count("products"))
-            .distinct()
+            .annotate(product_count=F("mall_counts__product_count"))
             .order_by("name")
         )
 
         return success_response(
             message="Mall categories fetched successfully",
-            data=CategorySerializer(qs, many=True, context={"request": request}).data,
+            data=CATEGORY_LIST.serialize(qs, request=request),
             status=status.HTTP_200_OK,
         )
 
 
-class ProductListView(APIView):
+class ProductListView(ReplicaReadMixin, AsyncAPIView):
     """
     List products for a given mall with optional:
     - category
@@ -53,7 +54,7 @@ class ProductListView(APIView):
     """
     permission_classes = [AllowAny]
 
-    def get(self, request):
+    async def get(self, request):
         params = request.query_params
 
         mall_id = params.get("mall")
@@ -92,16 +93,14 @@ class ProductListView(APIView):
         elif sort == "Popular":
             queryset = queryset.order_by("-created_at")  # replace with real field if available
 
-        serialized = ProductSerializer(queryset, many=True, context={"request": request}).data
-
         return success_response(
             message="Products fetched successfully",
-            data=serialized,
+            data=await PRODUCT_LIST.aserialize(queryset, request=request),
             status=status.HTTP_200_OK,
         )
 
 
-class ProductDetailView(APIView):
+class ProductDetailView(ReplicaReadMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, pk):
@@ -120,10 +119,10 @@ class ProductDetailView(APIView):
         )
 
 
-class ProductBarcodeView(APIView):
+class ProductBarcodeView(AsyncAPIView):
     permission_classes = [AllowAny]
 
-    def post(self, request):
+    async def post(self, request):
         barcode = request.data.get("barcode")
         mall_id = request.data.get("mall_id")
 
@@ -134,12 +133,18 @@ class ProductBarcodeView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        product = Product.objects.filter(
-            status="ACTIVE",
-            barcode=barcode,
-            mall_id=mall_id,
-            is_available=True,
-        ).first()
+        # 🔹 Category and mall come in the same query: the serializer
+        # can't load them lazily on the event loop
+        product = await (
+            Product.objects.filter(
+                status="ACTIVE",
+                barcode=barcode,
+                mall_id=mall_id,
+                is_available=True,
+            )
+            .select_related("category", "mall")
+            .afirst()
+        )
 
         if not product:
             return error_response(
@@ -152,3 +157,40 @@ class ProductBarcodeView(APIView):
             data=ProductDetailSerializer(product, context={"request": request}).data,
             status=status.HTTP_200_OK,
         )
+
+
+class CatalogSyncView(ReplicaReadMixin, APIView):
+    """
+    Mall catalog for offline browsing and scanning: a full snapshot, or
+    the changes since a `since` version token (see products/catalog.py).
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        mall_id = request.query_params.get("mall")
+        if not mall_id:
+            return error_response(
+                message="mall query param is required",
+                errors={"mall": ["mall_id is required"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            mall_id = uuid.UUID(mall_id)
+        except ValueError:
+            return error_response(
+                message="Invalid mall id",
+                errors={"mall": ["Must be a valid UUID"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # 🔹 Unknown, outdated or expired versions get a fresh snapshot
+        since = catalog.parse_version(request.query_params.get("since"), timezone.now())
+        if since is None:
+            return catalog.snapshot_response(mall_id, request)
+
+        return success_response(
+            message="Catalog changes fetched successfully",
+            data=catalog.delta(mall_id, since, request),
+            status=status.HTTP_200_OK,
+        )